@@ -0,0 +1,231 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Resumable conversion. Checkpointer() saves checkpoints of the conversion into
+    the work folder every N bytes of the source and continues interrupted conversion
+    from the last checkpoint.
+
+    Checkpoint is saved after all messages of the processed part of the source are
+    printed and written to output files. It holds:
+    - offset of the end of the last printed message in the (decompressed) source;
+    - framer state: unprocessed bytes after the offset, synchronization flags;
+    - ConverterStatistics counters;
+    - lengths of all output files.
+    Checkpoint is replaced atomically, the last complete checkpoint survives a crash
+    at any moment.
+
+    Resume. Output files are truncated to their lengths at the checkpoint, files
+    created after the checkpoint are deleted. Printers register remaining files and
+    append to them (JSON arrays are closed at the end as usual). Conversion continues
+    from the saved offset. The result is identical to uninterrupted conversion.
+
+    Outputs of MARGO, JSON and JARGO formats can be continued, compressed outputs
+    can't be truncated.
+"""
+
+# pylint: disable = invalid-name
+
+import os
+import json
+from dataclasses import dataclass, field, asdict
+
+from converter_top import ConverterInterface, ConverterStatistics
+from printers.file_pool import OutputControls
+from shards import SHARDABLE_FORMATS
+
+from logger import LOGGER_CF as logger
+
+
+# Formats which outputs can be continued
+RESUMABLE_FORMATS = SHARDABLE_FORMATS
+
+CHECKPOINT_NAME = ".checkpoint.json"
+CHECKPOINT_VERSION: int = 1
+
+
+class CheckpointError(Exception):
+    """Conversion can't be resumed from the checkpoint"""
+
+
+@dataclass
+class Checkpoint:
+    """State of the conversion saved into the work folder"""
+
+    version: int = CHECKPOINT_VERSION
+    format: str = ""
+    # Size and modification time of the source file, [bytes], [ns]
+    source_size: int = 0
+    source_mtime: int = 0
+    # Offset of the end of the last printed message, [bytes]
+    offset: int = 0
+    # Framer state: unprocessed bytes after the offset (hex), flags
+    tail: str = ""
+    synchronized: bool = False
+    skipped: bool = False
+    statistics: dict = field(default_factory=dict)
+    # Lengths of output files: {path relative to the work folder: bytes}
+    files: dict = field(default_factory=dict)
+
+
+def can_checkpoint(output_format: str, out_ctrls: OutputControls) -> bool:
+    """Check whether outputs of the conversion can be continued"""
+    return output_format in RESUMABLE_FORMATS and out_ctrls.compression == "none"
+
+
+def checkpoint_path(wfld: str) -> str:
+    """Make path to the checkpoint of the work folder"""
+    return os.path.join(wfld, CHECKPOINT_NAME)
+
+
+def output_files(wfld: str, exclude: tuple[str, ...] = ()) -> list[str]:
+    """List output files of the work folder. Hidden files and 'exclude' paths
+    (e.g. log file) are skipped. Paths are relative to the work folder."""
+
+    skip = {os.path.normpath(path) for path in exclude}
+    rv = []
+    for root, dirs, files in os.walk(wfld):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name.startswith(".") or os.path.normpath(path) in skip:
+                continue
+            rv.append(os.path.relpath(path, wfld))
+    return rv
+
+
+class Checkpointer:
+    """Saves checkpoints of conversion of 'fpath' into the work folder 'wfld' every
+    'interval' bytes of the source, continues interrupted conversion.
+    'exclude' - files of the work folder which are not outputs of printers."""
+
+    def __init__(
+        self,
+        wfld: str,
+        fpath: str,
+        output_format: str,
+        interval: int,
+        exclude: tuple[str, ...] = (),
+    ) -> None:
+        self.wfld = wfld
+        self.fpath = fpath
+        self.format = output_format
+        self.interval = interval
+        self.exclude = exclude
+        # Checkpoint the conversion has been resumed from
+        self.resumed: Checkpoint | None = None
+        self.saved: int = 0
+        self.__next = interval
+
+    @property
+    def path(self) -> str:
+        """Path to the checkpoint"""
+        return checkpoint_path(self.wfld)
+
+    def due(self, position: int) -> bool:
+        """Check whether checkpoint shall be saved at 'position' of the source"""
+        return 0 < self.interval and self.__next <= position
+
+    def save(self, converter: ConverterInterface, position: int) -> None:
+        """Save checkpoint. 'position' - number of source bytes passed to the framer
+        of the 'converter', all extracted messages are printed."""
+
+        converter.sync()
+        tail, synchronized, skipped = converter.framer_state()
+        st = os.stat(self.fpath)
+        ckpt = Checkpoint(
+            format=self.format,
+            source_size=st.st_size,
+            source_mtime=st.st_mtime_ns,
+            offset=position - len(tail),
+            tail=bytes(tail).hex(),
+            synchronized=synchronized,
+            skipped=skipped,
+            statistics=asdict(converter.get_statistics()),
+        )
+
+        self.__next = position + self.interval
+        tmp = self.path + ".tmp"
+        try:
+            for rel in output_files(self.wfld, self.exclude):
+                ckpt.files[rel] = os.path.getsize(os.path.join(self.wfld, rel))
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(asdict(ckpt), f, indent=1)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as oe:
+            logger.error(f"Checkpoint wasn't saved. {type(oe)}: {oe}")
+            return
+
+        self.saved += 1
+        logger.info(f"Checkpoint saved at {ckpt.offset} bytes of the source.")
+
+    def load(self) -> Checkpoint:
+        """Load checkpoint of the work folder.
+        Raises CheckpointError if it doesn't match the source or format."""
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                ckpt = Checkpoint(**json.load(f))
+        except (OSError, TypeError, json.JSONDecodeError) as ex:
+            raise CheckpointError(f"Checkpoint is unreadable. {type(ex)}: {ex}") from ex
+
+        st = os.stat(self.fpath)
+        if ckpt.version != CHECKPOINT_VERSION:
+            raise CheckpointError(f"Unsupported checkpoint version {ckpt.version}.")
+        if ckpt.format != self.format:
+            raise CheckpointError(f"Checkpoint of {ckpt.format} format.")
+        if ckpt.source_size != st.st_size or ckpt.source_mtime != st.st_mtime_ns:
+            raise CheckpointError("Source file was modified after the checkpoint.")
+        return ckpt
+
+    def __restore_outputs(self, ckpt: Checkpoint) -> list[str]:
+        """Truncate output files to their lengths at the checkpoint, delete files
+        created after the checkpoint. Return paths of the remaining files."""
+
+        paths = []
+        for rel, length in ckpt.files.items():
+            path = os.path.join(self.wfld, rel)
+            if not os.path.isfile(path):
+                raise CheckpointError(f"Output file '{rel}' is missing.")
+            if os.path.getsize(path) < length:
+                raise CheckpointError(
+                    f"Output file '{rel}' is shorter than at the checkpoint."
+                )
+            paths.append(path)
+
+        for path, length in zip(paths, ckpt.files.values()):
+            os.truncate(path, length)
+        for rel in output_files(self.wfld, self.exclude):
+            if rel not in ckpt.files:
+                os.remove(os.path.join(self.wfld, rel))
+        return paths
+
+    def resume(self, converter: ConverterInterface, mapped: bool) -> int:
+        """Restore output files and state of the 'converter' saved in the checkpoint.
+        Return offset the source shall be read from: messages of the 'mapped' source
+        are extracted from the checkpoint offset, framer tail follows the offset
+        otherwise. Raises CheckpointError if the conversion can't be resumed."""
+
+        ckpt = self.load()
+        outputs = self.__restore_outputs(ckpt)
+        tail = b"" if mapped else bytes.fromhex(ckpt.tail)
+        stat = ConverterStatistics(**ckpt.statistics)
+        if not converter.resume((tail, ckpt.synchronized, ckpt.skipped), stat, outputs):
+            raise CheckpointError("Output files can't be continued by printers.")
+
+        self.resumed = ckpt
+        self.__next = ckpt.offset + self.interval
+        logger.info(
+            f"Conversion resumed at {ckpt.offset} bytes of the source, "
+            + f"{len(outputs)} output files continued."
+        )
+        return ckpt.offset + len(tail)
+
+    def remove(self) -> None:
+        """Delete checkpoint of finished conversion"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -10,14 +10,40 @@
 from configparser import ConfigParser
 from printers import MargoControls
 from printers import JSONControls
+from printers import OutputControls
+from printers.file_pool import COMPRESSION_EXT, FLUSH_MODES
+from printers import ParquetControls
+from printers import SQLiteControls
+from printers import RinexControls
+from sources import InputControls
+from sources import StreamControls
+from sources import IngestControls
 
 
 class BoxWithConverterControls:
     """Container for summary of converter controls"""
 
-    def __init__(self, inMARGO: MargoControls, inJSON: JSONControls) -> None:
+    def __init__(
+        self,
+        inMARGO: MargoControls,
+        inJSON: JSONControls,
+        inOUTPUT: OutputControls,
+        inPARQUET: ParquetControls,
+        inSQLITE: SQLiteControls,
+        inRINEX: RinexControls,
+        inINPUT: InputControls,
+        inSTREAM: StreamControls,
+        inINGEST: IngestControls,
+    ) -> None:
         self.__MARGO = inMARGO
         self.__JSON = inJSON
+        self.__OUTPUT = inOUTPUT
+        self.__PARQUET = inPARQUET
+        self.__SQLITE = inSQLITE
+        self.__RINEX = inRINEX
+        self.__INPUT = inINPUT
+        self.__STREAM = inSTREAM
+        self.__INGEST = inINGEST
 
     @property
     def MARGO(self) -> MargoControls:
@@ -29,6 +55,41 @@ class BoxWithConverterControls:
         """Get JSON properties."""
         return self.__JSON
 
+    @property
+    def OUTPUT(self) -> OutputControls:
+        """Get output files properties."""
+        return self.__OUTPUT
+
+    @property
+    def PARQUET(self) -> ParquetControls:
+        """Get Parquet properties."""
+        return self.__PARQUET
+
+    @property
+    def SQLITE(self) -> SQLiteControls:
+        """Get SQLite properties."""
+        return self.__SQLITE
+
+    @property
+    def RINEX(self) -> RinexControls:
+        """Get RINEX properties."""
+        return self.__RINEX
+
+    @property
+    def INPUT(self) -> InputControls:
+        """Get source files reading properties."""
+        return self.__INPUT
+
+    @property
+    def STREAM(self) -> StreamControls:
+        """Get network streams properties."""
+        return self.__STREAM
+
+    @property
+    def INGEST(self) -> IngestControls:
+        """Get ingest server properties."""
+        return self.__INGEST
+
 
 class ConverterControls:
     """Controls manager."""
@@ -36,10 +97,24 @@ class ConverterControls:
     def __init__(self) -> None:
         self.__MARGO = MargoControls()
         self.__JSON = JSONControls()
+        self.__OUTPUT = OutputControls()
+        self.__PARQUET = ParquetControls()
+        self.__SQLITE = SQLiteControls()
+        self.__RINEX = RinexControls()
+        self.__INPUT = InputControls()
+        self.__STREAM = StreamControls()
+        self.__INGEST = IngestControls()
         self.__ini = ConfigParser()
         self.__ini_ok = False
         self.__MARGO_ok = False
         self.__JSON_ok = False
+        self.__OUTPUT_ok = False
+        self.__PARQUET_ok = False
+        self.__SQLITE_ok = False
+        self.__RINEX_ok = False
+        self.__INPUT_ok = False
+        self.__STREAM_ok = False
+        self.__INGEST_ok = False
 
     def _read_ini(self, ini_file: str) -> bool:
         """Read *ini file. Return true if there is something in it."""
@@ -89,6 +164,10 @@ class ConverterControls:
         if res.gps_utc_shift is None:
             return False
 
+        res.gps_week = self.__ini["TIME"].getint("GPS_WEEK")
+        if res.gps_week is None or res.gps_week < 0:
+            return False
+
         res.half_cycle_enable = self.__ini["MARGO"].getboolean("HCA")
         if res.half_cycle_enable is None:
             return False
@@ -122,15 +201,235 @@ class ConverterControls:
         if res.enable_pretty_view is None:
             return False
 
+        res.enable_fast_serializer = self.__ini["JSON"].getboolean("FAST_SERIALIZER")
+        if res.enable_fast_serializer is None:
+            return False
+
+        res.float_precision = self.__ini["JSON"].getint("FLOAT_PRECISION")
+        if res.float_precision is None:
+            return False
+
         self.__JSON = res
         return True
 
+    def _make_OUTPUT(self) -> bool:
+        """Compose controls for output files management"""
+        if not self.__ini_ok:
+            return False
+
+        if "OUTPUT" not in self.__ini.sections():
+            return False
+
+        res = OutputControls()
+
+        res.max_open_files = self.__ini["OUTPUT"].getint("MAX_OPEN_FILES")
+        if res.max_open_files is None or res.max_open_files < 1:
+            return False
+
+        res.write_buffer = self.__ini["OUTPUT"].getint("WRITE_BUFFER")
+        if res.write_buffer is None or res.write_buffer < 0:
+            return False
+
+        res.writer_thread = self.__ini["OUTPUT"].getboolean("WRITER_THREAD")
+        if res.writer_thread is None:
+            return False
+
+        res.writer_queue = self.__ini["OUTPUT"].getint("WRITER_QUEUE")
+        if res.writer_queue is None or res.writer_queue < 1:
+            return False
+
+        res.compression = self.__ini["OUTPUT"].get("COMPRESSION")
+        if res.compression not in COMPRESSION_EXT:
+            return False
+
+        res.compression_level = self.__ini["OUTPUT"].getint("COMPRESSION_LEVEL")
+        if res.compression_level is None:
+            return False
+
+        res.flush = self.__ini["OUTPUT"].get("FLUSH")
+        if res.flush not in FLUSH_MODES:
+            return False
+
+        self.__OUTPUT = res
+        return True
+
+    def _make_PARQUET(self) -> bool:
+        """Compose controls for Parquet printer"""
+        if not self.__ini_ok:
+            return False
+
+        if "PARQUET" not in self.__ini.sections():
+            return False
+
+        res = ParquetControls()
+
+        res.batch_epochs = self.__ini["PARQUET"].getint("BATCH_EPOCHS")
+        if res.batch_epochs is None or res.batch_epochs < 1:
+            return False
+
+        res.compression = self.__ini["PARQUET"].get("COMPRESSION")
+        if res.compression is None:
+            return False
+
+        self.__PARQUET = res
+        return True
+
+    def _make_SQLITE(self) -> bool:
+        """Compose controls for SQLite printer"""
+        if not self.__ini_ok:
+            return False
+
+        if "SQLITE" not in self.__ini.sections():
+            return False
+
+        res = SQLiteControls()
+
+        res.batch_rows = self.__ini["SQLITE"].getint("BATCH_ROWS")
+        if res.batch_rows is None or res.batch_rows < 1:
+            return False
+
+        res.wal_enable = self.__ini["SQLITE"].getboolean("WAL")
+        if res.wal_enable is None:
+            return False
+
+        self.__SQLITE = res
+        return True
+
+    def _make_RINEX(self) -> bool:
+        """Compose controls for RINEX printer"""
+        if not self.__ini_ok:
+            return False
+
+        if "RINEX" not in self.__ini.sections():
+            return False
+
+        res = RinexControls()
+
+        res.marker_name = self.__ini["RINEX"].get("MARKER_NAME", "")
+        res.observer = self.__ini["RINEX"].get("OBSERVER", "")
+        res.agency = self.__ini["RINEX"].get("AGENCY", "")
+
+        self.__RINEX = res
+        return True
+
+    def _make_INPUT(self) -> bool:
+        """Compose controls for source files reading"""
+        if not self.__ini_ok:
+            return False
+
+        if "INPUT" not in self.__ini.sections():
+            return False
+
+        res = InputControls()
+
+        res.read_size_min = self.__ini["INPUT"].getint("READ_SIZE_MIN")
+        if res.read_size_min is None or res.read_size_min < 1:
+            return False
+
+        res.read_size_max = self.__ini["INPUT"].getint("READ_SIZE_MAX")
+        if res.read_size_max is None or res.read_size_max < res.read_size_min:
+            return False
+
+        res.progress_interval = self.__ini["INPUT"].getfloat("PROGRESS_INTERVAL")
+        if res.progress_interval is None or res.progress_interval < 0:
+            return False
+
+        res.progress_step = self.__ini["INPUT"].getfloat("PROGRESS_STEP")
+        if res.progress_step is None or res.progress_step < 0:
+            return False
+
+        res.checkpoint_interval = self.__ini["INPUT"].getint("CHECKPOINT_INTERVAL")
+        if res.checkpoint_interval is None or res.checkpoint_interval < 0:
+            return False
+
+        res.follow_poll_min = self.__ini["INPUT"].getfloat("FOLLOW_POLL_MIN")
+        if res.follow_poll_min is None or res.follow_poll_min <= 0:
+            return False
+
+        res.follow_poll_max = self.__ini["INPUT"].getfloat("FOLLOW_POLL_MAX")
+        if res.follow_poll_max is None or res.follow_poll_max < res.follow_poll_min:
+            return False
+
+        self.__INPUT = res
+        return True
+
+    def _make_STREAM(self) -> bool:
+        """Compose controls for network streams reading"""
+        if not self.__ini_ok:
+            return False
+
+        if "STREAM" not in self.__ini.sections():
+            return False
+
+        res = StreamControls()
+
+        res.reconnect_min = self.__ini["STREAM"].getfloat("RECONNECT_MIN")
+        if res.reconnect_min is None or res.reconnect_min < 0:
+            return False
+
+        res.reconnect_max = self.__ini["STREAM"].getfloat("RECONNECT_MAX")
+        if res.reconnect_max is None or res.reconnect_max < res.reconnect_min:
+            return False
+
+        res.idle_timeout = self.__ini["STREAM"].getfloat("IDLE_TIMEOUT")
+        if res.idle_timeout is None or res.idle_timeout < 0:
+            return False
+
+        res.max_retries = self.__ini["STREAM"].getint("MAX_RETRIES")
+        if res.max_retries is None:
+            return False
+
+        self.__STREAM = res
+        return True
+
+    def _make_INGEST(self) -> bool:
+        """Compose controls for multi-stream ingest server"""
+        if not self.__ini_ok:
+            return False
+
+        if "INGEST" not in self.__ini.sections():
+            return False
+
+        res = IngestControls()
+
+        res.batch_frames = self.__ini["INGEST"].getint("BATCH_FRAMES")
+        if res.batch_frames is None or res.batch_frames < 1:
+            return False
+
+        res.batch_delay = self.__ini["INGEST"].getfloat("BATCH_DELAY")
+        if res.batch_delay is None or res.batch_delay < 0:
+            return False
+
+        res.max_pending_frames = self.__ini["INGEST"].getint("MAX_PENDING_FRAMES")
+        if res.max_pending_frames is None or res.max_pending_frames < 1:
+            return False
+
+        res.max_open_files = self.__ini["INGEST"].getint("MAX_OPEN_FILES")
+        if res.max_open_files is None or res.max_open_files < 1:
+            return False
+
+        res.password = self.__ini["INGEST"].get("PASSWORD", "")
+
+        res.stats_interval = self.__ini["INGEST"].getfloat("STATS_INTERVAL")
+        if res.stats_interval is None or res.stats_interval <= 0:
+            return False
+
+        self.__INGEST = res
+        return True
+
     def init_from_file(self, ini_file: str):
         """Update controls from *.ini file"""
         self.__ini_ok = self._read_ini(ini_file)
         if self.__ini_ok:
             self.__MARGO_ok = self._make_MARGO()
             self.__JSON_ok = self._make_JSON()
+            self.__OUTPUT_ok = self._make_OUTPUT()
+            self.__PARQUET_ok = self._make_PARQUET()
+            self.__SQLITE_ok = self._make_SQLITE()
+            self.__RINEX_ok = self._make_RINEX()
+            self.__INPUT_ok = self._make_INPUT()
+            self.__STREAM_ok = self._make_STREAM()
+            self.__INGEST_ok = self._make_INGEST()
 
     def update_from_file(self, ini_file: str):
         """Update controls from *.ini file"""
@@ -148,6 +447,27 @@ class ConverterControls:
         if self.__JSON_ok:
             self._make_JSON()
 
+        if self.__OUTPUT_ok:
+            self._make_OUTPUT()
+
+        if self.__PARQUET_ok:
+            self._make_PARQUET()
+
+        if self.__SQLITE_ok:
+            self._make_SQLITE()
+
+        if self.__RINEX_ok:
+            self._make_RINEX()
+
+        if self.__INPUT_ok:
+            self._make_INPUT()
+
+        if self.__STREAM_ok:
+            self._make_STREAM()
+
+        if self.__INGEST_ok:
+            self._make_INGEST()
+
     @property
     def MARGO(self) -> MargoControls | None:
         """Get MARGO properties."""
@@ -158,10 +478,65 @@ class ConverterControls:
         """Get JSON properties."""
         return self.__JSON if self.__JSON_ok else None
 
+    @property
+    def OUTPUT(self) -> OutputControls | None:
+        """Get output files properties."""
+        return self.__OUTPUT if self.__OUTPUT_ok else None
+
+    @property
+    def PARQUET(self) -> ParquetControls | None:
+        """Get Parquet properties."""
+        return self.__PARQUET if self.__PARQUET_ok else None
+
+    @property
+    def SQLITE(self) -> SQLiteControls | None:
+        """Get SQLite properties."""
+        return self.__SQLITE if self.__SQLITE_ok else None
+
+    @property
+    def RINEX(self) -> RinexControls | None:
+        """Get RINEX properties."""
+        return self.__RINEX if self.__RINEX_ok else None
+
+    @property
+    def INPUT(self) -> InputControls | None:
+        """Get source files reading properties."""
+        return self.__INPUT if self.__INPUT_ok else None
+
+    @property
+    def STREAM(self) -> StreamControls | None:
+        """Get network streams properties."""
+        return self.__STREAM if self.__STREAM_ok else None
+
+    @property
+    def INGEST(self) -> IngestControls | None:
+        """Get ingest server properties."""
+        return self.__INGEST if self.__INGEST_ok else None
+
     @property
     def boxed_controls(self) -> BoxWithConverterControls | None:
         """Get Converter properties."""
-        if self.__JSON_ok and self.__MARGO_ok:
-            return BoxWithConverterControls(self.__MARGO, self.__JSON)
+        if (
+            self.__JSON_ok
+            and self.__MARGO_ok
+            and self.__OUTPUT_ok
+            and self.__PARQUET_ok
+            and self.__SQLITE_ok
+            and self.__RINEX_ok
+            and self.__INPUT_ok
+            and self.__STREAM_ok
+            and self.__INGEST_ok
+        ):
+            return BoxWithConverterControls(
+                self.__MARGO,
+                self.__JSON,
+                self.__OUTPUT,
+                self.__PARQUET,
+                self.__SQLITE,
+                self.__RINEX,
+                self.__INPUT,
+                self.__STREAM,
+                self.__INGEST,
+            )
         else:
             return None
@@ -33,6 +33,11 @@
 # - 'MARGO'[^1] - converts data from MSM messages into textual CSV files.
 # - 'JSON'  - converts data from MSM messages into textual JSON files.
 # - 'JSON-B' - extracts bare (integer, not scaled) data from MSM messages and saves in JSON format.
+# - 'JSONL', 'JSONL-B' - same as 'JSON' and 'JSON-B', but one JSON record per line (JSON Lines).
+# - 'NPY' - converts data from MSM messages into binary NumPy arrays with MARGO layout.
+# - 'PARQUET' - converts MSM, ephemerids and base station data into partitioned Parquet tables.
+# - 'SQLITE' - converts MSM, ephemerids and base station data into SQLite database.
+# - 'RINEX' - converts data from MSM messages into RINEX 3.05 observation file.
 
 # How to extend converter functionality.
 # - Develope new intermediate data class if required. See gnss_types\observables.py to check existing
@@ -57,16 +62,17 @@ from abc import ABC, abstractmethod
 
 from controls import BoxWithConverterControls
 from decoder_top import DecoderTop
-from sub_decoders import (
-    SubdecoderMSM4567,
-    SubdecoderMSM123,
-    SubdecoderEph,
-    SubdecoderBaseStationData,
-)
+from rtcm_api import make_decoder, DECODER_SUBSETS, MSM_SUBSETS
 
 from printer_top import PrinterTop
 from printers import PrintMARGO as MargoPrinter
 from printers import PrintJSON as JsonPrinter
+from printers import PrintNPY as NpyPrinter
+from printers import PrintParquet as ParquetPrinter
+from printers import PrintSQLite as SQLitePrinter
+from printers import PrintRINEX as RinexPrinter
+
+from logger import LOGGER_CF as logger
 
 
 @dataclass
@@ -79,6 +85,14 @@ class ConverterStatistics:
     printing_attempts: int = 0
     printing_errors: int = 0
 
+    def accumulate(self, other: "ConverterStatistics") -> None:
+        """Add statistics of another conversion"""
+        self.decoding_attempts += other.decoding_attempts
+        self.parsing_errors += other.parsing_errors
+        self.decoding_errors += other.decoding_errors
+        self.printing_attempts += other.printing_attempts
+        self.printing_errors += other.printing_errors
+
 
 class ConverterInterface(ABC):
     """Defines protocol for RTCM decoder instance."""
@@ -87,6 +101,14 @@ class ConverterInterface(ABC):
     def parse_bytes(self, buf: bytes) -> list[bytes]:
         """Extract RTCM messages from input bytes"""
 
+    @abstractmethod
+    def parse_buffer(
+        self, buf, start: int, end: int, stop: int | None = None
+    ) -> tuple[list[memoryview], int]:
+        """Extract RTCM messages from buf[start:end] in place. Messages starting
+        at or after 'stop' are not extracted.
+        Return messages and offset of the first unprocessed byte."""
+
     @abstractmethod
     def decode(self, message: bytes) -> object | None:
         """Process RTCM message in accordance with instance rules."""
@@ -95,6 +117,37 @@ class ConverterInterface(ABC):
     def print(self, rtcm_data: object) -> None:
         """Save 'rtcm_data' content in accordance with instance rules."""
 
+    @abstractmethod
+    def flush(self) -> None:
+        """Write printed data to output files without closing them."""
+
+    @abstractmethod
+    def sync(self) -> None:
+        """Write printed data to output files, wait until they are written."""
+
+    @abstractmethod
+    def framer_state(self) -> tuple[bytes, bool, bool]:
+        """Return state of RTCM messages extraction, see DecoderTop.framer_state()."""
+
+    @abstractmethod
+    def reset_framer(self) -> None:
+        """Drop unprocessed bytes of the source, e.g. when the source is replaced."""
+
+    @abstractmethod
+    def count_parse_errors(self, errors: int) -> None:
+        """Account parsing errors of messages extracted without the framer."""
+
+    @abstractmethod
+    def resume(
+        self,
+        framer: tuple[bytes, bool, bool],
+        stat: ConverterStatistics,
+        outputs: list[str],
+    ) -> bool:
+        """Restore state and statistics of interrupted conversion. Printed data are
+        appended to existing output files 'outputs'.
+        Return False if output files can't be continued."""
+
     @abstractmethod
     def release(self) -> None:
         """Release converter resources if any."""
@@ -107,19 +160,50 @@ class ConverterInterface(ABC):
 class Converter(ConverterInterface):
     """Aggredates Decoder and Printer and implements conversion function."""
 
-    def __init__(self) -> None:
-        self.decoder = DecoderTop()
+    def __init__(self, decoder: DecoderTop | None = None) -> None:
+        self.decoder = DecoderTop() if decoder is None else decoder
         self.printer = PrinterTop()
 
     def parse_bytes(self, buf: bytes) -> list[bytes]:
         return self.decoder.catch_message(buf)
 
+    def parse_buffer(
+        self, buf, start: int, end: int, stop: int | None = None
+    ) -> tuple[list[memoryview], int]:
+        return self.decoder.catch_frames(buf, start, end, stop)
+
     def decode(self, message: bytes) -> object:
         return self.decoder.decode(message)
 
     def print(self, rtcm_data) -> None:
         self.printer.print(rtcm_data)
 
+    def flush(self) -> None:
+        self.printer.flush()
+
+    def sync(self) -> None:
+        self.printer.sync()
+
+    def framer_state(self) -> tuple[bytes, bool, bool]:
+        return self.decoder.framer_state()
+
+    def reset_framer(self) -> None:
+        self.decoder.reset_framer()
+
+    def count_parse_errors(self, errors: int) -> None:
+        self.decoder.count_parse_errors(errors)
+
+    def resume(
+        self,
+        framer: tuple[bytes, bool, bool],
+        stat: ConverterStatistics,
+        outputs: list[str],
+    ) -> bool:
+        self.decoder.restore(
+            framer, stat.parsing_errors, stat.decoding_attempts, stat.decoding_errors
+        )
+        return self.printer.resume(outputs, stat.printing_attempts, stat.printing_errors)
+
     def release(self) -> None:
         self.printer.close()
 
@@ -137,18 +221,14 @@ def strategy_MSM17toMARGO(
     wfld: str, controls: BoxWithConverterControls
 ) -> ConverterInterface | None:
     """Converts MSM 1..7 to MARGO"""
-    conv = Converter()
-    # Implement and register decoders
-    msm123 = SubdecoderMSM123(bare_data=False)
-    msm4567 = SubdecoderMSM4567(bare_data=False)
-    if not conv.decoder.register_decoder(msm4567.io):
-        return None
-    if not conv.decoder.register_decoder(msm123.io):
+    decoder = make_decoder(bare_data=False, subsets=MSM_SUBSETS)
+    if decoder is None:
         return None
+    conv = Converter(decoder)
 
     # Implement and register printers
     conv.printer.format = "MARGO"
-    msm_to_margo = MargoPrinter(wfld, controls.MARGO)
+    msm_to_margo = MargoPrinter(wfld, controls.MARGO, "MARGO", controls.OUTPUT)
     if not conv.printer.add_subprinter(msm_to_margo.io):
         return None
 
@@ -164,25 +244,14 @@ def strategy_MSM17_EPH_BASE_to_JSON(
             and Base Station Data messages
     to JSON."""
 
-    conv = Converter()
-    # Implement and register decoders
-    msm123 = SubdecoderMSM123(bare_data=False)
-    msm4567 = SubdecoderMSM4567(bare_data=False)
-    eph = SubdecoderEph(bare_data=False)
-    base = SubdecoderBaseStationData(bare_data=False)
-
-    if not conv.decoder.register_decoder(msm4567.io):
-        return None
-    if not conv.decoder.register_decoder(msm123.io):
-        return None
-    if not conv.decoder.register_decoder(eph.io):
-        return None
-    if not conv.decoder.register_decoder(base.io):
+    decoder = make_decoder(bare_data=False, subsets=DECODER_SUBSETS)
+    if decoder is None:
         return None
+    conv = Converter(decoder)
 
     # Implement and register printers
     conv.printer.format = "JSON"
-    msm_to_json = JsonPrinter(wfld, controls.JSON)
+    msm_to_json = JsonPrinter(wfld, controls.JSON, "JSON", controls.OUTPUT)
     if not conv.printer.add_subprinter(msm_to_json.io):
         return None
 
@@ -198,25 +267,14 @@ def strategy_MSM17_EPH_BASE_to_JSON_BareData(
             and Base Station Data messages
     to JSON-B (bare RTCM3 values without scaling)"""
 
-    conv = Converter()
-    # Implement and register decoders
-    msm123 = SubdecoderMSM123(bare_data=True)
-    msm4567 = SubdecoderMSM4567(bare_data=True)
-    eph = SubdecoderEph(bare_data=True)
-    base = SubdecoderBaseStationData(bare_data=True)
-
-    if not conv.decoder.register_decoder(msm4567.io):
-        return None
-    if not conv.decoder.register_decoder(msm123.io):
-        return None
-    if not conv.decoder.register_decoder(eph.io):
-        return None
-    if not conv.decoder.register_decoder(base.io):
+    decoder = make_decoder(bare_data=True, subsets=DECODER_SUBSETS)
+    if decoder is None:
         return None
+    conv = Converter(decoder)
 
     # Implement and register printers
     conv.printer.format = "JSON"  # not JSON-B, no such printer
-    msm_to_json = JsonPrinter(wfld, controls.JSON)
+    msm_to_json = JsonPrinter(wfld, controls.JSON, "JSON", controls.OUTPUT)
     if not conv.printer.add_subprinter(msm_to_json.io):
         return None
 
@@ -232,34 +290,183 @@ def strategy_RTCM3_to_JARGO(
       to JSON.
     """
 
-    conv = Converter()
-    # Implement and register decoders
-    msm123 = SubdecoderMSM123(bare_data=False)
-    msm4567 = SubdecoderMSM4567(bare_data=False)
-    eph = SubdecoderEph(bare_data=False)
-    base = SubdecoderBaseStationData(bare_data=False)
+    decoder = make_decoder(bare_data=False, subsets=DECODER_SUBSETS)
+    if decoder is None:
+        return None
+    conv = Converter(decoder)
 
-    if not conv.decoder.register_decoder(msm4567.io):
+    # Implement and register printers
+    conv.printer.format = "JARGO"
+    rtcm3_to_json = JsonPrinter(wfld, controls.JSON, "JARGO", controls.OUTPUT)
+    if not conv.printer.add_subprinter(rtcm3_to_json.io):
         return None
-    if not conv.decoder.register_decoder(msm123.io):
+    rtcm3_to_margo = MargoPrinter(wfld, controls.MARGO, "MARGO", controls.OUTPUT)
+    if not conv.printer.add_subprinter(rtcm3_to_margo.io):
         return None
-    if not conv.decoder.register_decoder(eph.io):
+
+    return conv
+
+
+def strategy_MSM17_EPH_BASE_to_JSONL(
+    wfld: str, controls: BoxWithConverterControls
+) -> ConverterInterface | None:
+    """Converts
+            MSM 1..7,
+            ephemerids,
+            and Base Station Data messages
+    to JSON Lines (one JSON record per line)."""
+
+    decoder = make_decoder(bare_data=False, subsets=DECODER_SUBSETS)
+    if decoder is None:
         return None
-    if not conv.decoder.register_decoder(base.io):
+    conv = Converter(decoder)
+
+    # Implement and register printers
+    conv.printer.format = "JSONL"
+    msm_to_json = JsonPrinter(wfld, controls.JSON, "JSONL", controls.OUTPUT)
+    if not conv.printer.add_subprinter(msm_to_json.io):
+        return None
+
+    return conv
+
+
+def strategy_MSM17_EPH_BASE_to_JSONL_BareData(
+    wfld: str, controls: BoxWithConverterControls
+) -> ConverterInterface | None:
+    """Converts
+            MSM 1..7,
+            ephemerids,
+            and Base Station Data messages
+    to JSONL-B (bare RTCM3 values without scaling, one JSON record per line)"""
+
+    decoder = make_decoder(bare_data=True, subsets=DECODER_SUBSETS)
+    if decoder is None:
         return None
+    conv = Converter(decoder)
 
     # Implement and register printers
-    conv.printer.format = "JARGO"
-    rtcm3_to_json = JsonPrinter(wfld, controls.JSON, "JARGO")
+    conv.printer.format = "JSONL"  # not JSONL-B, no such printer
+    msm_to_json = JsonPrinter(wfld, controls.JSON, "JSONL", controls.OUTPUT)
+    if not conv.printer.add_subprinter(msm_to_json.io):
+        return None
+
+    return conv
+
+
+def strategy_RTCM3_to_JARGO_L(
+    wfld: str, controls: BoxWithConverterControls
+) -> ConverterInterface | None:
+    """Converts:
+    - MSM 1..7 to MARGO;
+    - Ephemerids and Base Station Data messages
+      to JSON Lines.
+    """
+
+    decoder = make_decoder(bare_data=False, subsets=DECODER_SUBSETS)
+    if decoder is None:
+        return None
+    conv = Converter(decoder)
+
+    # Implement and register printers
+    conv.printer.format = "JARGO-L"
+    rtcm3_to_json = JsonPrinter(wfld, controls.JSON, "JARGO-L", controls.OUTPUT)
     if not conv.printer.add_subprinter(rtcm3_to_json.io):
         return None
-    rtcm3_to_margo = MargoPrinter(wfld, controls.MARGO, "MARGO")
+    rtcm3_to_margo = MargoPrinter(wfld, controls.MARGO, "MARGO", controls.OUTPUT)
     if not conv.printer.add_subprinter(rtcm3_to_margo.io):
         return None
 
     return conv
 
 
+def strategy_MSM17toNPY(
+    wfld: str, controls: BoxWithConverterControls
+) -> ConverterInterface | None:
+    """Converts MSM 1..7 to NPY"""
+    decoder = make_decoder(bare_data=False, subsets=MSM_SUBSETS)
+    if decoder is None:
+        return None
+    conv = Converter(decoder)
+
+    # Implement and register printers
+    conv.printer.format = "NPY"
+    msm_to_npy = NpyPrinter(wfld, controls.MARGO, "NPY", controls.OUTPUT)
+    if not conv.printer.add_subprinter(msm_to_npy.io):
+        return None
+
+    return conv
+
+
+def strategy_RTCM3_to_PARQUET(
+    wfld: str, controls: BoxWithConverterControls
+) -> ConverterInterface | None:
+    """Converts
+            MSM 1..7,
+            ephemerids,
+            and Base Station Data messages
+    to Parquet tables."""
+
+    if not ParquetPrinter.available():
+        logger.error("Package 'pyarrow' is required to make Parquet files.")
+        return None
+
+    decoder = make_decoder(bare_data=False, subsets=DECODER_SUBSETS)
+    if decoder is None:
+        return None
+    conv = Converter(decoder)
+
+    # Implement and register printers
+    conv.printer.format = "PARQUET"
+    rtcm3_to_pq = ParquetPrinter(wfld, controls.PARQUET, "PARQUET", controls.MARGO)
+    if not conv.printer.add_subprinter(rtcm3_to_pq.io):
+        return None
+
+    return conv
+
+
+def strategy_RTCM3_to_SQLITE(
+    wfld: str, controls: BoxWithConverterControls
+) -> ConverterInterface | None:
+    """Converts
+            MSM 1..7,
+            ephemerids,
+            and Base Station Data messages
+    to SQLite database."""
+
+    decoder = make_decoder(bare_data=False, subsets=DECODER_SUBSETS)
+    if decoder is None:
+        return None
+    conv = Converter(decoder)
+
+    # Implement and register printers
+    conv.printer.format = "SQLITE"
+    rtcm3_to_db = SQLitePrinter(wfld, controls.SQLITE, "SQLITE", controls.MARGO)
+    if not conv.printer.add_subprinter(rtcm3_to_db.io):
+        return None
+
+    return conv
+
+
+def strategy_MSM17toRINEX(
+    wfld: str, controls: BoxWithConverterControls
+) -> ConverterInterface | None:
+    """Converts MSM 1..7 to RINEX 3 observation file"""
+    decoder = make_decoder(bare_data=False, subsets=MSM_SUBSETS)
+    if decoder is None:
+        return None
+    conv = Converter(decoder)
+
+    # Implement and register printers
+    conv.printer.format = "RINEX"
+    msm_to_rnx = RinexPrinter(
+        wfld, controls.RINEX, "RINEX", controls.MARGO, controls.OUTPUT
+    )
+    if not conv.printer.add_subprinter(msm_to_rnx.io):
+        return None
+
+    return conv
+
+
 class ConverterFactory:
     """Return an instance of converter with predefined properties.
 
@@ -267,7 +474,14 @@ class ConverterFactory:
     - 'MARGO'
     - 'JSON'
     - 'JSON-B'
-    - 'JARGO'.
+    - 'JARGO'
+    - 'JSONL'
+    - 'JSONL-B'
+    - 'JARGO-L'
+    - 'NPY'
+    - 'PARQUET'
+    - 'SQLITE'
+    - 'RINEX'.
     """
 
     __FACTORY = {
@@ -275,11 +489,20 @@ class ConverterFactory:
         "JSON": strategy_MSM17_EPH_BASE_to_JSON,
         "JSON-B": strategy_MSM17_EPH_BASE_to_JSON_BareData,
         "JARGO": strategy_RTCM3_to_JARGO,
+        "JSONL": strategy_MSM17_EPH_BASE_to_JSONL,
+        "JSONL-B": strategy_MSM17_EPH_BASE_to_JSONL_BareData,
+        "JARGO-L": strategy_RTCM3_to_JARGO_L,
+        "NPY": strategy_MSM17toNPY,
+        "PARQUET": strategy_RTCM3_to_PARQUET,
+        "SQLITE": strategy_RTCM3_to_SQLITE,
+        "RINEX": strategy_MSM17toRINEX,
     }
 
     def __init__(self, mode: str = "MARGO") -> None:
         """Factory creating RTCM converter.
-        Choose one of available formats: 'MARGO', 'JSON', 'JSON-B'.
+        Choose one of available formats: 'MARGO', 'JSON', 'JSON-B', 'JARGO',
+        'JSONL', 'JSONL-B', 'JARGO-L', 'NPY', 'PARQUET',
+        'SQLITE', 'RINEX'.
         """
         self.__f = self.__FACTORY.get(mode)
         if not self.__f:
@@ -289,4 +512,7 @@ class ConverterFactory:
         self, wfld: str, controls: BoxWithConverterControls
     ) -> ConverterInterface | None:
 
-        return self.__f(wfld, controls) if self.__f else None
+        conv = self.__f(wfld, controls) if self.__f else None
+        if conv is not None and controls.OUTPUT.writer_thread:
+            conv.printer.start_writer(controls.OUTPUT.writer_queue)
+        return conv
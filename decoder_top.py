@@ -7,6 +7,10 @@
         1.1 Scans RTCM3 byte flow, extracts messages.
         2.2 Aggregates sub-decoders, finds and calls appropriate decoding method
         for each message.
+        Messages are extracted either from sequential chunks (catch_message) or
+        in place from the whole buffer, e.g. memory mapped file (catch_frames).
+        Method decode() is thread safe: sub-decoders keep no state between calls,
+        counters are protected by a lock.
     2. SubDecoderInterface().
         2.1 Specifies available sub-decoders.
         2.2 Specifies list of RTCM messages for each sub-decoder.
@@ -16,6 +20,7 @@
 # pylint: disable = invalid-name
 
 # --- Dependencies ---------------------------------------------------------------------------
+import threading
 from typing import Any
 
 from gnss_types import *  # pylint: disable = unused-wildcard-import,wildcard-import
@@ -163,6 +168,8 @@ class DecoderTop:
         self.__pars_err_cnt: int = 0
         self.__dec_attempts: int = 0
         self.__dec_succeeded: int = 0
+        # decode() may be called from several threads, framing - from one thread only
+        self.__cnt_lock = threading.Lock()
         if TEST_DATA_GRABBER is not None:
             # used for grabbing and saving rtcm3 samples
             self._TDG = TDG()
@@ -204,13 +211,15 @@ class DecoderTop:
         for dec in self.decoders.values():
             if (num in dec.io_spec.keys()) and (num in dec.actual_messages):
                 # Decode
-                self.__dec_attempts += 1
+                with self.__cnt_lock:
+                    self.__dec_attempts += 1
                 rv = dec.decode(msg)
                 if not isinstance(rv, dec.io_spec[num]):
                     raise ExceptionDecoderDecode(
                         f"Decoder {dec.subset} returned unexpected result for msg {num}"
                     )
-                self.__dec_succeeded += 1
+                with self.__cnt_lock:
+                    self.__dec_succeeded += 1
                 break
         else:
             logger.info(f"Decoder not found, message {num}")
@@ -270,6 +279,88 @@ class DecoderTop:
 
         return ret_list
 
+    def catch_frames(
+        self, buf, start: int = 0, end: int | None = None, stop: int | None = None
+    ) -> tuple[list[memoryview], int]:
+        """Find RTCM messages in buf[start:end] without copying data.
+        'buf' is bytes or mmap object. Messages are returned as memoryview slices of
+        'buf'. Returns (messages, offset of the first unprocessed byte). Pass the offset
+        as 'start' of the next call when more data are available.
+        Messages starting at or after 'stop' offset are not extracted, processing ends
+        at the first synchro byte at or after 'stop'.
+        Detection of parsing errors is the same as in catch_message()."""
+
+        spans, pos = self.catch_spans(buf, start, end, stop)
+        view = memoryview(buf)
+        return [view[ofs : ofs + length] for ofs, length in spans], pos
+
+    def catch_spans(
+        self, buf, start: int = 0, end: int | None = None, stop: int | None = None
+    ) -> tuple[list[tuple[int, int]], int]:
+        """Same as catch_frames(), but messages are returned as (offset, length)
+        pairs, e.g. to build the frame index of the file."""
+
+        end = len(buf) if end is None else end
+        stop = end if stop is None else min(stop, end)
+        view = memoryview(buf)
+        spans = []
+        pos = start
+
+        while pos < stop:
+            ofs = self.__find_D3(buf, pos, end)
+
+            # Check, whether any bytes were skipped after synch had already happened
+            if ofs > pos and self._synchronized and not self._skipped_some_bytes:
+                self._skipped_some_bytes = True
+                self._synchronized = False
+            pos = ofs
+            if pos >= stop:
+                break
+
+            # Check, whether full message available
+            if end - pos < 6:
+                break
+            msg_length = (((buf[pos + 1] & 0x03) << 8) | buf[pos + 2]) + 6
+            if msg_length > end - pos:
+                break
+
+            if self.mcrc(view[pos : pos + msg_length]):
+                spans.append((pos, msg_length))
+                pos += msg_length
+                if self._skipped_some_bytes:
+                    self.__pars_err_cnt += 1
+                    self._skipped_some_bytes = False
+                self._synchronized = True
+            else:
+                # Shift out 'D3'
+                pos += 1
+
+        return spans, pos
+
+    def find_frame(self, buf, start: int = 0, end: int | None = None) -> int:
+        """Return offset of the first valid RTCM message in buf[start:end].
+        Return 'end' if there are no valid messages."""
+
+        end = len(buf) if end is None else end
+        pos = start
+        while True:
+            pos = self.__find_D3(buf, pos, end)
+            if end - pos < 6:
+                return end
+            msg_length = (((buf[pos + 1] & 0x03) << 8) | buf[pos + 2]) + 6
+            if msg_length <= end - pos and self.mcrc(buf[pos : pos + msg_length]):
+                return pos
+            pos += 1
+
+    @staticmethod
+    def __find_D3(buf, pos: int, end: int) -> int:
+        """Find synchro byte 0xD3 followed by 6 zero bits in buf[pos:end].
+        Return 'end' if not found."""
+        ofs = buf.find(b"\xd3", pos, end)
+        while ofs != -1 and ofs + 1 < end and (buf[ofs + 1] & 0xFC) != 0:
+            ofs = buf.find(b"\xd3", ofs + 1, end)
+        return end if ofs == -1 else ofs
+
     # ................................................................................
 
     def __rebase_to_D3(self):
@@ -333,6 +424,38 @@ class DecoderTop:
         """Returns total number of decoding attempt"""
         return self.__dec_attempts
 
+    def framer_state(self) -> tuple[bytes, bool, bool]:
+        """Returns state of message extraction: unprocessed bytes of catch_message(),
+        synchronization and skipped bytes flags"""
+        return self._tail, self._synchronized, self._skipped_some_bytes
+
+    def reset_framer(self) -> None:
+        """Drop unprocessed bytes of catch_message(), e.g. when the source file is
+        replaced"""
+        self._tail = b""
+        self._synchronized = False
+        self._skipped_some_bytes = False
+
+    def count_parse_errors(self, errors: int) -> None:
+        """Account parsing errors found outside of the framer, e.g. by the frame
+        index of the file"""
+        self.__pars_err_cnt += errors
+
+    def restore(
+        self,
+        framer: tuple[bytes, bool, bool],
+        parse_errors: int,
+        attempts: int,
+        errors: int,
+    ) -> None:
+        """Restore state of message extraction (see framer_state()) and counters
+        of interrupted conversion"""
+        self._tail, self._synchronized, self._skipped_some_bytes = framer
+        self.__pars_err_cnt = parse_errors
+        with self.__cnt_lock:
+            self.__dec_attempts = attempts
+            self.__dec_succeeded = attempts - errors
+
     # ----------------------------------------------------------------------------------------------
 
     @staticmethod
@@ -0,0 +1,353 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Frame index of RTCM files. FrameIndex() keeps compact binary sidecar file
+    <source>.idx next to the source: offset, length, message number, reference
+    station ID and epoch of each RTCM message (frame) of the source. Converters
+    extract messages by the index without framing and CRC check (--index), queries
+    by message number, station or time don't scan the source.
+
+    File layout (little endian): 64 bytes header, then 22 bytes records.
+    Header: magic, version, size of records, size and modification time [ns] of the
+    indexed source, offset the scan continues from, number of records, parsing
+    errors, framer flags and state of the epoch clock.
+    Record: offset (u64), length (u16), message number (u16), reference station ID
+    (u16, NO_STATION if the message has none), epoch (i64, GPS time since 1980-01-06
+    [ms], NO_EPOCH if the message has none).
+
+    Epochs. MSM and legacy observables carry time of week (GLONASS - time of day)
+    only. GPS week of the first epoch is given or taken from the modification time
+    of the source (the nearest week), then week rollovers are tracked by
+    EpochClock(). Epochs of all GNSS are converted into GPS time.
+
+    Incremental update. Index of the growing file is extended from the saved offset
+    with the saved framer and clock state, the result is the same as indexing of the
+    whole file. Index is stale if the source became shorter, was modified in place
+    (same size, other modification time) or the last indexed message doesn't match
+    the source anymore. Stale index is rebuilt. Header is written after records, so
+    the index interrupted at any moment stays consistent.
+
+    Regular uncompressed files only.
+"""
+
+# pylint: disable = invalid-name
+
+import os
+import struct
+from dataclasses import dataclass, astuple
+from typing import Iterable, Iterator, NamedTuple
+
+from decoder_top import DecoderTop
+from printers.margo_printer import EpochClock, NO_EPOCH
+from sources import SourceFile
+from utilities import getSubset
+
+
+INDEX_EXT = ".idx"
+INDEX_MAGIC = b"RTCM3IDX"
+INDEX_VERSION: int = 1
+
+# Reference station ID of messages which have no such field
+NO_STATION: int = 0xFFFF
+
+# Length of the window of the mapped source scanned at once
+INDEX_WINDOW_LEN: int = 2**20
+# Number of records read at once
+INDEX_BLOCK_LEN: int = 4096
+
+_HEADER = struct.Struct("<8sHHqqqqIii??6x")
+_RECORD = struct.Struct("<QHHHq")
+
+# Messages with reference station ID (DF003) after the message number
+_STATION_MESSAGES = frozenset(range(1001, 1014)) | {1029, 1033, 1230}
+
+
+class FrameIndexError(Exception):
+    """Frame index can't be built or used"""
+
+
+class FrameRecord(NamedTuple):
+    """Index record of RTCM message"""
+
+    offset: int
+    length: int
+    number: int
+    station: int
+    epoch: int
+
+
+@dataclass
+class IndexHeader:
+    """Header of the index file"""
+
+    # Size and modification time of the indexed source, [bytes], [ns]
+    source_size: int = 0
+    source_mtime: int = 0
+    # Offset the scan of the growing source continues from
+    scanned: int = 0
+    frames: int = 0
+    parse_errors: int = 0
+    # State of the epoch clock: GPS week and time of week of the last epoch, [ms]
+    week: int = 0
+    tow: int = NO_EPOCH
+    # Framer flags at 'scanned' offset
+    synchronized: bool = False
+    skipped: bool = False
+
+    def pack(self) -> bytes:
+        """Serialize header"""
+        return _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, _RECORD.size, *astuple(self))
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "IndexHeader":
+        """Deserialize header. Raises FrameIndexError if 'data' isn't a header of
+        the index of supported version."""
+
+        if len(data) < _HEADER.size:
+            raise FrameIndexError("Index file is truncated.")
+        magic, version, rsize, *fields = _HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC:
+            raise FrameIndexError("Not an index file.")
+        if version != INDEX_VERSION or rsize != _RECORD.size:
+            raise FrameIndexError(f"Unsupported index version {version}.")
+        return cls(*fields)
+
+
+def index_path(src: str) -> str:
+    """Make path to the index of the source file"""
+    return src + INDEX_EXT
+
+
+def make_record(buf, offset: int, length: int, clock: EpochClock) -> FrameRecord:
+    """Make index record of the message buf[offset:offset + length]"""
+
+    # Bits 24..87: message number (12), reference station ID (12), epoch time (30)
+    head = int.from_bytes(bytes(buf[offset + 3 : offset + 11]).ljust(8, b"\0"), "big")
+    number = head >> 52
+    station, epoch = NO_STATION, NO_EPOCH
+
+    gnss, subset = getSubset(number)
+    if subset.startswith("MSM"):
+        station = (head >> 40) & 0xFFF
+        time = (head >> 10) & 0x3FFFFFFF
+        if gnss == "R":
+            epoch = clock.epoch(gnss, time & 0x7FFFFFF, time >> 27)
+        else:
+            epoch = clock.epoch(gnss, time)
+    elif number in _STATION_MESSAGES:
+        station = (head >> 40) & 0xFFF
+        if subset.startswith("LEG"):
+            # GPS time of week (30 bits) or GLONASS time of day (27 bits)
+            time = (head >> 10) & 0x3FFFFFFF if gnss == "G" else (head >> 13) & 0x7FFFFFF
+            epoch = clock.epoch(gnss, time)
+
+    return FrameRecord(offset, length, number, station, epoch)
+
+
+class FrameIndex:
+    """Frame index of the source file 'src' kept in <src>.idx, see module
+    description.
+    'utc_shift' - GPS-UTC shift for GLONASS epochs, [s].
+    'gps_week' - GPS week of the first epoch. 0 - the week nearest to modification
+    time of the source."""
+
+    def __init__(self, src: str, utc_shift: int = 18, gps_week: int = 0) -> None:
+        self.src = src
+        self.path = index_path(src)
+        self.utc_shift = utc_shift
+        self.gps_week = gps_week
+
+    def header(self) -> IndexHeader | None:
+        """Read header of the index. Return None if there is no valid index."""
+        try:
+            with open(self.path, "rb") as f:
+                return IndexHeader.unpack(f.read(_HEADER.size))
+        except (OSError, FrameIndexError):
+            return None
+
+    def state(self) -> str:
+        """Check the index against the source. Return 'missing', 'stale', 'growing'
+        (data were appended to the source) or 'current'."""
+
+        if not os.path.isfile(self.path):
+            return "missing"
+        hdr = self.header()
+        if hdr is None:
+            return "stale"
+
+        st = os.stat(self.src)
+        if st.st_size == hdr.source_size:
+            return "current" if st.st_mtime_ns == hdr.source_mtime else "stale"
+        if st.st_size < hdr.source_size or not self.__last_matches(hdr):
+            return "stale"
+        return "growing"
+
+    def __last_matches(self, hdr: IndexHeader) -> bool:
+        """Check whether the last indexed message is still in the source"""
+
+        if hdr.frames == 0:
+            return True
+        try:
+            last = self.record(hdr.frames - 1)
+            with open(self.src, "rb") as f:
+                f.seek(last.offset)
+                msg = f.read(last.length)
+        except (OSError, FrameIndexError):
+            return False
+        return (
+            len(msg) == last.length
+            and DecoderTop.mcrc(msg) is True
+            and DecoderTop.mnum(msg) == last.number
+        )
+
+    def record(self, n: int) -> FrameRecord:
+        """Read record of the n-th message"""
+
+        with open(self.path, "rb") as f:
+            f.seek(_HEADER.size + n * _RECORD.size)
+            data = f.read(_RECORD.size)
+        if len(data) < _RECORD.size:
+            raise FrameIndexError(f"Record {n} not found.")
+        return FrameRecord._make(_RECORD.unpack(data))
+
+    def blocks(self, length: int = INDEX_BLOCK_LEN) -> Iterator[list[FrameRecord]]:
+        """Yield records of the index by blocks of 'length' records.
+        Raises FrameIndexError if there is no valid index."""
+
+        with open(self.path, "rb") as f:
+            hdr = IndexHeader.unpack(f.read(_HEADER.size))
+            left = hdr.frames
+            while left > 0:
+                cnt = min(left, length)
+                data = f.read(cnt * _RECORD.size)
+                if len(data) < cnt * _RECORD.size:
+                    raise FrameIndexError("Index file is truncated.")
+                yield list(map(FrameRecord._make, _RECORD.iter_unpack(data)))
+                left -= cnt
+
+    def records(self) -> Iterator[FrameRecord]:
+        """Yield records of the index"""
+        for block in self.blocks():
+            yield from block
+
+    def select(
+        self,
+        numbers: Iterable[int] | None = None,
+        station: int | None = None,
+        start: int | None = None,
+        stop: int | None = None,
+    ) -> Iterator[FrameRecord]:
+        """Yield records of messages with given 'numbers' of 'station' with epochs
+        in [start, stop) range of GPS time, [ms]. Criteria set to None are not
+        checked. Messages without epochs don't match time criteria."""
+
+        wanted = None if numbers is None else frozenset(numbers)
+        timed = start is not None or stop is not None
+        for rec in self.records():
+            if wanted is not None and rec.number not in wanted:
+                continue
+            if station is not None and rec.station != station:
+                continue
+            if timed:
+                if rec.epoch == NO_EPOCH:
+                    continue
+                if start is not None and rec.epoch < start:
+                    continue
+                if stop is not None and rec.epoch >= stop:
+                    continue
+            yield rec
+
+    def update(self) -> int:
+        """Build, rebuild or extend the index. Return number of added records.
+        Raises FrameIndexError if the source or the index can't be processed."""
+
+        state = self.state()
+        if state == "current":
+            return 0
+
+        try:
+            with SourceFile(self.src) as f:
+                if not f.mappable:
+                    raise FrameIndexError(
+                        f"File {self.src} is compressed, empty or not a regular file."
+                    )
+                mm = f.map()
+                try:
+                    # Data appended after mapping change the size of the source
+                    mtime = os.stat(self.src).st_mtime_ns
+                    if state == "growing":
+                        return self.__extend(mm, mtime)
+                    return self.__build(mm, mtime)
+                finally:
+                    mm.close()
+        except OSError as oe:
+            raise FrameIndexError(f"{type(oe)}: {oe}") from oe
+
+    def __build(self, mm, mtime: int) -> int:
+        """Index the whole source into temporary file, replace the index"""
+
+        if self.gps_week > 0:
+            hdr = IndexHeader(week=self.gps_week)
+        else:
+            clock = EpochClock.from_time(mtime, self.utc_shift)
+            hdr = IndexHeader(week=clock.week, tow=clock.tow)
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as out:
+            out.write(hdr.pack())
+            cnt = self.__scan(mm, mtime, hdr, out)
+            out.seek(0)
+            out.write(hdr.pack())
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        return cnt
+
+    def __extend(self, mm, mtime: int) -> int:
+        """Append records of messages appended to the source"""
+
+        with open(self.path, "r+b") as out:
+            hdr = IndexHeader.unpack(out.read(_HEADER.size))
+            # Records of interrupted update are dropped
+            out.truncate(_HEADER.size + hdr.frames * _RECORD.size)
+            out.seek(0, os.SEEK_END)
+            cnt = self.__scan(mm, mtime, hdr, out)
+            out.flush()
+            os.fsync(out.fileno())
+            out.seek(0)
+            out.write(hdr.pack())
+            out.flush()
+            os.fsync(out.fileno())
+        return cnt
+
+    def __scan(self, mm, mtime: int, hdr: IndexHeader, out) -> int:
+        """Index messages of mapped source from 'hdr.scanned' offset, write records
+        into 'out'. Update 'hdr'. Return number of records."""
+
+        framer = DecoderTop()
+        framer.restore((b"", hdr.synchronized, hdr.skipped), hdr.parse_errors, 0, 0)
+        clock = EpochClock(hdr.week, hdr.tow, self.utc_shift)
+
+        size = len(mm)
+        pos = hdr.scanned
+        cnt = 0
+        while pos < size:
+            end = min(size, pos + INDEX_WINDOW_LEN)
+            spans, pos = framer.catch_spans(mm, pos, end)
+            out.write(
+                b"".join(
+                    _RECORD.pack(*make_record(mm, ofs, length, clock))
+                    for ofs, length in spans
+                )
+            )
+            cnt += len(spans)
+            if end == size:
+                break
+
+        _, hdr.synchronized, hdr.skipped = framer.framer_state()
+        hdr.source_size, hdr.source_mtime = size, mtime
+        hdr.scanned, hdr.frames = pos, hdr.frames + cnt
+        hdr.parse_errors = framer.parse_errors
+        hdr.week, hdr.tow = clock.week, clock.tow
+        return cnt
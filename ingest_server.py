@@ -0,0 +1,494 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Multi-stream ingest server. Use IngestServer() to receive RTCM streams of many
+    base stations in one process. Connections are told apart by the first line:
+    - 'SOURCE password /MOUNT' - NTRIP v1 source;
+    - 'POST /MOUNT HTTP/1.1' - NTRIP v2 source, plain or chunked body;
+    - anything else - raw TCP stream named after the peer address.
+
+    Each stream has its own converter: framer state (DecoderTop) and printers writing
+    into <work>/<MOUNT>-<FORMAT> folder. Existing folders are never overwritten,
+    the stream of a reconnected source goes to <MOUNT>_2-<FORMAT> etc.
+    Frames of all streams are decoded by a shared pool of processes in batches of
+    INGEST.batch_frames frames. Decoders are forked from the server before it starts
+    listening and reuse DecoderTop of a template converter. Decoded data are printed
+    by the event loop. Without 'fork' start method or with 0 workers frames are
+    decoded by the event loop.
+
+    Backpressure: a stream is not read while it has INGEST.max_pending_frames frames
+    waiting for decoding. Each stream has at most one batch being decoded, so its
+    messages are printed in the order of arrival.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import base64
+import asyncio
+import tempfile
+import multiprocessing as mp
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from controls import BoxWithConverterControls
+from converter_top import ConverterFactory, ConverterInterface
+from decoder_top import DecoderTop
+from sources import RateCounter, read_chunk
+from run_conversion import end_of_epoch
+
+from logger import LOGGER_CF as logger
+
+
+READ_SIZE: int = 2**16
+# Queue of connections not accepted yet. Hundreds of sources may connect at once
+# after restart of the server or a network failure.
+LISTEN_BACKLOG: int = 1024
+# Max. length of NTRIP request headers, [bytes]
+MAX_HEADER_LEN: int = 2**13
+
+_CTX = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+_WORKER_DECODER: DecoderTop | None = None
+
+
+def _init_worker(decoder: DecoderTop) -> None:
+    """Initializer of decoder processes. The decoder is inherited by fork."""
+    global _WORKER_DECODER  # pylint: disable = global-statement
+    _WORKER_DECODER = decoder
+
+
+def _decode_batch(batch: list[tuple[int, list[bytes]]]) -> list[tuple]:
+    """Decode batch in decoder process"""
+    return decode_batch(_WORKER_DECODER, batch)
+
+
+def decode_batch(decoder: DecoderTop, batch: list[tuple[int, list[bytes]]]) -> list[tuple]:
+    """Decode frames of several streams: [(stream id, frames)].
+    Return [(stream id, decoded data, decoding attempts, decoding errors)]."""
+
+    rv = []
+    for sid, frames in batch:
+        attempts, errors = decoder.dec_attempts, decoder.dec_errors
+        xblocks = [x for x in map(decoder.decode, frames) if x is not None]
+        rv.append(
+            (sid, xblocks, decoder.dec_attempts - attempts, decoder.dec_errors - errors)
+        )
+    return rv
+
+
+@dataclass
+class IngestStatistics:
+    """Statistics of a stream received by the server"""
+
+    name: str = ""
+    peer: str = ""
+    bytes: int = 0
+    frames: int = 0
+    decoding_attempts: int = 0
+    parsing_errors: int = 0
+    decoding_errors: int = 0
+    printing_attempts: int = 0
+    printing_errors: int = 0
+    # Reading was paused by backpressure
+    pauses: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.bytes:d} bytes, {self.frames:d} frames, "
+            + f"{self.decoding_attempts:d} messages, prs-dec-prnt errors "
+            + f"{self.parsing_errors:d}-{self.decoding_errors:d}-"
+            + f"{self.printing_errors:d}, {self.pauses:d} pauses."
+        )
+
+
+class IngestStream:
+    """State of a stream: converter, frames waiting for decoding, statistics"""
+
+    def __init__(self, sid: int, wfld: str, converter: ConverterInterface) -> None:
+        self.sid = sid
+        self.wfld = wfld
+        self.converter = converter
+        self.pending: list[bytes] = []
+        # Stream has a batch being decoded
+        self.in_flight = False
+        # Set when reading may go on: pending frames are below the limit
+        self.resume = asyncio.Event()
+        self.resume.set()
+        # Set after each decoded batch
+        self.decoded = asyncio.Event()
+        self.stat = IngestStatistics(os.path.basename(wfld))
+
+
+class IngestServer:
+    """Receives many RTCM streams, see the module description"""
+
+    def __init__(
+        self,
+        fmt: str,
+        controls: BoxWithConverterControls,
+        work_dir: str,
+        workers: int = 0,
+    ) -> None:
+        """'fmt' - output format, see ConverterFactory. Outputs of streams are
+        created in 'work_dir'. 'workers' - number of decoder processes.
+        Output controls are adjusted for many streams: INGEST.max_open_files files
+        per stream, no writer threads."""
+
+        self.fmt = fmt
+        self.controls = controls
+        self.ctrl = controls.INGEST
+        self.work_dir = work_dir
+        self.workers = workers if _CTX is not None else 0
+        controls.OUTPUT.max_open_files = min(
+            controls.OUTPUT.max_open_files, self.ctrl.max_open_files
+        )
+        controls.OUTPUT.writer_thread = False
+
+        self.bytes = RateCounter(self.ctrl.stats_interval)
+        self.messages = RateCounter(self.ctrl.stats_interval)
+        self.connections: int = 0
+        self.__streams: dict[int, IngestStream] = {}
+        self.__closed: list[IngestStatistics] = []
+        self.__folders: set[str] = set()
+        self.__next_sid = 0
+        self.__decoder: DecoderTop | None = None
+        self.__pool: ProcessPoolExecutor | None = None
+        self.__server: asyncio.AbstractServer | None = None
+        self.__ready: asyncio.Event | None = None
+        self.__slots: asyncio.Semaphore | None = None
+        self.__tasks: set[asyncio.Task] = set()
+        self.__handlers: set[asyncio.Task] = set()
+        self.__closing: set[asyncio.Task] = set()
+
+    @property
+    def active(self) -> int:
+        """Number of connected streams"""
+        return len(self.__streams)
+
+    @property
+    def statistics(self) -> list[IngestStatistics]:
+        """Statistics of closed and active streams"""
+        return self.__closed + [s.stat for s in self.__streams.values()]
+
+    @property
+    def summary(self) -> str:
+        """Statistics of the server"""
+        return (
+            f"{self.active:d} streams, {self.connections:d} connections, "
+            + f"{self.bytes.total:d} bytes ({self.bytes.rate / 1024:.1f} kB/s), "
+            + f"{self.messages.total:d} messages ({self.messages.rate:.1f} msg/s)."
+        )
+
+    # ........................................................................
+
+    async def start(self, host: str = "0.0.0.0", port: int = 0) -> int:
+        """Start decoders and listening. Return the port."""
+
+        os.makedirs(self.work_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            template = ConverterFactory(self.fmt)(tmp, self.controls)
+            if template is None:
+                raise ValueError(f"Converter {self.fmt} wasn't created.")
+            template.release()
+        self.__decoder = template.decoder
+
+        if self.workers > 0:
+            self.__pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=_CTX,
+                initializer=_init_worker,
+                initargs=(self.__decoder,),
+            )
+            # Fork all decoders now: children shall not inherit sockets of streams
+            self.__pool.submit(int).result()
+            logger.info(f"Frames are decoded in {self.workers} processes.")
+
+        self.__ready = asyncio.Event()
+        self.__slots = asyncio.Semaphore(2 * max(1, self.workers))
+        self.__spawn(self.__dispatch())
+        self.__spawn(self.__report())
+        self.__server = await asyncio.start_server(
+            self.__handle, host, port, backlog=LISTEN_BACKLOG
+        )
+        port = self.__server.sockets[0].getsockname()[1]
+        logger.info(f"Listening on {host}:{port}, outputs in {self.work_dir}.")
+        return port
+
+    async def serve(self, duration: float | None = None) -> None:
+        """Serve connections for 'duration' seconds or until cancelled"""
+        try:
+            await asyncio.sleep(duration if duration is not None else float("inf"))
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Stop listening, break connections, print pending data of streams and
+        stop decoders"""
+
+        if self.__server is not None:
+            self.__server.close()
+            self.__server = None
+        handlers = list(self.__handlers)
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await asyncio.gather(*list(self.__closing), return_exceptions=True)
+        tasks = list(self.__tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+        logger.progress(self.summary)
+
+    def __spawn(self, coro, tasks: set[asyncio.Task] | None = None) -> asyncio.Task:
+        """Run background task, keep reference to it in 'tasks'"""
+        tasks = self.__tasks if tasks is None else tasks
+        task = asyncio.ensure_future(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
+
+    async def __report(self) -> None:
+        """Log statistics periodically"""
+        while True:
+            await asyncio.sleep(self.ctrl.stats_interval)
+            logger.progress(self.summary)
+
+    # ........................................................................
+
+    async def __handle(self, reader, writer) -> None:
+        """Serve source connection"""
+
+        task = asyncio.current_task()
+        self.__handlers.add(task)
+        self.connections += 1
+        peer = writer.get_extra_info("peername") or ("unknown", 0)
+        peer = f"{peer[0]}:{peer[1]}"
+        stream = None
+        try:
+            name, chunked, data = await self.__handshake(reader, writer, peer)
+            stream = self.__open_stream(name)
+            stream.stat.peer = peer
+            logger.info(f"Stream {stream.stat.name} from {peer}: connected.")
+            while data:
+                self.__consume(stream, data)
+                if len(stream.pending) >= self.ctrl.max_pending_frames:
+                    stream.resume.clear()
+                    stream.stat.pauses += 1
+                    await stream.resume.wait()
+                data = await self.__read(reader, chunked)
+        except (OSError, EOFError, ValueError) as ex:
+            name = stream.stat.name if stream is not None else peer
+            logger.warning(f"Stream {name}: {type(ex).__name__}: {ex}")
+        except asyncio.CancelledError:
+            # The server is closing
+            pass
+        finally:
+            writer.close()
+            self.__handlers.discard(task)
+            if stream is not None:
+                # Pending data are printed even if the server is closing
+                closing = self.__spawn(self.__close_stream(stream), self.__closing)
+                try:
+                    await asyncio.shield(closing)
+                except asyncio.CancelledError:
+                    pass
+
+    async def __read(self, reader: asyncio.StreamReader, chunked: bool) -> bytes:
+        """Read data of the stream. Raises TimeoutError if the stream is idle."""
+
+        idle = self.controls.STREAM.idle_timeout
+        coro = read_chunk(reader) if chunked else reader.read(READ_SIZE)
+        try:
+            return await asyncio.wait_for(coro, idle if idle > 0 else None)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No data for {idle} s.") from None
+
+    async def __read_line(self, reader: asyncio.StreamReader) -> str:
+        """Read line of request headers"""
+        line = await asyncio.wait_for(
+            reader.readline(), self.controls.STREAM.idle_timeout or None
+        )
+        if len(line) > MAX_HEADER_LEN or not line.endswith(b"\n"):
+            raise ValueError("Bad request.")
+        return line.decode(errors="replace").strip()
+
+    async def __handshake(
+        self, reader: asyncio.StreamReader, writer, peer: str
+    ) -> tuple[str, bool, bytes]:
+        """Accept the source. Return name of the stream, chunked transfer encoding
+        flag and the first data. Raises ValueError if the source is refused."""
+
+        idle = self.controls.STREAM.idle_timeout
+        head = await asyncio.wait_for(reader.readexactly(5), idle if idle > 0 else None)
+        if head not in (b"SOURC", b"POST "):
+            return peer.replace(".", "_").replace(":", "-"), False, head
+
+        line = head.decode() + await self.__read_line(reader)
+        headers = {}
+        while (header := await self.__read_line(reader)) and len(headers) < 64:
+            key, _, value = header.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        parts = line.split(" ")
+
+        if head == b"SOURC":
+            # SOURCE password /MOUNT
+            password = parts[1] if len(parts) > 2 else ""
+            mount = parts[-1].strip("/")
+            if not self.__authorized(password) or len(parts) < 2 or not mount:
+                writer.write(b"ERROR - Bad Password\r\n")
+                await writer.drain()
+                raise ValueError(f"Source {line!r} refused.")
+            writer.write(b"ICY 200 OK\r\n")
+            await writer.drain()
+            return mount.replace("/", "_"), False, await self.__read(reader, False)
+
+        # POST /MOUNT HTTP/1.1
+        password = ""
+        auth = headers.get("authorization", "")
+        if auth.lower().startswith("basic "):
+            try:
+                password = base64.b64decode(auth[6:]).decode().partition(":")[2]
+            except ValueError:
+                password = ""
+        mount = parts[1].strip("/") if len(parts) > 2 else ""
+        if not self.__authorized(password) or not mount:
+            writer.write(b"HTTP/1.1 401 Unauthorized\r\n\r\n")
+            await writer.drain()
+            raise ValueError(f"Source {line!r} refused.")
+        writer.write(b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\n\r\n")
+        await writer.drain()
+        chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        return mount.replace("/", "_"), chunked, await self.__read(reader, chunked)
+
+    def __authorized(self, password: str) -> bool:
+        """Check password of the source"""
+        return not self.ctrl.password or password == self.ctrl.password
+
+    # ........................................................................
+
+    def __open_stream(self, name: str) -> IngestStream:
+        """Create converter of a new stream in a new folder"""
+
+        base = f"{name}-{self.fmt}"
+        wfld = os.path.join(self.work_dir, base)
+        n = 1
+        while wfld in self.__folders or os.path.exists(wfld):
+            n += 1
+            wfld = os.path.join(self.work_dir, f"{name}_{n}-{self.fmt}")
+        self.__folders.add(wfld)
+        os.makedirs(wfld)
+
+        converter = ConverterFactory(self.fmt)(wfld, self.controls)
+        if converter is None:
+            raise ValueError(f"Converter {self.fmt} wasn't created.")
+        self.__next_sid += 1
+        stream = IngestStream(self.__next_sid, wfld, converter)
+        self.__streams[stream.sid] = stream
+        return stream
+
+    def __consume(self, stream: IngestStream, data: bytes) -> None:
+        """Extract frames of received data, queue them for decoding"""
+
+        frames = stream.converter.parse_bytes(data)
+        stream.stat.bytes += len(data)
+        stream.stat.frames += len(frames)
+        self.bytes.add(len(data))
+        if frames:
+            stream.pending.extend(frames)
+            self.__ready.set()
+
+    async def __close_stream(self, stream: IngestStream) -> None:
+        """Print pending data of the stream, release its converter"""
+
+        try:
+            while stream.pending or stream.in_flight:
+                stream.decoded.clear()
+                self.__ready.set()
+                await stream.decoded.wait()
+        finally:
+            stat = stream.converter.get_statistics()
+            stream.converter.release()
+            stream.stat.parsing_errors = stat.parsing_errors
+            stream.stat.printing_attempts = stat.printing_attempts
+            stream.stat.printing_errors = stat.printing_errors
+            del self.__streams[stream.sid]
+            self.__closed.append(stream.stat)
+            logger.info(f"Stream {stream.stat.name} closed: {stream.stat}")
+
+    # ........................................................................
+
+    async def __dispatch(self) -> None:
+        """Collect frames of streams into batches and pass them to decoders"""
+
+        while True:
+            await self.__ready.wait()
+            self.__ready.clear()
+            pending = sum(len(s.pending) for s in self.__streams.values())
+            if pending < self.ctrl.batch_frames and self.ctrl.batch_delay > 0:
+                await asyncio.sleep(self.ctrl.batch_delay)
+            await self.__slots.acquire()
+            batch = self.__collect()
+            if batch:
+                self.__spawn(self.__run_batch(batch))
+            else:
+                self.__slots.release()
+
+    def __collect(self) -> list[tuple[int, list[bytes]]]:
+        """Take up to 'batch_frames' pending frames of streams without batches
+        being decoded"""
+
+        batch, room = [], self.ctrl.batch_frames
+        for stream in self.__streams.values():
+            if room <= 0:
+                break
+            if stream.in_flight or not stream.pending:
+                continue
+            frames, stream.pending = stream.pending[:room], stream.pending[room:]
+            room -= len(frames)
+            stream.in_flight = True
+            batch.append((stream.sid, frames))
+            if len(stream.pending) < self.ctrl.max_pending_frames:
+                stream.resume.set()
+
+        # Frames left for the next batch
+        if any(s.pending and not s.in_flight for s in self.__streams.values()):
+            self.__ready.set()
+        return batch
+
+    async def __run_batch(self, batch: list[tuple[int, list[bytes]]]) -> None:
+        """Decode batch, print decoded data"""
+
+        try:
+            if self.__pool is not None:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(self.__pool, _decode_batch, batch)
+            else:
+                results = decode_batch(self.__decoder, batch)
+        except (BrokenProcessPool, OSError) as ex:
+            logger.error(f"Decoding failed. {type(ex)}: {ex}")
+            results = [(sid, [], len(frames), len(frames)) for sid, frames in batch]
+
+        try:
+            flush = self.controls.OUTPUT.flush
+            for sid, xblocks, attempts, errors in results:
+                stream = self.__streams[sid]
+                stream.stat.decoding_attempts += attempts
+                stream.stat.decoding_errors += errors
+                self.messages.add(attempts)
+                for xblock in xblocks:
+                    stream.converter.print(xblock)
+                    if flush == "message" or (flush == "epoch" and end_of_epoch(xblock)):
+                        stream.converter.flush()
+        finally:
+            for sid, _ in batch:
+                stream = self.__streams[sid]
+                stream.in_flight = False
+                stream.decoded.set()
+                if stream.pending:
+                    self.__ready.set()
+            self.__slots.release()
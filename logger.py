@@ -3,11 +3,14 @@
     Mail: konstantin.yuriev83@gmail.com
 
     Implements dual channel logger(console + file).
+    Logging methods may be called from several threads (logging.Logger is thread
+    safe), init_2CH() and deinit() are serialized by a lock.
 """
 
 # pylint: disable = invalid-name, attribute-defined-outside-init
 
 import logging
+import threading
 
 
 __all__ = ["LOGGER_CF"]
@@ -19,8 +22,16 @@ class LoggerConsFile:
     def __init__(self) -> None:
         self.logger = None
         self.ready = False
+        self.__lock = threading.Lock()
 
-    def init_2CH(self, file_name="default_log.txt", logger_id="LogDcd"):
+    def init_2CH(self, file_name="default_log.txt", logger_id="LogDcd", console=True):
+        """Create Logger() instance and setup logging parameters.
+        Console channel is disabled if 'console' is False."""
+
+        with self.__lock:
+            self.__init_2CH(file_name, logger_id, console)
+
+    def __init_2CH(self, file_name: str, logger_id: str, console: bool):
         """Create Logger() instance and setup logging parameters"""
 
         assert not self.ready, "Logger already exists. Deinit first, then setup anew."
@@ -46,7 +57,8 @@ class LoggerConsFile:
         _f_handler.setFormatter(_f_format)
 
         # Add handlers to the logger
-        self.logger.addHandler(_c_handler)
+        if console:
+            self.logger.addHandler(_c_handler)
         self.logger.addHandler(_f_handler)
 
         # Global severity level affects _c and _f handlers.
@@ -57,12 +69,14 @@ class LoggerConsFile:
 
     def deinit(self):
         """Delete Logger() instance"""
-        if not self.ready or self.logger is None:
-            return
-
-        logging.shutdown()
-        self.logger.handlers.clear()
-        self.ready = False
+        with self.__lock:
+            if not self.ready or self.logger is None:
+                return
+
+            # Stop logging first, then close handlers
+            self.ready = False
+            logging.shutdown()
+            self.logger.handlers.clear()
 
     def debug(self, msg):
         """Add debug message to the log."""
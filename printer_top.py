@@ -4,7 +4,7 @@
 
     Implements classes:
     1. PrinterTop(). Aggregates sub-printers, finds and calls appropriate printing method
-        for input DTO object.
+        for input DTO object. Optionally runs sub-printers on a dedicated writer thread.
     2. SubPrinterInterface().
         2.1 Specifies available sub-printers.
         2.2 Specifies list of DTO classes to be supported by each sub-printer.
@@ -15,6 +15,9 @@
 
 # --- Dependencies ---------------------------------------------------------------------------
 
+import queue
+import threading
+
 from gnss_types import *  # pylint: disable = unused-wildcard-import,wildcard-import
 from logger import LOGGER_CF as logger
 
@@ -66,11 +69,34 @@ _JARGO_SPECS = {
     },
 }
 
+_TABLE_SPECS = {
+    "LEGO": set(),
+    "MSM13O": {ObservablesMSM},
+    "MSM47O": {ObservablesMSM},
+    "EPH": {EphGPS, EphGLO, EphBDS, EphGALF, EphGALI, EphNAVIC, EphQZS},
+    "BASE": {
+        BaseRP,
+        BaseRPH,
+        BaseAD,
+        BaseADSN,
+        BaseADSNRC,
+        BaseSP,
+        BaseTS,
+        BaseGLBS,
+    },
+}
+
 
 _SPECS_LIST = {
     "MARGO": _MARGO_SPECS,
     "JSON": _JSON_SPECS,
     "JARGO": _JARGO_SPECS,
+    "JSONL": _JSON_SPECS,
+    "JARGO-L": _JARGO_SPECS,
+    "NPY": _MARGO_SPECS,
+    "PARQUET": _TABLE_SPECS,
+    "SQLITE": _TABLE_SPECS,
+    "RINEX": _MARGO_SPECS,
 }
 
 
@@ -85,6 +111,12 @@ class SubPrinterInterface:
         3. Virtual method 'print' which must be redefined in sub-printer implementation.
         4. Virtual method 'close' which must be redefined in sub-printer implementation.
            'close' used to finalize sub-printer work properly.
+        5. Optional method 'flush'. Writes collected data to output files, so that
+           they are visible to consumers of the output. Does nothing by default.
+        6. Optional method 'resume'. Takes paths of output files of interrupted
+           conversion, registers files created by the sub-printer, so that printed
+           data are appended to them. Returns list of registered paths.
+           Registers nothing by default.
     """
 
     def __init__(self) -> None:
@@ -92,6 +124,8 @@ class SubPrinterInterface:
         self.format = "UNDEF"
         self.print = self.stub_print
         self.close = self.stub_close
+        self.flush = self.stub_flush
+        self.resume = self.stub_resume
         self.data_spec = set()
         self.actual_spec = set()
 
@@ -121,6 +155,15 @@ class SubPrinterInterface:
         """Stub for virtual method .close()."""
         raise NotImplementedError("Virtual method .close() not defined")
 
+    @staticmethod
+    def stub_flush() -> None:
+        """Stub for optional method .flush(). Data are written at close."""
+
+    @staticmethod
+    def stub_resume(paths: list[str]) -> list[str]:
+        """Stub for optional method .resume(). Output files can't be continued."""
+        return []
+
 
 def catch_printer_asserts(func):
     """Decorator. Implements processing of asserts raised in MARGO printer"""
@@ -137,12 +180,22 @@ def catch_printer_asserts(func):
 class PrinterTop:
     """Combines printers for RTCM message subsets and implements outer interface"""
 
+    # Marks the end of the writer queue
+    __STOP = object()
+    # Requests flushing of sub-printers from the writer thread
+    __FLUSH = object()
+
     def __init__(self, in_format: str = "UNDEF") -> None:
 
         self._format = in_format
         self.printers: set[SubPrinterInterface] = set()
         self.__attempts_cnt = 0
         self.__succeeded_cnt = 0
+        # Failures of flush and close of sub-printers
+        self.__io_errors_cnt = 0
+        # Writer thread and its queue of DTO objects
+        self.__writer: threading.Thread | None = None
+        self.__queue: queue.Queue | None = None
 
     @property
     def format(self):
@@ -181,8 +234,8 @@ class PrinterTop:
 
     @property
     def errors(self):
-        """Get the number of print failures."""
-        return self.__attempts_cnt - self.__succeeded_cnt
+        """Get the number of print failures, failed flushes included."""
+        return self.__attempts_cnt - self.__succeeded_cnt + self.__io_errors_cnt
 
     def add_subprinter(self, io: SubPrinterInterface) -> bool:
         """
@@ -221,9 +274,63 @@ class PrinterTop:
         self.printers.add(io)
         return True
 
-    @catch_printer_asserts
+    @property
+    def threaded(self):
+        """Check, whether sub-printers run on the writer thread."""
+        return self.__writer is not None
+
+    def start_writer(self, queue_size: int = 256) -> bool:
+        """
+        Run sub-printers on a dedicated writer thread. DTO objects are passed to
+        the thread through a bounded queue; print() blocks when the queue is full.
+        Return True if the thread has been started.
+        """
+        if self.__writer is not None:
+            return False
+
+        self.__queue = queue.Queue(maxsize=max(1, queue_size))
+        self.__writer = threading.Thread(
+            target=self.__writer_loop, name="PrinterTopWriter", daemon=True
+        )
+        self.__writer.start()
+        return True
+
+    def __writer_loop(self):
+        """Print DTO objects from the queue in order of arrival. Failures are
+        logged and counted, the thread serves the queue until it is stopped."""
+        while True:
+            dblock = self.__queue.get()
+            sync = isinstance(dblock, threading.Event)
+            try:
+                if dblock is self.__STOP:
+                    # Sub-printers are closed on the thread they print on
+                    self.__close_printers()
+                elif dblock is self.__FLUSH or sync:
+                    self.__flush()
+                else:
+                    self.__print(dblock)
+            except Exception as ex:  # pylint: disable = broad-exception-caught
+                # Failed print is counted already: attempt registered, success - not
+                if dblock is self.__STOP or dblock is self.__FLUSH or sync:
+                    self.__io_errors_cnt += 1
+                logger.error(f"Writer thread: {type(ex)}: {ex}")
+            finally:
+                if sync:
+                    # Synchronous flush, see sync()
+                    dblock.set()
+            if dblock is self.__STOP:
+                break
+
     def print(self, dblock: object):
         """Print input data block"""
+        if self.__writer is not None:
+            self.__queue.put(dblock)
+        else:
+            self.__print(dblock)
+
+    @catch_printer_asserts
+    def __print(self, dblock: object):
+        """Find sub-printer and print input data block"""
         tp = type(dblock)
         # Find printer
         for printer in self.printers:
@@ -235,8 +342,71 @@ class PrinterTop:
         else:
             logger.warning(f"Printer not found, d-block {tp}")
 
-    def close(self):
-        """Finalize subprinters"""
+    def flush(self):
+        """Write data collected by sub-printers to output files.
+        On the writer thread the request is queued after printed data."""
+        if self.__writer is not None:
+            self.__queue.put(self.__FLUSH)
+        else:
+            self.__flush()
+
+    def sync(self):
+        """Write data collected by sub-printers to output files, wait until they
+        are written."""
+        if self.__writer is not None:
+            done = threading.Event()
+            self.__queue.put(done)
+            done.wait()
+        else:
+            self.__flush()
 
+    def resume(self, paths: list[str], attempts: int, errors: int) -> bool:
+        """Continue output files 'paths' of interrupted conversion, restore counters.
+        Return False if some files don't belong to sub-printers."""
+
+        claimed = set()
+        for p in self.printers:
+            claimed.update(p.resume(paths))
+
+        alien = [path for path in paths if path not in claimed]
+        if alien:
+            logger.error(f"Output file '{alien[0]}' can't be continued.")
+            return False
+
+        self.__attempts_cnt = attempts
+        self.__succeeded_cnt = attempts - errors
+        return True
+
+    def __flush(self):
+        """Flush sub-printers"""
         for p in self.printers:
-            p.close()
+            try:
+                p.flush()
+            except OSError as oe:
+                self.__io_errors_cnt += 1
+                logger.error(f"Failed to flush output files. {type(oe)}: {oe}")
+            except AssertionError as ae:
+                self.__io_errors_cnt += 1
+                logger.error(f"{ae.args[0]}")
+
+    def __close_printers(self):
+        """Finalize sub-printers. Failure of one doesn't prevent closing others."""
+        for p in self.printers:
+            try:
+                p.close()
+            except Exception as ex:  # pylint: disable = broad-exception-caught
+                self.__io_errors_cnt += 1
+                logger.error(f"Failed to close printer. {type(ex)}: {ex}")
+
+    def close(self):
+        """Drain the writer queue, finalize subprinters. Sub-printers running on
+        the writer thread are finalized there."""
+
+        if self.__writer is not None:
+            self.__queue.put(self.__STOP)
+            self.__writer.join()
+            self.__writer = None
+            self.__queue = None
+            return
+
+        self.__close_printers()
@@ -5,3 +5,19 @@ from .json_printer import PrintJSON
 from .margo_printer import MargoControls
 from .margo_printer import PrintMARGO
 
+from .npy_printer import PrintNPY
+from .npy_printer import NpyCore
+
+from .parquet_printer import ParquetControls
+from .parquet_printer import PrintParquet
+
+from .sqlite_printer import SQLiteControls
+from .sqlite_printer import PrintSQLite
+
+from .table_core import TableCore
+
+from .rinex_printer import RinexControls
+from .rinex_printer import PrintRINEX
+
+from .file_pool import OutputControls
+from .file_pool import FilePool
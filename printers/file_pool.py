@@ -0,0 +1,264 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    There are 2 classes here:
+    1. FilePool() - bounded pool of opened output files. Keeps at most 'max_open'
+    file descriptors opened, evicts the least recently written file when the limit
+    is reached and reopens it in append mode on demand. Data are collected in
+    per-file write buffers, which are kept in the pool regardless of the state
+    of the file descriptor. Files may be compressed on the fly (gzip, xz, zstd).
+    2. OutputControls() - DTO for control parameters.
+
+    Function open_output() opens a single (compressed) output file.
+"""
+
+# pylint: disable = invalid-name
+
+import gzip
+import lzma
+from collections import OrderedDict
+from typing import Any, Hashable
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from logger import LOGGER_CF as logger
+
+
+# Supported compression methods and file extensions
+COMPRESSION_EXT = {"none": "", "gz": ".gz", "xz": ".xz", "zst": ".zst"}
+
+# Flushing of output files: at close only, after each epoch, after each message
+FLUSH_MODES = ("none", "epoch", "message")
+
+
+def compression_available(method: str) -> bool:
+    """Check whether compression method is supported."""
+    if method == "zst":
+        return zstandard is not None
+    return method in COMPRESSION_EXT
+
+
+def open_output(
+    path: str, mode: str, binary: bool = False, method: str = "none", level: int = -1
+):
+    """Open file for writing/appending ('w' or 'a' mode), compress data on the fly.
+    'path' shall include extension of compressed file, see COMPRESSION_EXT.
+    Negative 'level' - default compression level of the method.
+    Raises OSError if file can't be opened."""
+
+    tmode = mode + ("b" if binary else "t")
+    encoding = None if binary else "utf-8"
+
+    if method == "gz":
+        level = 6 if level < 0 else level
+        return gzip.open(path, tmode, compresslevel=level, encoding=encoding)
+    if method == "xz":
+        preset = None if level < 0 else level
+        return lzma.open(path, tmode, preset=preset, encoding=encoding)
+    if method == "zst":
+        if zstandard is None:
+            raise OSError("Package 'zstandard' not installed.")
+        cctx = zstandard.ZstdCompressor(level=3 if level < 0 else level)
+        return zstandard.open(path, tmode, cctx=cctx, encoding=encoding)
+    if binary:
+        return open(path, mode + "b")
+    return open(path, mode, encoding="utf-8")
+
+
+class OutputControls:
+    """Defines some parameters to control output files management"""
+
+    __slots__ = (
+        "max_open_files",
+        "write_buffer",
+        "writer_thread",
+        "writer_queue",
+        "compression",
+        "compression_level",
+        "flush",
+    )
+
+    def __init__(self) -> None:
+        # Max. number of simultaneously opened files per printer
+        self.max_open_files: int = 64
+        # Size of per-file write buffer, [bytes]
+        self.write_buffer: int = 2**16
+        # Run printers on a dedicated writer thread
+        self.writer_thread: bool = False
+        # Max. number of DTO objects waiting in the writer queue
+        self.writer_queue: int = 256
+        # Compression of output files: none, gz, xz, zst
+        self.compression: str = "none"
+        # Compression level. Negative - default level of the method.
+        self.compression_level: int = -1
+        # Flushing of output files: none, epoch, message. See FLUSH_MODES.
+        self.flush: str = "none"
+
+
+class FilePool:
+    """Bounded LRU pool of output files."""
+
+    _DEFAULT_CONTROLS = OutputControls()
+
+    def __init__(
+        self,
+        ctrl: OutputControls | None = None,
+        binary: bool = False,
+        compress: bool = True,
+        records: bool = False,
+    ):
+        """'compress' = False disables compression regardless of controls.
+        'records' = True - each write() puts whole records (e.g. lines), files are
+        flushed after each write of the buffer, so that they end at a record
+        boundary."""
+
+        ctrl = ctrl if ctrl is not None else self._DEFAULT_CONTROLS
+        self.max_open = max(1, ctrl.max_open_files)
+        self.buf_size = max(0, ctrl.write_buffer)
+        self.binary = binary
+        self.records = records
+        self.compression = ctrl.compression if compress else "none"
+        self.level = ctrl.compression_level
+
+        # Opened files in LRU order. The last item is the most recently used one.
+        self.__handles: OrderedDict[Hashable, Any] = OrderedDict()
+        # Paths of all files ever created in the pool
+        self.__paths: dict[Hashable, str] = {}
+        # Per-file write buffers and amount of buffered data
+        self.__buffers: dict[Hashable, list] = {}
+        self.__buffered: dict[Hashable, int] = {}
+
+        self.hits: int = 0
+        self.reopens: int = 0
+        self.evictions: int = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__paths
+
+    def __len__(self) -> int:
+        return len(self.__paths)
+
+    @property
+    def opened(self) -> int:
+        """Get the number of currently opened files."""
+        return len(self.__handles)
+
+    def path(self, key: Hashable) -> str:
+        """Get path to the file."""
+        return self.__paths[key]
+
+    def keys(self):
+        """Get keys of all files in the pool."""
+        return self.__paths.keys()
+
+    def _open(self, path: str, mode: str):
+        """Open file in text or binary mode, compressed if required"""
+        return open_output(path, mode, self.binary, self.compression, self.level)
+
+    def __evict(self) -> None:
+        """Close the least recently used files to free a descriptor"""
+        while len(self.__handles) >= self.max_open:
+            _, f = self.__handles.popitem(last=False)
+            f.close()
+            self.evictions += 1
+
+    def __acquire(self, key: Hashable):
+        """Return opened file descriptor. Reopen file in append mode if evicted."""
+        f = self.__handles.get(key)
+        if f is not None:
+            self.hits += 1
+            self.__handles.move_to_end(key)
+            return f
+
+        self.__evict()
+        f = self._open(self.__paths[key], "a")
+        self.reopens += 1
+        self.__handles[key] = f
+        return f
+
+    def create(self, key: Hashable, path: str) -> None:
+        """Create (truncate) new file and register it in the pool.
+        Extension of compressed file is added to the 'path'.
+        Raises OSError if file can't be created."""
+
+        path += COMPRESSION_EXT.get(self.compression, "")
+        if key in self.__handles:
+            self.__handles.pop(key).close()
+
+        self.__evict()
+        f = self._open(path, "w")
+        self.__handles[key] = f
+        self.__paths[key] = path
+        self.__buffers[key] = []
+        self.__buffered[key] = 0
+
+    def adopt(self, key: Hashable, path: str) -> None:
+        """Register existing file, e.g. output of interrupted conversion. Data are
+        appended to the file, it is opened on demand. 'path' is the full path."""
+
+        self.__paths[key] = path
+        self.__buffers[key] = []
+        self.__buffered[key] = 0
+
+    def write(self, key: Hashable, data: str | bytes) -> None:
+        """Put data into the file's write buffer.
+        Buffer is flushed to the file when it is full."""
+
+        self.__buffers[key].append(data)
+        self.__buffered[key] += len(data)
+        if self.__buffered[key] >= self.buf_size:
+            self.flush(key)
+
+    def flush(self, key: Hashable) -> None:
+        """Write content of the buffer to the file"""
+
+        buf = self.__buffers[key]
+        if not buf:
+            return
+
+        f = self.__acquire(key)
+        f.write((b"" if self.binary else "").join(buf))
+        if self.records:
+            f.flush()
+        buf.clear()
+        self.__buffered[key] = 0
+
+    def flush_all(self) -> None:
+        """Write content of all buffers to files"""
+        for key in self.__paths:
+            self.flush(key)
+
+    def sync(self) -> None:
+        """Write content of all buffers and flush opened files, so that written
+        data are visible to readers of the files"""
+        self.flush_all()
+        for f in self.__handles.values():
+            f.flush()
+
+    def close(self) -> None:
+        """Flush buffers and close all files"""
+
+        for key in self.__paths:
+            try:
+                self.flush(key)
+            except OSError as oe:
+                logger.error(f"Failed to write file '{self.__paths[key]}'.")
+                logger.error(f"{type(oe)}: {oe}")
+
+        for f in self.__handles.values():
+            f.close()
+
+        if self.__paths:
+            logger.info(
+                f"File pool: {len(self.__paths)} files, {self.hits} hits, "
+                + f"{self.reopens} reopens, {self.evictions} evictions."
+            )
+
+        self.__handles.clear()
+        self.__paths.clear()
+        self.__buffers.clear()
+        self.__buffered.clear()
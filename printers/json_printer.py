@@ -2,22 +2,32 @@
     Author: Kanstantsin Yuryeu
     Mail: konstantin.yuriev83@gmail.com
 
-    There are 3 classes here:
+    There are 4 classes here:
     1. PrintJSON() - top level. Receives DTO object with observables at the input and
     saves it's content into JSON files. Implements sub-decoder interface.
     2. JSONCore() - utility methods.
-    3. JSONControls() - DTO for control parameters.
+    3. JSONFastCore() - fast implementation of JSONCore() serialization methods.
+    4. JSONControls() - DTO for control parameters.
 """
 
 # pylint: disable = invalid-name, unused-import, consider-iterating-dictionary
 
-import io
 import os
-from dataclasses import asdict, is_dataclass
+from dataclasses import asdict, is_dataclass, fields
 from json import dumps as jdumps
+from json import loads as jloads
+from json import load as jload
+from json import JSONEncoder
 from printer_top import SubPrinterInterface
+from logger import LOGGER_CF as logger
+from .file_pool import FilePool, OutputControls
 from gnss_types import *  # pylint: disable = wildcard-import, unused-wildcard-import
 
+try:
+    import orjson  # pylint: disable = import-error
+except ImportError:
+    orjson = None
+
 __OBS_M123 = {ObservablesMSM, BareObservablesMSM123}
 __OBS_M4567 = {ObservablesMSM, BareObservablesMSM4567}
 
@@ -90,15 +100,28 @@ JSON_SPEC = {
 }
 
 
+# Output modes writing one JSON record per line (JSON Lines)
+JSON_LINES_MODES = ("JSONL", "JSONL-B", "JARGO-L")
+
+
 class JSONControls:
     """A DTO class for JSON printer controls."""
 
-    __slots__ = ("enable_hdr_data", "enable_aux_data", "enable_pretty_view")
+    __slots__ = (
+        "enable_hdr_data",
+        "enable_aux_data",
+        "enable_pretty_view",
+        "enable_fast_serializer",
+        "float_precision",
+    )
 
     def __init__(self) -> None:
         self.enable_hdr_data: bool = False
         self.enable_aux_data: bool = False
         self.enable_pretty_view: bool = False
+        self.enable_fast_serializer: bool = False
+        # Number of decimal places for floats. Negative - full precision.
+        self.float_precision: int = -1
 
 
 class PrintJSON:
@@ -109,16 +132,29 @@ class PrintJSON:
         work_dir: str,
         controls: JSONControls | None = None,
         mode: str = "JSON",
+        out_ctrls: OutputControls | None = None,
     ):
 
         assert os.path.isdir(work_dir), f"Output directory {work_dir} not found"
 
-        self.core = JSONCore(controls)
+        # JSON Lines: one self-contained record per line, no pretty view
+        self.__lines = mode in JSON_LINES_MODES
+        if self.__lines and controls is not None and controls.enable_pretty_view:
+            compact = JSONControls()
+            for s in JSONControls.__slots__:
+                setattr(compact, s, getattr(controls, s))
+            compact.enable_pretty_view = False
+            controls = compact
+
+        if controls is not None and controls.enable_fast_serializer:
+            self.core = JSONFastCore(controls)
+        else:
+            self.core = JSONCore(controls)
         self.__wd = work_dir
         self.__src_obj_type = type(object)
-        # Create an empty dictionary of opened files
-        # Members should have {message number:file_descriptor} form
-        self.__ofiles: dict[int, io.TextIOWrapper] = {}
+        # Create an empty pool of output files
+        # Files are identified by message number
+        self.__ofiles = FilePool(out_ctrls, records=self.__lines)
 
         self.io = SubPrinterInterface()
         self.io.data_spec = SubPrinterInterface.make_specs(mode)
@@ -129,6 +165,8 @@ class PrintJSON:
 
         self.io.print = self.__print
         self.io.close = self.__close
+        self.io.flush = self.__ofiles.sync
+        self.io.resume = self.__resume
         self.io.format = mode
 
     @staticmethod
@@ -137,7 +175,7 @@ class PrintJSON:
 
         base: path to the source file to be converted.
         msgNum: message number supported by JSON converter, see spec above
-        mode: conversion mode - 'JSON' or 'JSON-B'
+        mode: conversion mode - 'JSON', 'JSON-B', 'JSONL' or 'JSONL-B'
         """
 
         fpath, fname = os.path.split(base)
@@ -151,28 +189,64 @@ class PrintJSON:
         else:
             ofile = os.path.join(odir, "UNDEF", f"msg{msgNum}.json")
 
+        if mode in JSON_LINES_MODES:
+            ofile = ofile + "l"
+
         return ofile, odir, olog
 
+    @staticmethod
+    def load(path: str) -> list:
+        """Load JSON or JSON Lines file produced by the printer.
+        Return list of objects, the header object goes first. Unterminated last
+        line of JSON Lines file (conversion was interrupted) is dropped."""
+
+        with open(path, "r", encoding="utf-8") as f:
+            if not path.endswith(".jsonl"):
+                return jload(f)
+            rv = []
+            for line in f:
+                if not line.endswith("\n"):
+                    logger.warning(f"Unterminated last line dropped, '{path}'.")
+                    break
+                if line.strip():
+                    rv.append(jloads(line))
+            return rv
+
     def __close(self):
         """Close all opened files"""
-        if len(self.__ofiles):
-            for itm in self.__ofiles.values():
-                if isinstance(itm, io.TextIOWrapper):
-                    itm.write("\r]")
-                    itm.close()
-        self.__ofiles = {}
+        if not self.__lines:
+            for msg_num in self.__ofiles.keys():
+                self.__ofiles.write(msg_num, "\r]")
+        self.__ofiles.close()
+
+    def __resume(self, paths: list[str]) -> list[str]:
+        """Continue JSON files of interrupted conversion. Header is already written,
+        JSON arrays are closed at close()."""
+
+        ext = "l" if self.__lines else ""
+        names = {(atr[1], atr[3] + ext): num for num, atr in JSON_SPEC.items()}
+        rv = []
+        for path in paths:
+            head, fname = os.path.split(path)
+            num = names.get((os.path.basename(head), fname))
+            if num is not None:
+                self.__ofiles.adopt(num, path)
+                rv.append(path)
+        return rv
 
     def __create_ofile(self, msg_num: int):
         """Create new JSON file"""
 
         path = os.path.join(self.__wd, JSON_SPEC[msg_num][1])
         fname = JSON_SPEC[msg_num][3]
+        if self.__lines:
+            fname = fname + "l"
 
         try:
             if not os.path.isdir(path):
                 os.makedirs(path)
             path = os.path.join(path, fname)
-            self.__ofiles[msg_num] = open(path, "w", encoding="utf-8")
+            self.__ofiles.create(msg_num, path)
         except OSError as oe:
             raise AssertionError(
                 f"Failed to create target file '{path}: " + f"{type(oe)}: {oe}"
@@ -182,14 +256,23 @@ class PrintJSON:
         """Append a new row of observables to the file.
         If file doesn't exist, create new file, then append"""
 
-        if msg_num not in self.__ofiles.keys():
+        if msg_num not in self.__ofiles:
             # open output file and add header line
             self.__create_ofile(msg_num)
             hdr = {"source_type": self.__src_obj_type.__name__}
             hdr = jdumps(hdr, indent=None)
-            self.__ofiles[msg_num].write("[\r" + hdr)
+            if self.__lines:
+                self.__ofiles.write(msg_num, hdr + "\n")
+            else:
+                self.__ofiles.write(msg_num, "[\r" + hdr)
 
-        self.__ofiles[msg_num].write(line)
+        try:
+            self.__ofiles.write(msg_num, line)
+        except OSError as oe:
+            raise AssertionError(
+                f"Failed to write target file '{self.__ofiles.path(msg_num)}': "
+                + f"{type(oe)}: {oe}"
+            ) from oe
 
     # @catch_printer_asserts
     def __print(self, iblock: object):
@@ -217,7 +300,10 @@ class PrintJSON:
             msgNum in JSON_SPEC.keys()
         ), f"JSON printer doesn't support msg {msgNum}. Arrived with {self.__src_obj_type}"
 
-        data_string = ",\r" + data_string
+        if self.__lines:
+            data_string = data_string + "\n"
+        else:
+            data_string = ",\r" + data_string
         self.__append(msgNum, data_string)
 
 
@@ -351,3 +437,146 @@ class JSONCore:
             ) from ex
 
         return asStr
+
+
+class JSONFastCore(JSONCore):
+    """Fast implementation of JSON serialization.
+
+    Differs from JSONCore():
+    - DTO objects are repacked into dictionaries using precomputed tuples of field names,
+    no deep copies are made;
+    - compact JSON is emitted by the reusable encoder instance, 'orjson' is used if installed;
+    - floats may be rounded to 'float_precision' decimal places.
+    """
+
+    # Field names of DTO classes: {class: (name1, name2, ...)}
+    __FIELDS: dict[type, tuple[str, ...]] = {}
+
+    def __init__(
+        self, controls: JSONControls | None = None, use_orjson: bool = True
+    ) -> None:
+        super().__init__(controls)
+
+        self.precision = self.ctrls.float_precision
+        pretty = self.ctrls.enable_pretty_view
+
+        if use_orjson and orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            self.encode = lambda obj: orjson.dumps(obj, option=option).decode()
+        else:
+            encoder = JSONEncoder(
+                allow_nan=True,
+                ensure_ascii=False,
+                check_circular=False,
+                indent=2 if pretty else None,
+                separators=None if pretty else (",", ":"),
+            )
+            self.encode = encoder.encode
+
+    @classmethod
+    def field_names(cls, dtype: type) -> tuple[str, ...]:
+        """Get tuple of field names of a DTO class"""
+
+        names = cls.__FIELDS.get(dtype)
+        if names is None:
+            if is_dataclass(dtype):
+                names = tuple(f.name for f in fields(dtype))
+            else:
+                names = tuple(dtype.__slots__)
+            cls.__FIELDS[dtype] = names
+
+        return names
+
+    @classmethod
+    def as_dict(cls, obj: object) -> dict:
+        """Shallow conversion of DTO object into a dictionary"""
+        return {s: getattr(obj, s) for s in cls.field_names(type(obj))}
+
+    def round_floats(self, obj):
+        """Round floats in nested dictionaries, lists and tuples"""
+
+        if isinstance(obj, float):
+            return round(obj, self.precision)
+        if isinstance(obj, dict):
+            return {k: self.round_floats(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self.round_floats(v) for v in obj]
+
+        return obj
+
+    def serialize(self, obj: object) -> str:
+        """Convert dictionary into JSON string"""
+
+        if self.precision >= 0:
+            obj = self.round_floats(obj)
+
+        return self.encode(obj)
+
+    def ObservablesMSMtoPrintBuffer(self, pdata: ObservablesMSM) -> str:
+        """Return a JSON string encoding 'ObservablesMSM' data."""
+
+        try:
+            time = pdata.hdr.time + pdata.hdr.day * 86400000
+
+            summary = {}
+            if self.ctrls.enable_hdr_data:
+                summary["hdr"] = self.as_dict(pdata.hdr)
+            if self.ctrls.enable_aux_data:
+                summary["aux"] = self.as_dict(pdata.aux)
+            summary["obs"] = self.as_dict(pdata.obs)
+
+            asStr = self.serialize({time: summary})
+
+        except AttributeError as ke:
+            raise AssertionError(
+                "'ObservablesMSM' wasn't converted to dict: "
+                + f"{type(ke)}: {ke}"
+            ) from ke
+        except Exception as ex:
+            raise AssertionError(
+                f"JSON: can't serialize 'ObservablesMSM': {type(ex)}: {ex}"
+            ) from ex
+
+        return asStr
+
+    def BareObservablesMSMtoPrintBuffer(
+        self, pdata: BareObservablesMSM4567 | BareObservablesMSM123
+    ) -> str:
+        """Return a JSON string encoding 'BareObservables' data."""
+
+        try:
+            summary = {}
+            if self.ctrls.enable_hdr_data:
+                summary["hdr"] = self.as_dict(pdata.hdr)
+            if self.ctrls.enable_aux_data:
+                summary["aux"] = self.as_dict(pdata.atr)
+            summary["sat"] = self.as_dict(pdata.sat)
+            summary["sgn"] = self.as_dict(pdata.sgn)
+
+            asStr = self.serialize({pdata.time: summary})
+
+        except AttributeError as ke:
+            raise AssertionError(
+                "'BareObservablesMSM' wasn't converted to dict:"
+                + f"{type(ke)}: {ke}"
+            ) from ke
+        except Exception as ex:
+            raise AssertionError(
+                f"JSON: can't serialize 'BareObservablesMSM': {type(ex)}: {ex}"
+            ) from ex
+
+        return asStr
+
+    def dataClassToPrintBuffer(self, pdata: object) -> str:
+        """Return a JSON string encoding data class."""
+
+        try:
+            asStr = self.serialize(self.as_dict(pdata))
+        except Exception as ex:
+            raise AssertionError(
+                f"JSON: can't serialize {type(pdata)}: {type(ex)}: {ex}"
+            ) from ex
+
+        return asStr
@@ -2,25 +2,36 @@
     Author: Kanstantsin Yuryeu
     Mail: konstantin.yuriev83@gmail.com
 
-    There are 3 classes here:
+    There are 4 classes here:
     1. MSMtoMARGO() - top level. Receives DTO objects with observables at the input and
     saves them into MARGO files. Implements sub-decoder interface.
     2. MargoCore() - utility methods.
     3. MargoControls() - DTO for control parameters.
+    4. EpochClock() - resolves GPS time of epochs from time of week.
 """
 
 # pylint: disable = invalid-name, unused-import, consider-iterating-dictionary
 
-import io
 import os
+import time as systime
 
 from printer_top import SubPrinterInterface
+from .file_pool import FilePool, OutputControls
 from gnss_types import ObservablesMSM, BareObservablesMSM4567
 from utilities import MSMT
 
 from logger import LOGGER_CF as logger
 
 
+# Epoch of messages which have no time fields
+NO_EPOCH: int = -1
+
+MS_IN_DAY: int = 86400000
+MS_IN_WEEK: int = 604800000
+# Origin of GPS time 1980-01-06 in UNIX time, [ms]
+GPS_EPOCH_UNIX_MS: int = 315964800000
+
+
 class MargoControls:
     """Defines some parameters to control MARGO performance"""
 
@@ -28,6 +39,8 @@ class MargoControls:
         "half_cycle_enable",
         "lock_time_enable",
         "gps_utc_shift",
+        "gps_week",
+        "ref_time",
         "glo_lit_tab",
     )
 
@@ -35,6 +48,11 @@ class MargoControls:
         self.half_cycle_enable = False
         self.lock_time_enable = False
         self.gps_utc_shift = 18
+        # GPS week of observations. 0 - not defined.
+        self.gps_week = 0
+        # UNIX time close to observations (e.g. modification time of the source),
+        # [ns]. GPS week is guessed from it if not defined. 0 - system clock.
+        self.ref_time = 0
         self.glo_lit_tab = {
             1: 1,
             2: -4,
@@ -81,6 +99,11 @@ class MargoCore:
         """Get UTC shift."""
         return self.ctrl.gps_utc_shift
 
+    @property
+    def gps_week(self):
+        """Get GPS week of observations, 0 - not defined."""
+        return self.ctrl.gps_week
+
     @property
     def HC_EN(self):
         """Return True if Half Cycle Correction info is available."""
@@ -188,6 +211,23 @@ class MargoCore:
         else:
             return time
 
+    def epoch_clock(self) -> "EpochClock":
+        """Make clock resolving GPS time of observations. If GPS week isn't defined,
+        epochs are resolved to the week nearest to the reference time (system clock)."""
+
+        if self.gps_week > 0:
+            return EpochClock(self.gps_week, utc_shift=self.utc_shift)
+
+        ref_time = self.ctrl.ref_time
+        clock = EpochClock.from_time(ref_time or systime.time_ns(), self.utc_shift)
+        logger.warning(
+            "GPS week isn't defined (GPS_WEEK of [TIME] section), epochs are taken "
+            + "near "
+            + ("modification time of the source" if ref_time else "the system clock")
+            + f" (week {clock.week})."
+        )
+        return clock
+
     def make_crr_frq(self, gnss, sgn) -> tuple[float, ...]:
         """Create tuple of carrier frequencies for all sats of given GNSS and signal, [MHz]"""
         frq = (MSMT.crr_frq(gnss, sgn),) * self.MAX_SATS(gnss)
@@ -377,35 +417,103 @@ class MargoCore:
         return line1, line2
 
 
+class EpochClock:
+    """Resolves GPS time of epochs from time of week tracking week rollovers.
+    'week', 'tow' - GPS week and time of week of the last epoch, [ms]. If 'tow' is
+    NO_EPOCH, the first epoch is in the 'week'.
+    'utc_shift' - GPS-UTC shift for GLONASS epochs, [s]."""
+
+    def __init__(self, week: int, tow: int = NO_EPOCH, utc_shift: int = 18) -> None:
+        self.week = week
+        self.tow = tow
+        self.utc_shift = utc_shift
+
+    @classmethod
+    def from_time(cls, unix_ns: int, utc_shift: int = 18) -> "EpochClock":
+        """Make clock with the last epoch at UNIX time 'unix_ns' (e.g. modification
+        time of the source), following epochs are resolved to the nearest week"""
+
+        gps = unix_ns // 1000000 - GPS_EPOCH_UNIX_MS + utc_shift * 1000
+        return cls(gps // MS_IN_WEEK, gps % MS_IN_WEEK, utc_shift)
+
+    def resolve(self, tow: int) -> int:
+        """Convert GPS time of week into GPS time, [ms]. Late epochs of the previous
+        week don't move the clock."""
+
+        if self.tow != NO_EPOCH:
+            if self.tow - tow > MS_IN_WEEK // 2:
+                self.week += 1
+            elif tow - self.tow > MS_IN_WEEK // 2:
+                return (self.week - 1) * MS_IN_WEEK + tow
+        self.tow = tow
+        return self.week * MS_IN_WEEK + tow
+
+    def resolve_tod(self, tod: int) -> int:
+        """Convert GPS time of day into GPS time of the epoch nearest to the last one,
+        [ms]. Return NO_EPOCH until time of week is known."""
+
+        if self.tow == NO_EPOCH:
+            return NO_EPOCH
+        tow = self.tow - self.tow % MS_IN_DAY + tod
+        if tow - self.tow > MS_IN_DAY // 2:
+            tow -= MS_IN_DAY
+        elif self.tow - tow > MS_IN_DAY // 2:
+            tow += MS_IN_DAY
+        return self.resolve(tow % MS_IN_WEEK)
+
+    def epoch(self, gnss: str, time: int, day: int = 7) -> int:
+        """Resolve GPS time of the epoch from time field of MSM or legacy message:
+        time of week of GNSS, GLONASS - time of day and day of week (7 - unknown)"""
+
+        if gnss == "R" and day == 7:
+            return self.resolve_tod((time - (10800 - self.utc_shift) * 1000) % MS_IN_DAY)
+        return self.resolve(MargoCore.conv_to_gps_time(time, day, self.utc_shift, gnss))
+
+
 class PrintMARGO:
     """Provides methods to print RTCM data in MARGO format."""
 
     def __init__(
-        self, work_dir: str, ctrls: MargoControls, mode: str = "MARGO"
+        self,
+        work_dir: str,
+        ctrls: MargoControls,
+        mode: str = "MARGO",
+        out_ctrls: OutputControls | None = None,
     ):
 
         assert os.path.isdir(work_dir), f"Output directory {work_dir} not found"
 
         self.core = MargoCore(ctrls)
         self.__wd = work_dir
-        # Create an empty dictionary of opened files
-        # Members should have 'file_name':file_descriptor form
-        self.__ofiles: dict[str, io.TextIOWrapper] = {}
+        # Create an empty pool of output files
+        # Files are identified by 'file_name'
+        self.__ofiles = FilePool(out_ctrls)
 
         self.io = SubPrinterInterface()
         self.io.data_spec = SubPrinterInterface.make_specs(mode)
         self.io.actual_spec = {ObservablesMSM}  # shall match self.__print()
         self.io.print = self.__print
         self.io.close = self.__close
+        self.io.flush = self.__ofiles.sync
+        self.io.resume = self.__resume
         self.io.format = mode
 
     def __close(self):
         """Close all opened files"""
-        if len(self.__ofiles):
-            for itm in self.__ofiles.values():
-                if isinstance(itm, io.TextIOWrapper):
-                    itm.close()
-        self.__ofiles = {}
+        self.__ofiles.close()
+
+    def __resume(self, paths: list[str]) -> list[str]:
+        """Continue MARGO files of interrupted conversion, headers are already written"""
+
+        rv = []
+        for path in paths:
+            head, oname = os.path.split(path)
+            if not oname.endswith(".obs") or oname[0] not in self.core.GNSSTUPLE():
+                continue
+            if os.path.basename(head) == self.core.DIRNAME(oname[0]):
+                self.__ofiles.adopt(oname, path)
+                rv.append(path)
+        return rv
 
     def __create_ofile(self, oname: str) -> bool:
         """Create new MARGO file and fill header"""
@@ -416,7 +524,7 @@ class PrintMARGO:
             if not os.path.isdir(path):
                 os.makedirs(path)
             path = os.path.join(path, oname)
-            self.__ofiles[oname] = open(path, "w", encoding="utf-8")
+            self.__ofiles.create(oname, path)
             return True
         except OSError as oe:
             logger.error(f"Failed to create target file '{path}'.")
@@ -426,15 +534,21 @@ class PrintMARGO:
     def __append(self, ofile: str, line: str) -> bool:
         """Append a new row of observables to the file.
         If file doesn't exist, create new file and fill header, then append"""
-        if ofile not in self.__ofiles.keys():
+        if ofile not in self.__ofiles:
             if self.__create_ofile(ofile):
                 h1, h2 = self.core.make_header(ofile)
-                self.__ofiles[ofile].write(h1)
-                self.__ofiles[ofile].write(h2)
+                self.__ofiles.write(ofile, h1)
+                self.__ofiles.write(ofile, h2)
             else:
                 return False
 
-        self.__ofiles[ofile].write(line)
+        try:
+            self.__ofiles.write(ofile, line)
+        except OSError as oe:
+            logger.error(f"Failed to write target file '{ofile}'.")
+            logger.error(f"{type(oe)}: {oe}")
+            return False
+
         return True
 
     def __print_ObservablesMSM(self, obs: ObservablesMSM):
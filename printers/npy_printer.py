@@ -0,0 +1,215 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    There are 2 classes here:
+    1. PrintNPY() - top level. Receives DTO objects with observables at the input and
+    saves them into binary NumPy (.npy) files. Implements sub-printer interface.
+    2. NpyCore() - utility methods to write/read .npy files without NumPy.
+
+    Output files follow MARGO layout: one file per GNSS/observable/signal, one row per
+    epoch, one column per satellite ('NaN' if no measurement). Observables are stored as
+    float64 array (epochs x MAX_SATS), GPS time of week [ms] - in a companion int64
+    array '<name>_time.npy'. Array shapes are unknown until conversion ends, so .npy
+    headers are written with zero number of rows and patched in close().
+    Files can be opened as 'numpy.load(path, mmap_mode="r")'.
+"""
+
+# pylint: disable = invalid-name
+
+import os
+import ast
+import sys
+import struct
+from array import array
+
+from printer_top import SubPrinterInterface
+from .file_pool import FilePool, OutputControls
+from .margo_printer import MargoControls, MargoCore
+from gnss_types import ObservablesMSM
+
+from logger import LOGGER_CF as logger
+
+
+class NpyCore:
+    """Utility methods to make .npy files"""
+
+    # .npy format version 1.0
+    MAGIC = b"\x93NUMPY\x01\x00"
+    # Total length of the header. Reserved to fit any number of rows.
+    HDR_LEN = 128
+
+    # Type descriptors of arrays
+    DESCR = {"d": "<f8", "q": "<i8"}
+
+    @classmethod
+    def make_header(cls, tcode: str, rows: int, columns: int = 0) -> bytes:
+        """Make .npy header for array of 'rows' x 'columns' items.
+        One-dimensional array is described if 'columns' is 0."""
+
+        shape = f"({rows}, {columns})" if columns else f"({rows},)"
+        hdr = (
+            f"{{'descr': '{cls.DESCR[tcode]}', "
+            + f"'fortran_order': False, 'shape': {shape}, }}"
+        )
+        size = cls.HDR_LEN - len(cls.MAGIC) - 2
+        assert len(hdr) < size, "Too long .npy header."
+        hdr = hdr.ljust(size - 1) + "\n"
+        return cls.MAGIC + struct.pack("<H", size) + hdr.encode("latin1")
+
+    @staticmethod
+    def pack(tcode: str, values) -> bytes:
+        """Pack values into little-endian binary row"""
+        row = array(tcode, values)
+        if sys.byteorder != "little":
+            row.byteswap()
+        return row.tobytes()
+
+    @staticmethod
+    def time_file_name(ofile_name: str) -> str:
+        """Make name of the companion file with time values."""
+        name, ext = os.path.splitext(ofile_name)
+        return name + "_time" + ext
+
+    @classmethod
+    def patch_header(cls, path: str, tcode: str, rows: int, columns: int = 0):
+        """Write the final header into existing .npy file."""
+        with open(path, "r+b") as f:
+            f.write(cls.make_header(tcode, rows, columns))
+
+    @staticmethod
+    def read(path: str) -> tuple[tuple[int, ...], array]:
+        """Read .npy file written by NpyCore. Return (shape, flat array of values).
+        Use it where NumPy is not available."""
+
+        with open(path, "rb") as f:
+            magic = f.read(8)
+            assert magic[:6] == NpyCore.MAGIC[:6], f"{path} is not .npy file."
+            (size,) = struct.unpack("<H", f.read(2))
+            hdr = ast.literal_eval(f.read(size).decode("latin1"))
+            tcode = {v: k for k, v in NpyCore.DESCR.items()}.get(hdr["descr"])
+            assert tcode is not None, f"Unsupported data type {hdr['descr']}."
+            values = array(tcode)
+            values.frombytes(f.read())
+            if sys.byteorder != "little":
+                values.byteswap()
+
+        return hdr["shape"], values
+
+
+class PrintNPY:
+    """Provides methods to print observables into .npy files."""
+
+    def __init__(
+        self,
+        work_dir: str,
+        ctrls: MargoControls,
+        mode: str = "NPY",
+        out_ctrls: OutputControls | None = None,
+    ):
+
+        assert os.path.isdir(work_dir), f"Output directory {work_dir} not found"
+
+        self.core = MargoCore(ctrls)
+        self.__wd = work_dir
+        # Pool of output files. Files are identified by 'file_name'.
+        # Files are not compressed: headers are patched in place, arrays are mapped.
+        self.__ofiles = FilePool(out_ctrls, binary=True, compress=False)
+        # Number of rows and columns written to each file
+        self.__shapes: dict[str, list[int]] = {}
+
+        self.io = SubPrinterInterface()
+        self.io.data_spec = SubPrinterInterface.make_specs(mode)
+        self.io.actual_spec = {ObservablesMSM}  # shall match self.__print()
+        self.io.print = self.__print
+        self.io.close = self.__close
+        self.io.flush = self.__ofiles.sync
+        self.io.format = mode
+
+    @staticmethod
+    def make_npy_file_name(obs_file_name: str) -> str:
+        """Convert MARGO file name into .npy file name."""
+        name, _ = os.path.splitext(obs_file_name)
+        return name + ".npy"
+
+    def __close(self):
+        """Close all opened files and write actual array shapes into headers."""
+
+        paths = {key: self.__ofiles.path(key) for key in self.__ofiles.keys()}
+        self.__ofiles.close()
+
+        for key, (rows, columns) in self.__shapes.items():
+            for tcode, path, cols in (
+                ("d", paths[key], columns),
+                ("q", paths[(key, "time")], 0),
+            ):
+                try:
+                    NpyCore.patch_header(path, tcode, rows, cols)
+                except OSError as oe:
+                    logger.error(f"Failed to finalize target file '{path}'.")
+                    logger.error(f"{type(oe)}: {oe}")
+
+        self.__shapes.clear()
+
+    def __create_ofile(self, oname: str, columns: int) -> bool:
+        """Create new .npy file and companion time file, write headers"""
+
+        path = os.path.join(self.__wd, self.core.DIRNAME(oname[0]))
+
+        try:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            fname = self.make_npy_file_name(oname)
+            opath = os.path.join(path, fname)
+            self.__ofiles.create(oname, opath)
+            self.__ofiles.write(oname, NpyCore.make_header("d", 0, columns))
+            opath = os.path.join(path, NpyCore.time_file_name(fname))
+            self.__ofiles.create((oname, "time"), opath)
+            self.__ofiles.write((oname, "time"), NpyCore.make_header("q", 0))
+            self.__shapes[oname] = [0, columns]
+            return True
+        except OSError as oe:
+            logger.error(f"Failed to create target file '{opath}'.")
+            logger.error(f"{type(oe)}: {oe}")
+            return False
+
+    def __append(self, ofile: str, values: list) -> bool:
+        """Append a new row of observables to the file.
+        If file doesn't exist, create new file, then append"""
+
+        time, *obs = values
+
+        if ofile not in self.__shapes:
+            if not self.__create_ofile(ofile, len(obs)):
+                return False
+
+        try:
+            self.__ofiles.write(ofile, NpyCore.pack("d", map(float, obs)))
+            self.__ofiles.write((ofile, "time"), NpyCore.pack("q", (time,)))
+        except OSError as oe:
+            logger.error(f"Failed to write target file '{ofile}'.")
+            logger.error(f"{type(oe)}: {oe}")
+            return False
+
+        self.__shapes[ofile][0] += 1
+        return True
+
+    def __print_ObservablesMSM(self, obs: ObservablesMSM):
+        """Print data from ObservablesMSM data block"""
+        # Make raw-of-values for each parameter to be printed
+        pbuf = self.core.ObservablesMSMtoPrintBuffer(obs)
+
+        for f, observables in pbuf.items():
+            self.__append(f, observables)
+
+    def __print(self, iblock: object):
+        """NPY printer"""
+
+        assert isinstance(
+            iblock, tuple(self.io.actual_spec)
+        ), f"Printer does not support {type(iblock)}"
+
+        if isinstance(iblock, ObservablesMSM):
+            self.__print_ObservablesMSM(iblock)
+        else:
+            assert False, f"Printer does not support {type(iblock)}"
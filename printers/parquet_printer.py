@@ -0,0 +1,219 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    There are 2 classes here:
+    1. PrintParquet() - top level. Receives DTO objects at the input and saves them
+    into Apache Parquet files. Implements sub-printer interface.
+    2. ParquetControls() - DTO for control parameters.
+
+    Output structure:
+    obs/gnss=<G|R|E|...>/date=<YYYY-MM-DD>/part-0.parquet - observables, long
+        format, see TableCore.OBS_COLUMNS. 'date' is GPS calendar date of epochs.
+    eph/<EphXXX>.parquet - ephemerides, one file per DTO class.
+    base/<BaseXXX>.parquet - base station data, one file per DTO class.
+
+    Rows are collected in column batches and written as a record batch (row group)
+    per 'batch_epochs' messages. Requires 'pyarrow' package.
+"""
+
+# pylint: disable = invalid-name
+
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from printer_top import SubPrinterInterface
+from .margo_printer import MargoControls
+from .table_core import TableCore
+from gnss_types import ObservablesMSM
+from gnss_types import EphGPS, EphGLO, EphBDS, EphGALF, EphGALI, EphNAVIC, EphQZS
+from gnss_types import BaseRP, BaseRPH, BaseAD, BaseADSN, BaseADSNRC, BaseSP, BaseTS
+from gnss_types import BaseGLBS
+
+from logger import LOGGER_CF as logger
+
+
+class ParquetControls:
+    """Defines some parameters to control Parquet printer"""
+
+    __slots__ = ("batch_epochs", "compression")
+
+    def __init__(self) -> None:
+        # Number of messages (epochs) collected in one record batch
+        self.batch_epochs: int = 100
+        # Compression codec: none, snappy, gzip, zstd, lz4, brotli
+        self.compression: str = "zstd"
+
+
+class PrintParquet:
+    """Provides methods to print RTCM data into Parquet files."""
+
+    _DEFAULT_CONTROLS = ParquetControls()
+
+    __EPH = (EphGPS, EphGLO, EphBDS, EphGALF, EphGALI, EphNAVIC, EphQZS)
+    __BASE = (BaseRP, BaseRPH, BaseAD, BaseADSN, BaseADSNRC, BaseSP, BaseTS, BaseGLBS)
+
+    @staticmethod
+    def available() -> bool:
+        """Check whether 'pyarrow' package is installed."""
+        return pa is not None
+
+    def __init__(
+        self,
+        work_dir: str,
+        ctrls: ParquetControls | None = None,
+        mode: str = "PARQUET",
+        margo_ctrls: MargoControls | None = None,
+    ):
+
+        assert os.path.isdir(work_dir), f"Output directory {work_dir} not found"
+        assert self.available(), "Package 'pyarrow' not installed."
+
+        self.ctrl = ctrls if ctrls is not None else self._DEFAULT_CONTROLS
+        self.core = TableCore(margo_ctrls)
+        self.__wd = work_dir
+
+        # Tables are identified by keys:
+        # ("obs", gnss, date) - observables, ("eph" | "base", DTO class) - others
+        self.__writers: dict[tuple, pq.ParquetWriter] = {}
+        self.__schemas: dict[tuple, pa.Schema] = {}
+        self.__rows: dict[tuple, list[tuple]] = {}
+        self.__epochs: dict[tuple, int] = {}
+        self.__batches = 0
+
+        self.io = SubPrinterInterface()
+        self.io.data_spec = SubPrinterInterface.make_specs(mode)
+        self.io.actual_spec = {ObservablesMSM, *self.__EPH, *self.__BASE}
+        self.io.print = self.__print
+        self.io.close = self.__close
+        self.io.format = mode
+
+    @staticmethod
+    def make_schema(columns: tuple[tuple[str, str], ...]):
+        """Convert TableCore columns into Arrow schema"""
+        types = {"i": pa.int64(), "f": pa.float64(), "s": pa.string(), "b": pa.bool_()}
+        return pa.schema([(name, types[ctype]) for name, ctype in columns])
+
+    def make_path(self, key: tuple) -> str:
+        """Make path to Parquet file of the table"""
+        if key[0] == "obs":
+            _, gnss, gdate = key
+            return os.path.join(
+                self.__wd, "obs", f"gnss={gnss}", f"date={gdate}", "part-0.parquet"
+            )
+        group, dtype = key
+        return os.path.join(self.__wd, group, self.core.table_name(dtype) + ".parquet")
+
+    def __flush(self, key: tuple) -> None:
+        """Write collected rows of the table as a record batch. Rows of the failed
+        batch are dropped, the failure is raised as AssertionError to be counted
+        by PrinterTop."""
+
+        rows = self.__rows[key]
+        if not rows:
+            return
+
+        schema = self.__schemas[key]
+        try:
+            writer = self.__writers.get(key)
+            if writer is None:
+                path = self.make_path(key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                writer = pq.ParquetWriter(
+                    path, schema, compression=self.ctrl.compression
+                )
+                self.__writers[key] = writer
+
+            columns = zip(*rows)
+            arrays = [
+                pa.array(col, type=fld.type) for col, fld in zip(columns, schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            self.__batches += 1
+        except (OSError, pa.ArrowException) as ex:
+            raise AssertionError(
+                f"Failed to write table '{self.make_path(key)}', {len(rows)} rows"
+                + f" dropped: {type(ex)}: {ex}"
+            ) from ex
+        finally:
+            rows.clear()
+            self.__epochs[key] = 0
+
+    def __append(self, key: tuple, columns, rows: list[tuple]) -> None:
+        """Collect rows of the table. Flush the batch when it is full."""
+
+        if key not in self.__rows:
+            self.__schemas[key] = self.make_schema(columns)
+            self.__rows[key] = []
+            self.__epochs[key] = 0
+
+        self.__rows[key].extend(rows)
+        self.__epochs[key] += 1
+        if self.__epochs[key] >= self.ctrl.batch_epochs:
+            self.__flush(key)
+
+    def __close(self):
+        """Write the rest of data and close all files. Failures don't prevent
+        writing other tables and are raised at the end."""
+
+        failures = 0
+        for key in self.__rows:
+            try:
+                self.__flush(key)
+            except AssertionError as ae:
+                logger.error(f"{ae.args[0]}")
+                failures += 1
+
+        for key, writer in self.__writers.items():
+            try:
+                writer.close()
+            except (OSError, pa.ArrowException) as ex:
+                logger.error(f"Failed to close table '{self.make_path(key)}'.")
+                logger.error(f"{type(ex)}: {ex}")
+                failures += 1
+
+        if self.__writers:
+            logger.info(
+                f"Parquet: {len(self.__writers)} files, {self.__batches} batches."
+            )
+
+        self.__writers.clear()
+        self.__rows.clear()
+
+        assert failures == 0, f"Parquet: failed to write {failures} tables."
+
+    def __print_ObservablesMSM(self, obs: ObservablesMSM):
+        """Print data from ObservablesMSM data block"""
+        rows = self.core.ObservablesMSMtoRows(obs)
+        if not rows:
+            return
+        key = ("obs", obs.atr.gnss, self.core.gps_date(rows[0][0]))
+        self.__append(key, self.core.OBS_COLUMNS, rows)
+
+    def __print_dataclass(self, group: str, pdata: object):
+        """Print ephemeris or base station data"""
+        dtype = type(pdata)
+        row = self.core.dataClassToRow(pdata)
+        self.__append((group, dtype), self.core.columns(dtype), [row])
+
+    def __print(self, iblock: object):
+        """Parquet printer"""
+
+        assert isinstance(
+            iblock, tuple(self.io.actual_spec)
+        ), f"Printer does not support {type(iblock)}"
+
+        if isinstance(iblock, ObservablesMSM):
+            self.__print_ObservablesMSM(iblock)
+        elif isinstance(iblock, self.__EPH):
+            self.__print_dataclass("eph", iblock)
+        elif isinstance(iblock, self.__BASE):
+            self.__print_dataclass("base", iblock)
+        else:
+            assert False, f"Printer does not support {type(iblock)}"
@@ -0,0 +1,393 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    There are 3 classes here:
+    1. PrintRINEX() - top level. Receives DTO objects with observables at the input and
+    saves them into RINEX 3.05 observation file. Implements sub-printer interface.
+    2. RinexCore() - utility methods to make RINEX records.
+    3. RinexControls() - DTO for control parameters.
+
+    Observables of different GNSS with the same GPS time are assembled into one epoch.
+    Epoch is written when the last message of the epoch is received (MMB == 0).
+    List of observation types is unknown until conversion ends, so the body of the file
+    is written into a temporary file, the header is written in close(). New observation
+    types are appended to the end of GNSS list, so previous records stay valid.
+    MSM messages carry time of week only, GPS week is taken from MARGO controls
+    ([TIME] section of ini file) or guessed from modification time of the source.
+"""
+
+# pylint: disable = invalid-name
+
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+
+from printer_top import SubPrinterInterface
+from .file_pool import FilePool, OutputControls, COMPRESSION_EXT, open_output
+from .margo_printer import MargoControls, MargoCore, NO_EPOCH
+from gnss_types import ObservablesMSM
+
+from logger import LOGGER_CF as logger
+
+
+class RinexControls:
+    """Defines some parameters to control RINEX printer"""
+
+    __slots__ = ("marker_name", "observer", "agency")
+
+    def __init__(self) -> None:
+        # Marker name. Empty - name of the source file.
+        self.marker_name: str = ""
+        self.observer: str = ""
+        self.agency: str = ""
+
+
+class RinexCore:
+    """Utility methods of RINEX printer"""
+
+    VERSION = 3.05
+    GPS_EPOCH = datetime(1980, 1, 6, tzinfo=timezone.utc)
+    MS_IN_WEEK = 604800000
+
+    # MARGO GNSS literals to RINEX system identifiers
+    __SYS = {"G": "G", "R": "R", "E": "E", "S": "S", "Q": "J", "B": "C", "I": "I"}
+    # Offset between MSM satellite ID and RINEX satellite number
+    __PRN_OFFSET = {"S": 19}
+
+    # Observation record: F14.3, LLI (I1), SSI (I1)
+    OBS_FIELD = "{:14.3f}{}{}"
+    OBS_BLANK = " " * 16
+    OBS_MAX = 1e10
+
+    @classmethod
+    def sys_id(cls, gnss: str) -> str:
+        """Get RINEX system identifier."""
+        rv = cls.__SYS.get(gnss)
+        assert rv is not None, f"GNSS {gnss} not supported by RINEX printer."
+        return rv
+
+    @classmethod
+    def sat_id(cls, gnss: str, sat: int) -> str:
+        """Get RINEX satellite identifier, e.g. 'G05'."""
+        return f"{cls.sys_id(gnss)}{sat + cls.__PRN_OFFSET.get(gnss, 0):02d}"
+
+    @staticmethod
+    def ssi(c2n: float | None) -> str:
+        """Signal strength indicator, RINEX 3.05 5.7"""
+        if c2n is None:
+            return " "
+        return str(min(max(int(c2n / 6), 1), 9))
+
+    @staticmethod
+    def header_line(content: str, label: str) -> str:
+        """Make header line: content in columns 1-60, label in 61-80."""
+        return f"{content:<60.60}{label:<20}\n"
+
+    @classmethod
+    def gps_datetime(cls, week: int, tow: int) -> datetime:
+        """Convert GPS week and time of week [ms] into calendar time."""
+        return cls.GPS_EPOCH + timedelta(weeks=week, milliseconds=tow)
+
+    @classmethod
+    def epoch_line(cls, epoch: datetime, nsats: int, flag: int = 0) -> str:
+        """Make epoch record line."""
+        sec = epoch.second + epoch.microsecond * 1e-6
+        return (
+            f"> {epoch.year:4d} {epoch.month:02d} {epoch.day:02d} "
+            + f"{epoch.hour:02d} {epoch.minute:02d}{sec:11.7f}  {flag:1d}{nsats:3d}\n"
+        )
+
+    @classmethod
+    def obs_types_lines(cls, sys: str, types: list[str]) -> list[str]:
+        """Make 'SYS / # / OBS TYPES' lines."""
+        rv = []
+        for i in range(0, max(len(types), 1), 13):
+            head = f"{sys}  {len(types):3d}" if i == 0 else " " * 6
+            content = head + "".join(f" {t:3}" for t in types[i : i + 13])
+            rv.append(cls.header_line(content, "SYS / # / OBS TYPES"))
+        return rv
+
+    @classmethod
+    def glo_slots_lines(cls, slots: dict[int, int]) -> list[str]:
+        """Make 'GLONASS SLOT / FRQ #' lines."""
+        items = [f"R{sat:02d} {frq:2d} " for sat, frq in sorted(slots.items())]
+        rv = []
+        for i in range(0, max(len(items), 1), 8):
+            head = f"{len(items):3d} " if i == 0 else " " * 4
+            content = head + "".join(items[i : i + 8])
+            rv.append(cls.header_line(content, "GLONASS SLOT / FRQ #"))
+        return rv
+
+
+class PrintRINEX:
+    """Provides methods to print observables into RINEX 3 observation file."""
+
+    _DEFAULT_CONTROLS = RinexControls()
+
+    # Max. number of incomplete epochs kept in memory
+    MAX_PENDING_EPOCHS = 3
+
+    def __init__(
+        self,
+        work_dir: str,
+        ctrls: RinexControls | None = None,
+        mode: str = "RINEX",
+        margo_ctrls: MargoControls | None = None,
+        out_ctrls: OutputControls | None = None,
+    ):
+
+        assert os.path.isdir(work_dir), f"Output directory {work_dir} not found"
+
+        self.ctrl = ctrls if ctrls is not None else self._DEFAULT_CONTROLS
+        self.core = RinexCore()
+        self.margo = MargoCore(margo_ctrls)
+
+        name = os.path.basename(os.path.normpath(work_dir))
+        self.path = os.path.join(work_dir, name + ".rnx")
+        self.marker = self.ctrl.marker_name or name
+        if out_ctrls is not None:
+            self.path += COMPRESSION_EXT.get(out_ctrls.compression, "")
+
+        # GPS week of epochs, week rollovers are tracked
+        self.clock = self.margo.epoch_clock()
+        self.__first_obs: datetime | None = None
+        self.__epochs = 0
+
+        # Observation types of each GNSS, append-only: {'G': ['C1C', 'L1C',..],}
+        self.__types: dict[str, list[str]] = {}
+        # Position of observation type in the record: {'G': {'C1C': 0,..},}
+        self.__index: dict[str, dict[str, int]] = {}
+        # Observed GLONASS satellites: {sat: frequency number}
+        self.__glo_slots: dict[int, int] = {}
+        # Carrier wave lengths: {(gnss, signal): (lambda of sat 1, ...)}
+        self.__lambdas: dict[tuple[str, str], tuple[float, ...]] = {}
+        # Last lock time values to detect loss of lock: {(sat id, signal): lock time}
+        self.__lock: dict[tuple[str, str], int] = {}
+        # Incomplete epochs: {GPS time, [ms]: {sat id: [fields]}}
+        self.__pending: dict[int, dict[str, list[str]]] = {}
+        # Records skipped as GPS time of their epochs is unknown
+        self.__undated = 0
+
+        # Body of the file, header is added in close(). Body is not compressed,
+        # the final file is compressed in accordance with output controls.
+        self.__out = out_ctrls if out_ctrls is not None else OutputControls()
+        self.__ofiles = FilePool(out_ctrls, compress=False)
+        try:
+            self.__ofiles.create("body", self.path + ".body")
+        except OSError as oe:
+            logger.error(f"Failed to create target file '{self.path}'.")
+            logger.error(f"{type(oe)}: {oe}")
+
+        self.io = SubPrinterInterface()
+        self.io.data_spec = SubPrinterInterface.make_specs(mode)
+        self.io.actual_spec = {ObservablesMSM}  # shall match self.__print()
+        self.io.print = self.__print
+        self.io.close = self.__close
+        self.io.flush = self.__ofiles.sync
+        self.io.format = mode
+
+    def make_header(self) -> str:
+        """Make RINEX header from collected observation types."""
+
+        hl = self.core.header_line
+        sysids = {self.core.sys_id(g) for g in self.__types}
+        ftype = sysids.pop() if len(sysids) == 1 else "M"
+        now = datetime.now(timezone.utc).strftime("%Y%m%d %H%M%S UTC")
+
+        lines = [
+            hl(
+                f"{self.core.VERSION:9.2f}{'':11}{'OBSERVATION DATA':20}{ftype:20}",
+                "RINEX VERSION / TYPE",
+            ),
+            hl(f"{'rtcm3-converter':20}{'':20}{now:20}", "PGM / RUN BY / DATE"),
+            hl(self.marker, "MARKER NAME"),
+            hl("GEODETIC", "MARKER TYPE"),
+            hl(f"{self.ctrl.observer:20}{self.ctrl.agency:40}", "OBSERVER / AGENCY"),
+            hl("", "REC # / TYPE / VERS"),
+            hl("", "ANT # / TYPE"),
+            hl(f"{0.0:14.4f}{0.0:14.4f}{0.0:14.4f}", "APPROX POSITION XYZ"),
+            hl(f"{0.0:14.4f}{0.0:14.4f}{0.0:14.4f}", "ANTENNA: DELTA H/E/N"),
+        ]
+
+        for gnss, types in self.__types.items():
+            lines += self.core.obs_types_lines(self.core.sys_id(gnss), types)
+        for gnss in self.__types:
+            lines.append(hl(self.core.sys_id(gnss), "SYS / PHASE SHIFT"))
+
+        if "R" in self.__types:
+            lines += self.core.glo_slots_lines(self.__glo_slots)
+            lines.append(hl("", "GLONASS COD/PHS/BIS"))
+
+        if self.__first_obs is not None:
+            t = self.__first_obs
+            sec = t.second + t.microsecond * 1e-6
+            lines.append(
+                hl(
+                    f"{t.year:6d}{t.month:6d}{t.day:6d}{t.hour:6d}{t.minute:6d}"
+                    + f"{sec:13.7f}{'':5}GPS",
+                    "TIME OF FIRST OBS",
+                )
+            )
+
+        lines.append(hl("", "END OF HEADER"))
+        return "".join(lines)
+
+    def __close(self):
+        """Write the rest of epochs, compose header and body into RINEX file."""
+
+        self.__flush_epochs(None)
+        if self.__undated:
+            logger.warning(
+                f"RINEX: {self.__undated} GLONASS records without day of week"
+                + " skipped before the first epoch of known week."
+            )
+        if "body" not in self.__ofiles:
+            return
+        body = self.__ofiles.path("body")
+        self.__ofiles.close()
+
+        try:
+            out = self.__out
+            with open_output(
+                self.path, "w", False, out.compression, out.compression_level
+            ) as f:
+                f.write(self.make_header())
+                with open(body, "r", encoding="utf-8") as b:
+                    shutil.copyfileobj(b, f, 2**20)
+            os.remove(body)
+            logger.info(f"RINEX: {self.__epochs} epochs since {self.__first_obs} GPS.")
+        except OSError as oe:
+            logger.error(f"Failed to write target file '{self.path}'.")
+            logger.error(f"{type(oe)}: {oe}")
+
+    def __write_epoch(self, time: int, sats: dict[str, list[str]]):
+        """Write epoch record in one buffered write, 'time' - GPS time, [ms]"""
+
+        if "body" not in self.__ofiles:
+            return
+
+        epoch = self.core.gps_datetime(0, time)
+        if self.__first_obs is None:
+            self.__first_obs = epoch
+
+        lines = [self.core.epoch_line(epoch, len(sats))]
+        for sat_id in sorted(sats):
+            lines.append(sat_id + "".join(sats[sat_id]).rstrip() + "\n")
+
+        try:
+            self.__ofiles.write("body", "".join(lines))
+            self.__epochs += 1
+        except OSError as oe:
+            logger.error(f"Failed to write target file '{self.path}'.")
+            logger.error(f"{type(oe)}: {oe}")
+
+    def __flush_epochs(self, time: int | None):
+        """Write pending epochs up to GPS 'time' inclusively. Write all if 'time' is
+        None."""
+
+        for t in sorted(self.__pending):
+            if time is not None and t > time:
+                break
+            self.__write_epoch(t, self.__pending.pop(t))
+
+    def __obs_index(self, gnss: str, otype: str) -> int:
+        """Get position of the observation type in the record. Register new types."""
+
+        index = self.__index.setdefault(gnss, {})
+        pos = index.get(otype)
+        if pos is None:
+            types = self.__types.setdefault(gnss, [])
+            pos = len(types)
+            types.append(otype)
+            index[otype] = pos
+        return pos
+
+    def __lambda(self, gnss: str, sgn: str) -> tuple[float, ...]:
+        """Get carrier wave lengths for all sats of the GNSS signal"""
+        key = (gnss, sgn)
+        lam = self.__lambdas.get(key)
+        if lam is None:
+            lam = self.margo.make_lambdas(gnss, sgn)
+            self.__lambdas[key] = lam
+        return lam
+
+    def __print_ObservablesMSM(self, pdata: ObservablesMSM):
+        """Add observables into the epoch"""
+
+        gnss = pdata.atr.gnss
+        # Epochs are keyed by GPS time, so they are ordered across week rollovers
+        time = self.clock.epoch(gnss, pdata.hdr.time, pdata.hdr.day)
+        if time == NO_EPOCH:
+            self.__undated += 1
+            return
+
+        epoch = self.__pending.setdefault(time, {})
+        obs = pdata.obs
+        fmt = self.core.OBS_FIELD
+        blank = self.core.OBS_BLANK
+        vmax = self.core.OBS_MAX
+        ids = {sat: self.core.sat_id(gnss, sat) for sat in pdata.hdr.sats}
+
+        if gnss == "R":
+            for sat in pdata.hdr.sats:
+                self.__glo_slots[sat] = self.margo.literals.get(sat, 0)
+
+        for sgn in pdata.hdr.signals:
+            lam = self.__lambda(gnss, sgn)
+            c2n = obs.c2n.get(sgn, {})
+            hca = obs.hca.get(sgn, {})
+            ltm = obs.ltm.get(sgn, {})
+
+            # Phase and doppler are converted into cycles and Hz
+            for otype, values, scale in (
+                ("C", obs.rng.get(sgn), None),
+                ("L", obs.phs.get(sgn), 1.0),
+                ("D", obs.dpl.get(sgn), -1.0),
+                ("S", c2n, None),
+            ):
+                if not values:
+                    continue
+                pos = self.__obs_index(gnss, otype + sgn)
+
+                for sat, value in values.items():
+                    if scale is not None:
+                        value = scale * value / lam[sat - 1]
+                    if abs(value) >= vmax:
+                        continue
+
+                    sat_id = ids[sat]
+                    lli = 0
+                    if otype == "L":
+                        lock = ltm.get(sat)
+                        if lock is not None:
+                            prev = self.__lock.get((sat_id, sgn))
+                            self.__lock[(sat_id, sgn)] = lock
+                            if prev is not None and lock < prev:
+                                lli |= 1
+                        if hca.get(sat):
+                            lli |= 2
+
+                    fields = epoch.setdefault(sat_id, [])
+                    if len(fields) <= pos:
+                        fields.extend([blank] * (pos + 1 - len(fields)))
+                    ssi = self.core.ssi(c2n.get(sat))
+                    fields[pos] = fmt.format(value, lli or " ", ssi)
+
+        # Write epochs which are complete
+        if pdata.aux.MMB == 0:
+            self.__flush_epochs(time)
+        while len(self.__pending) > self.MAX_PENDING_EPOCHS:
+            self.__flush_epochs(min(self.__pending))
+
+    def __print(self, iblock: object):
+        """RINEX printer"""
+
+        assert isinstance(
+            iblock, tuple(self.io.actual_spec)
+        ), f"Printer does not support {type(iblock)}"
+
+        if isinstance(iblock, ObservablesMSM):
+            self.__print_ObservablesMSM(iblock)
+        else:
+            assert False, f"Printer does not support {type(iblock)}"
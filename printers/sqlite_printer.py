@@ -0,0 +1,230 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    There are 2 classes here:
+    1. PrintSQLite() - top level. Receives DTO objects at the input and saves them
+    into SQLite database. Implements sub-printer interface.
+    2. SQLiteControls() - DTO for control parameters.
+
+    Database structure:
+    obs - observables, long format, see TableCore.OBS_COLUMNS;
+    <EphXXX> - ephemerides, one table per DTO class;
+    <BaseXXX> - base station data, one table per DTO class.
+
+    Rows are collected in memory and inserted by prepared 'executemany' statements,
+    one transaction per 'batch_rows' rows. Indexes are built when conversion ends.
+    Database is opened on the first write: SQLite connections are bound to the
+    thread which opened them, printers may run on the writer thread.
+"""
+
+# pylint: disable = invalid-name
+
+import os
+import sqlite3
+
+from printer_top import SubPrinterInterface
+from .margo_printer import MargoControls
+from .table_core import TableCore
+from gnss_types import ObservablesMSM
+from gnss_types import EphGPS, EphGLO, EphBDS, EphGALF, EphGALI, EphNAVIC, EphQZS
+from gnss_types import BaseRP, BaseRPH, BaseAD, BaseADSN, BaseADSNRC, BaseSP, BaseTS
+from gnss_types import BaseGLBS
+
+from logger import LOGGER_CF as logger
+
+
+class SQLiteControls:
+    """Defines some parameters to control SQLite printer"""
+
+    __slots__ = ("batch_rows", "wal_enable")
+
+    def __init__(self) -> None:
+        # Number of rows inserted in one transaction
+        self.batch_rows: int = 50000
+        # Use write-ahead log journal mode
+        self.wal_enable: bool = True
+
+
+class PrintSQLite:
+    """Provides methods to print RTCM data into SQLite database."""
+
+    _DEFAULT_CONTROLS = SQLiteControls()
+
+    __EPH = (EphGPS, EphGLO, EphBDS, EphGALF, EphGALI, EphNAVIC, EphQZS)
+    __BASE = (BaseRP, BaseRPH, BaseAD, BaseADSN, BaseADSNRC, BaseSP, BaseTS, BaseGLBS)
+
+    # SQLite types of TableCore columns
+    __SQL_TYPES = {"i": "INTEGER", "f": "REAL", "s": "TEXT", "b": "INTEGER"}
+
+    # Indexes built after bulk load: {table: (columns,...)}
+    __INDEXES = {"obs": ("gnss", "sat", "time")}
+    __EPH_INDEX = ("satNum",)
+
+    def __init__(
+        self,
+        work_dir: str,
+        ctrls: SQLiteControls | None = None,
+        mode: str = "SQLITE",
+        margo_ctrls: MargoControls | None = None,
+    ):
+
+        assert os.path.isdir(work_dir), f"Output directory {work_dir} not found"
+
+        self.ctrl = ctrls if ctrls is not None else self._DEFAULT_CONTROLS
+        self.core = TableCore(margo_ctrls)
+        self.path = self.make_opath(work_dir)
+
+        # Connection is opened by the thread printing data, see __connect()
+        self.__db: sqlite3.Connection | None = None
+
+        # {table name: INSERT statement}
+        self.__inserts: dict[str, str] = {}
+        # {table name: rows to be inserted}
+        self.__rows: dict[str, list[tuple]] = {}
+        self.__pending = 0
+        self.__inserted = 0
+        self.__transactions = 0
+
+        self.io = SubPrinterInterface()
+        self.io.data_spec = SubPrinterInterface.make_specs(mode)
+        self.io.actual_spec = {ObservablesMSM, *self.__EPH, *self.__BASE}
+        self.io.print = self.__print
+        self.io.close = self.__close
+        self.io.flush = self.__flush
+        self.io.format = mode
+
+    @staticmethod
+    def make_opath(work_dir: str) -> str:
+        """Make path to the database. Database is named after the work folder."""
+        name = os.path.basename(os.path.normpath(work_dir))
+        return os.path.join(work_dir, name + ".sqlite")
+
+    def __connect(self) -> sqlite3.Connection:
+        """Open database on the first use"""
+
+        if self.__db is None:
+            try:
+                self.__db = sqlite3.connect(self.path, isolation_level=None)
+                if self.ctrl.wal_enable:
+                    self.__db.execute("PRAGMA journal_mode=WAL")
+                self.__db.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.Error as er:
+                raise AssertionError(
+                    f"Failed to open database '{self.path}': {type(er)}: {er}"
+                ) from er
+        return self.__db
+
+    def __create_table(self, table: str, columns: tuple[tuple[str, str], ...]):
+        """Create table and prepare INSERT statement"""
+
+        cols = ", ".join(f'"{name}" {self.__SQL_TYPES[ct]}' for name, ct in columns)
+        self.__connect().execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({cols})')
+
+        marks = ", ".join("?" * len(columns))
+        self.__inserts[table] = f'INSERT INTO "{table}" VALUES ({marks})'
+        self.__rows[table] = []
+
+    def __flush(self) -> None:
+        """Insert collected rows of all tables in a single transaction. Rows of
+        the failed transaction are dropped, the failure is raised as AssertionError
+        to be counted by PrinterTop."""
+
+        if not self.__pending:
+            return
+
+        try:
+            self.__db.execute("BEGIN")
+            for table, rows in self.__rows.items():
+                if rows:
+                    self.__db.executemany(self.__inserts[table], rows)
+            self.__db.execute("COMMIT")
+            self.__inserted += self.__pending
+            self.__transactions += 1
+        except sqlite3.Error as er:
+            if self.__db.in_transaction:
+                self.__db.execute("ROLLBACK")
+            raise AssertionError(
+                f"Failed to write database '{self.path}', {self.__pending} rows"
+                + f" dropped: {type(er)}: {er}"
+            ) from er
+        finally:
+            for rows in self.__rows.values():
+                rows.clear()
+            self.__pending = 0
+
+    def __append(self, table: str, columns, rows: list[tuple]) -> None:
+        """Collect rows of the table. Flush when the batch is full."""
+
+        if table not in self.__inserts:
+            self.__create_table(table, columns)
+
+        self.__rows[table].extend(rows)
+        self.__pending += len(rows)
+        if self.__pending >= self.ctrl.batch_rows:
+            self.__flush()
+
+    def __make_indexes(self) -> None:
+        """Build indexes after bulk load"""
+
+        for table in self.__inserts:
+            columns = self.__INDEXES.get(table)
+            if columns is None and table.startswith("Eph"):
+                columns = self.__EPH_INDEX
+            if columns is None:
+                continue
+            idx = "_".join((table,) + columns)
+            cols = ", ".join(f'"{c}"' for c in columns)
+            self.__db.execute(
+                f'CREATE INDEX IF NOT EXISTS "{idx}" ON "{table}" ({cols})'
+            )
+
+    def __close(self):
+        """Write the rest of data, build indexes and close database. Database is
+        closed even if the last transaction fails."""
+
+        try:
+            self.__flush()
+        finally:
+            try:
+                self.__connect()
+                self.__make_indexes()
+                self.__db.execute("PRAGMA optimize")
+            except (sqlite3.Error, AssertionError) as er:
+                logger.error(f"Failed to build indexes in '{self.path}'.")
+                logger.error(f"{type(er)}: {er}")
+
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
+
+            logger.info(
+                f"SQLite: {len(self.__inserts)} tables, {self.__inserted} rows, "
+                + f"{self.__transactions} transactions."
+            )
+
+    def __print_ObservablesMSM(self, obs: ObservablesMSM):
+        """Print data from ObservablesMSM data block"""
+        rows = self.core.ObservablesMSMtoRows(obs)
+        if rows:
+            self.__append("obs", self.core.OBS_COLUMNS, rows)
+
+    def __print_dataclass(self, pdata: object):
+        """Print ephemeris or base station data"""
+        dtype = type(pdata)
+        row = self.core.dataClassToRow(pdata)
+        self.__append(self.core.table_name(dtype), self.core.columns(dtype), [row])
+
+    def __print(self, iblock: object):
+        """SQLite printer"""
+
+        assert isinstance(
+            iblock, tuple(self.io.actual_spec)
+        ), f"Printer does not support {type(iblock)}"
+
+        if isinstance(iblock, ObservablesMSM):
+            self.__print_ObservablesMSM(iblock)
+        elif isinstance(iblock, self.__EPH + self.__BASE):
+            self.__print_dataclass(iblock)
+        else:
+            assert False, f"Printer does not support {type(iblock)}"
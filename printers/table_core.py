@@ -0,0 +1,148 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    TableCore() - utility methods to represent DTO objects as rows of tables.
+    Used by printers of tabular (columnar, relational) output formats.
+
+    Observables are represented in a long format: one row per satellite and signal,
+    see TableCore.OBS_COLUMNS. Ephemerides and base station data are represented as
+    one table per DTO class, one column per dataclass field.
+"""
+
+# pylint: disable = invalid-name
+
+from dataclasses import fields, is_dataclass
+from datetime import date, timedelta
+from json import dumps as jdumps
+from types import UnionType
+from typing import get_args
+
+from .margo_printer import MargoControls, MargoCore, EpochClock, MS_IN_DAY
+from gnss_types import ObservablesMSM
+
+
+class TableCore:
+    """Utility methods to convert DTO objects into table rows"""
+
+    # Columns of observables table and their types:
+    # 'i' - integer, 'f' - float, 's' - string, 'b' - boolean
+    OBS_COLUMNS = (
+        ("time", "i"),  # GPS time since 1980-01-06, [ms]
+        ("gnss", "s"),
+        ("sat", "i"),
+        ("signal", "s"),
+        ("rng", "f"),  # [m]
+        ("phs", "f"),  # [m]
+        ("dpl", "f"),  # [Hz]
+        ("c2n", "f"),  # [dB/Hz]
+        ("ltm", "i"),  # [ms]
+        ("hca", "b"),
+    )
+
+    GPS_EPOCH = date(1980, 1, 6)
+
+    # Cache of table schemes {DTO class: ((column name, column type),...)}
+    __COLUMNS: dict[type, tuple[tuple[str, str], ...]] = {}
+
+    def __init__(self, ctrl: MargoControls | None = None) -> None:
+        self.margo = MargoCore(ctrl)
+        # GPS week of observations, made on the first observables
+        self.clock: EpochClock | None = None
+
+    @classmethod
+    def gps_date(cls, time: int) -> str:
+        """Get GPS calendar date 'YYYY-MM-DD' from GPS time [ms]."""
+        return (cls.GPS_EPOCH + timedelta(days=time // MS_IN_DAY)).isoformat()
+
+    @staticmethod
+    def table_name(dtype: type) -> str:
+        """Get table name for DTO class."""
+        return dtype.__name__
+
+    @staticmethod
+    def column_type(annotation) -> str:
+        """Convert annotation of the dataclass field into column type.
+        Fields annotated as 'int | float', 'int | bool', 'int | str' hold
+        integers in bare data and scaled values otherwise."""
+
+        if isinstance(annotation, UnionType):
+            args = set(get_args(annotation)) - {int}
+            annotation = args.pop() if len(args) == 1 else None
+
+        return {int: "i", float: "f", bool: "b", str: "s"}.get(annotation, "s")
+
+    @classmethod
+    def columns(cls, dtype: type) -> tuple[tuple[str, str], ...]:
+        """Return table scheme for the DTO class: ((column name, column type),...)"""
+
+        rv = cls.__COLUMNS.get(dtype)
+        if rv is None:
+            assert is_dataclass(dtype), f"{dtype} is not a dataclass."
+            rv = tuple((f.name, cls.column_type(f.type)) for f in fields(dtype))
+            cls.__COLUMNS[dtype] = rv
+        return rv
+
+    @staticmethod
+    def cast(value, ctype: str):
+        """Cast value to the column type. Compound values are saved as JSON strings."""
+
+        if value is None:
+            return None
+        if ctype == "f":
+            return float(value)
+        if ctype == "i":
+            return int(value)
+        if ctype == "b":
+            return bool(value)
+        return value if isinstance(value, str) else jdumps(value)
+
+    def dataClassToRow(self, pdata: object) -> tuple:
+        """Convert dataclass object into a table row."""
+        return tuple(
+            self.cast(getattr(pdata, name), ctype)
+            for name, ctype in self.columns(type(pdata))
+        )
+
+    def gps_time(self, pdata: ObservablesMSM) -> int:
+        """Get GPS time of the observables, [ms]. MSM messages carry time of week
+        only, GPS week is taken from MARGO controls, week rollovers are tracked."""
+        if self.clock is None:
+            self.clock = self.margo.epoch_clock()
+        return self.clock.epoch(pdata.atr.gnss, pdata.hdr.time, pdata.hdr.day)
+
+    def ObservablesMSMtoRows(self, pdata: ObservablesMSM) -> list[tuple]:
+        """Convert observables into rows of the long table, see OBS_COLUMNS."""
+
+        rv = []
+        gnss = pdata.atr.gnss
+        time = self.gps_time(pdata)
+        obs = pdata.obs
+
+        for sgn in pdata.hdr.signals:
+            rng = obs.rng.get(sgn, {})
+            phs = obs.phs.get(sgn, {})
+            dpl = obs.dpl.get(sgn, {})
+            c2n = obs.c2n.get(sgn, {})
+            ltm = obs.ltm.get(sgn, {})
+            hca = obs.hca.get(sgn, {})
+
+            sats = sorted(set(rng) | set(phs) | set(dpl) | set(c2n))
+            for sat in sats:
+                hc = hca.get(sat)
+                rv.append(
+                    (
+                        time,
+                        gnss,
+                        sat,
+                        sgn,
+                        rng.get(sat),
+                        phs.get(sat),
+                        dpl.get(sat),
+                        c2n.get(sat),
+                        ltm.get(sat),
+                        None if hc is None else bool(hc),
+                    )
+                )
+
+        return rv
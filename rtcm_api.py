@@ -0,0 +1,128 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Library API: decoding of RTCM data without printers, work folders, ini files and
+    logger setup. Nothing is written to the filesystem, LOGGER_CF is never
+    initialized (records of decoders are dropped unless the caller initializes it).
+
+    for num, dto in iter_decoded("base.rtcm3.gz", messages={1077, 1087}):
+        ...
+
+    Source is a path (compressed files are decompressed on the fly, '-' is the
+    standard input), a binary file object (socket.makefile('rb'), io.BytesIO...) or
+    bytes-like object. Generators are lazy: data are read and decoded chunk by chunk,
+    memory consumption doesn't depend on the size of the source.
+
+    Converters of all strategies (converter_top.py) use decoders of make_decoder().
+"""
+
+# pylint: disable = invalid-name
+
+import os
+import mmap
+from typing import Iterable, Iterator
+
+from decoder_top import DecoderTop
+from sub_decoders import (
+    SubdecoderMSM4567,
+    SubdecoderMSM123,
+    SubdecoderEph,
+    SubdecoderBaseStationData,
+)
+from sources import SourceFile
+
+
+# Subsets of messages: MSM 4..7, MSM 1..3, ephemerids, Base Station Data
+DECODER_SUBSETS = ("MSM4567", "MSM123", "EPH", "BASE")
+MSM_SUBSETS = ("MSM4567", "MSM123")
+# Size of chunks read from files, [bytes]
+CHUNK_LEN: int = 2**16
+
+_SUBDECODERS = {
+    "MSM4567": SubdecoderMSM4567,
+    "MSM123": SubdecoderMSM123,
+    "EPH": SubdecoderEph,
+    "BASE": SubdecoderBaseStationData,
+}
+
+
+def make_decoder(
+    bare_data: bool = False, subsets: Iterable[str] = DECODER_SUBSETS
+) -> DecoderTop | None:
+    """Create decoder of message 'subsets', see DECODER_SUBSETS.
+    'bare_data' - bare RTCM3 values without scaling.
+    Return None if a sub-decoder wasn't registered."""
+
+    dec = DecoderTop()
+    for subset in subsets:
+        if not dec.register_decoder(_SUBDECODERS[subset](bare_data=bare_data).io):
+            return None
+    return dec
+
+
+def _read_chunks(source) -> Iterator[bytes]:
+    """Yield chunks of path or file object"""
+
+    if isinstance(source, (str, os.PathLike)):
+        with SourceFile(os.fspath(source)) as f:
+            read = f.read1 if f.stream else f.read
+            while chunk := read(CHUNK_LEN):
+                yield chunk
+    elif hasattr(source, "read"):
+        read = getattr(source, "read1", source.read)
+        while chunk := read(CHUNK_LEN):
+            yield chunk
+    else:
+        raise TypeError(f"Unsupported RTCM source {type(source)}")
+
+
+def iter_frames(source, decoder: DecoderTop | None = None) -> Iterator[bytes]:
+    """Yield RTCM frames (messages with header and CRC) of the source.
+    Frames of bytes, bytearray and mmap sources are memoryview slices of them.
+    'decoder' - framer state, e.g. to get parsing errors. New one by default."""
+
+    decoder = DecoderTop() if decoder is None else decoder
+    if isinstance(source, memoryview):
+        # No find() in memoryview, slices are copied chunk by chunk
+        for pos in range(0, len(source), CHUNK_LEN):
+            yield from decoder.catch_message(source[pos : pos + CHUNK_LEN].tobytes())
+        return
+
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        size, pos = len(source), 0
+        while pos < size:
+            end = min(size, pos + CHUNK_LEN)
+            frames, nxt = decoder.catch_frames(source, pos, end)
+            yield from frames
+            if nxt == pos and end == size:
+                break
+            pos = nxt
+        return
+
+    for chunk in _read_chunks(source):
+        yield from decoder.catch_message(chunk)
+
+
+def iter_decoded(
+    source,
+    messages: Iterable[int] | None = None,
+    bare: bool = False,
+    decoder: DecoderTop | None = None,
+) -> Iterator[tuple[int, object]]:
+    """Yield (message number, decoded data) of the source.
+    'messages' - numbers of messages to be decoded, all by default.
+    'bare' - bare RTCM3 values without scaling.
+    'decoder' - decoder with registered sub-decoders instead of make_decoder(bare).
+    Messages without decoders and failed messages are skipped, see counters of
+    the decoder."""
+
+    decoder = make_decoder(bare) if decoder is None else decoder
+    wanted = None if messages is None else frozenset(messages)
+    for frame in iter_frames(source, decoder):
+        num = DecoderTop.mnum(frame)
+        if wanted is not None and num not in wanted:
+            continue
+        dto = decoder.decode(frame)
+        if dto is not None:
+            yield num, dto
@@ -11,32 +11,86 @@
 """
 
 import os
+import lzma
+import time
+import asyncio
 import shutil
 import glob
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 from argparse import ArgumentParser as ArgParser
 from logger import LOGGER_CF as logger
 from controls import ConverterControls
-from converter_top import ConverterFactory, ConverterInterface
+from converter_top import ConverterFactory, ConverterInterface, ConverterStatistics
+from controls import BoxWithConverterControls
+from printers.file_pool import compression_available, FLUSH_MODES
+from gnss_types import ObservablesMSM, BareObservablesMSM123, BareObservablesMSM4567
+from sources import SourceFile, STDIN, COMPRESSED_EXT, strip_compression_ext
+from sources import InputControls, ReadSizer, ProgressThrottle, FileFollower
+from sources import StreamControls, StreamEndpoint, StreamClient, is_stream_url
+from shards import can_shard, convert_sharded
+from shm_pipeline import pipeline_available, decode_rtcm_pipelined
+from checkpoint import Checkpointer, CheckpointError, can_checkpoint, checkpoint_path
+from frame_index import FrameIndex, FrameIndexError
 
 VERSION = "1.23"
 DEFAULT_CONFIG = "defaults.ini"
-FILE_CHUNCK_LEN: int = 2**12
+MMAP_WINDOW_LEN: int = 2**20
 ARGS = None
 
 # pylint: disable = line-too-long, broad-exception-caught, consider-using-f-string
 
+# Name of products of the standard input conversion
+STDIN_NAME = "stdin"
+
+# ............................................................................
+
+
+def source_name(src_file_path: str) -> str:
+    """Return path the names of products are based on. Products of the standard
+    input and network streams conversion are placed into the current directory."""
+    if src_file_path == STDIN:
+        return STDIN_NAME
+    if is_stream_url(src_file_path):
+        return StreamEndpoint(src_file_path).name
+    return src_file_path
+
+
+def is_stream_source(src_file_path: str) -> bool:
+    """Check whether the source is the standard input or network stream"""
+    return src_file_path == STDIN or is_stream_url(src_file_path)
+
+
+def source_time(src_file_path: str) -> int:
+    """Get modification time of the source file, [ns]. 0 - not a regular file."""
+    if os.path.isfile(src_file_path):
+        return os.stat(src_file_path).st_mtime_ns
+    return 0
+
+
 # ............................................................................
 
 
-def create_work_folder(src_file_path: str, postfix: str) -> str | None:
+def work_folder_name(src_file_path: str, postfix: str) -> str:
+    """Make path to the folder of decoding products"""
+    fld, _ = os.path.splitext(strip_compression_ext(source_name(src_file_path)))
+    return fld + "-" + postfix
+
+
+def create_work_folder(
+    src_file_path: str, postfix: str, keep: bool = False
+) -> str | None:
     """Create a new folder for decoding products.
-    If folder already exists - delete content.
+    If folder already exists - delete content, unless 'keep' is True (resumed
+    conversion).
     Return path to the folder if everything OK.
     Else return None."""
 
-    fld, _ = os.path.splitext(src_file_path)
-    fld = fld + "-" + postfix
+    fld = work_folder_name(src_file_path, postfix)
+    if keep and os.path.isdir(fld):
+        print("Continue in work folder.")
+        return fld
+
     # Remove directory, if exists
     if os.path.isdir(fld):
         try:
@@ -63,7 +117,7 @@ def create_work_folder(src_file_path: str, postfix: str) -> str | None:
 def make_log_file_name(src_file_path: str):
     """Make name for log file. Based on source file name."""
 
-    _, fname = os.path.split(src_file_path)
+    _, fname = os.path.split(strip_compression_ext(source_name(src_file_path)))
     fname, _ = os.path.splitext(fname)
 
     return fname + "-log.txt"
@@ -72,11 +126,13 @@ def make_log_file_name(src_file_path: str):
 # ............................................................................
 
 
-def init_logger(path: str):
-    """Create log file and init logger."""
+def init_logger(path: str, console: bool = True, append: bool = False):
+    """Create log file and init logger.
+    Messages are duplicated to console if 'console' is True.
+    Records are appended to existing log file if 'append' is True."""
 
     try:
-        log = open(path, "w", encoding="utf-8")
+        log = open(path, "a" if append else "w", encoding="utf-8")
     except OSError as er:
         print("Failed to create log file.")
         print(f"{type(er)}: {er}")
@@ -85,53 +141,278 @@ def init_logger(path: str):
         print(f"{type(er)}: {er}")
     else:
         # Initial record
-        welcome_msg = "New log file was created."
+        welcome_msg = "Log file is continued." if append else "New log file was created."
         log.write(welcome_msg + "\n")
         log.write("-" * len(welcome_msg) + "\n")
         log.close()
-        print(welcome_msg)
+        if console:
+            print(welcome_msg)
         # Init logger. Opens file 'path' in append mode
-        logger.init_2CH(path, "RTCMDEC")
+        logger.init_2CH(path, "RTCMDEC", console)
 
 
 # ............................................................................
 
 
-def decode_rtcm_file(fpath: str, converter: ConverterInterface) -> bool:
-    """Convert single file."""
+def log_progress(
+    converter: ConverterInterface,
+    processed: int,
+    size: int,
+    throttle: ProgressThrottle | None = None,
+) -> None:
+    """Log conversion progress and statistics. Frequency of records is limited by
+    'throttle' if given. Size of streams is unknown (0), processed bytes are logged."""
+
+    if throttle is not None and not throttle.due(processed, size):
+        return
+
+    aux_data = converter.get_statistics()
+    if size > 0:
+        done = "{0:2.2%}".format(float(processed) / float(size))
+    else:
+        done = f"{processed:d} bytes"
+    logger.progress(
+        "{0}, {1:d} messages, prs-dec-prnt errors {2:d}-{3:d}-{4:d}.".format(
+            done,
+            aux_data.decoding_attempts,
+            aux_data.parsing_errors,
+            aux_data.decoding_errors,
+            aux_data.printing_errors,
+        )
+    )
+
+
+def end_of_epoch(xblock: object) -> bool:
+    """Check whether decoded message is the last message of the epoch.
+    MSM messages of the same epoch but the last one have multiple message bit set.
+    Other messages are regarded as separate epochs."""
+
+    if isinstance(xblock, ObservablesMSM):
+        return not xblock.aux.MMB
+    if isinstance(xblock, (BareObservablesMSM123, BareObservablesMSM4567)):
+        return not xblock.hdr.MMB
+    return True
+
+
+def decode_frames(
+    converter: ConverterInterface,
+    frames: list,
+    pool: ThreadPoolExecutor | None = None,
+    flush: str = "none",
+) -> None:
+    """Decode frames and print results in the order of frames.
+    If 'pool' is given, frames are decoded in threads. Executor.map() yields results
+    in submission order, so it serves as a reorder buffer in front of printers.
+    Printers are always called from the calling thread.
+    'flush' - output files are flushed after each 'message' or 'epoch'."""
+
+    if pool is None or len(frames) < 2:
+        xblocks = map(converter.decode, frames)
+    else:
+        xblocks = pool.map(converter.decode, frames)
+
+    if flush == "none":
+        for xblock in xblocks:
+            if xblock is not None:
+                converter.print(xblock)
+        return
+
+    for xblock in xblocks:
+        if xblock is not None:
+            converter.print(xblock)
+            if flush == "message" or end_of_epoch(xblock):
+                converter.flush()
+
+
+def decode_chunks(
+    f: SourceFile,
+    converter: ConverterInterface,
+    pool: ThreadPoolExecutor | None = None,
+    inp: InputControls | None = None,
+    flush: str = "none",
+    checkpoints: Checkpointer | None = None,
+) -> None:
+    """Read source file sequentially and convert it chunk by chunk. Size of chunks
+    adapts to throughput within the range defined by 'inp'.
+    Streams are read by read1(): chunk contains the data arrived so far, so messages
+    are converted as soon as they arrive.
+    'checkpoints' - checkpoints are saved after chunks if due."""
+
+    inp = InputControls() if inp is None else inp
+    sizer = ReadSizer(inp.read_size_min, inp.read_size_max)
+    throttle = ProgressThrottle(inp.progress_interval, inp.progress_step)
+    read = f.read1 if f.stream else f.read
+
+    chunk = read(sizer.size)
+    while len(chunk):
+
+        rtcm3_lines = converter.parse_bytes(chunk)
+        decode_frames(converter, rtcm3_lines, pool, flush)
+
+        if checkpoints is not None and checkpoints.due(f.position):
+            checkpoints.save(converter, f.position)
+
+        # Progress is measured in bytes of the file on disk
+        log_progress(converter, f.consumed, f.size, throttle)
+
+        chunk = read(sizer.update(len(chunk)))
+
+    # Size of streams is unknown, the final record isn't forced by the throttle
+    if f.stream:
+        log_progress(converter, f.consumed, f.size)
+
+
+def decode_mapped(
+    f: SourceFile,
+    converter: ConverterInterface,
+    pool: ThreadPoolExecutor | None = None,
+    inp: InputControls | None = None,
+    flush: str = "none",
+    checkpoints: Checkpointer | None = None,
+    start: int = 0,
+) -> None:
+    """Map source file into memory and convert it in place, window by window.
+    Messages are not copied, decoders get memoryview slices of the file.
+    'checkpoints' - checkpoints are saved after windows if due.
+    'start' - offset of the first message, see Checkpointer.resume()."""
+
+    inp = InputControls() if inp is None else inp
+    throttle = ProgressThrottle(inp.progress_interval, inp.progress_step)
+
+    mm = f.map()
+    try:
+        size = len(mm)
+        while start < size:
+            end = min(size, start + MMAP_WINDOW_LEN)
+            frames, start = converter.parse_buffer(mm, start, end)
+            decode_frames(converter, frames, pool, flush)
+
+            # Views shall be released before the file is unmapped
+            for msg in frames:
+                msg.release()
+            del frames
+
+            if checkpoints is not None and checkpoints.due(start):
+                checkpoints.save(converter, start)
+
+            log_progress(converter, end, size, throttle)
+            if end == size:
+                break
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            # Some views are still referenced (interrupted conversion).
+            # The file is unmapped by garbage collector.
+            pass
+
+
+def decode_indexed(
+    f: SourceFile,
+    converter: ConverterInterface,
+    index: FrameIndex,
+    pool: ThreadPoolExecutor | None = None,
+    inp: InputControls | None = None,
+    flush: str = "none",
+) -> None:
+    """Map source file into memory and convert messages listed in its frame index.
+    Messages are memoryview slices of the file at indexed offsets, framing and CRC
+    check are skipped. Parsing errors found by the index are accounted at the end.
+    The index shall be current, see FrameIndex.update()."""
+
+    inp = InputControls() if inp is None else inp
+    throttle = ProgressThrottle(inp.progress_interval, inp.progress_step)
+
+    hdr = index.header()
+    mm = f.map()
+    view = memoryview(mm)
+    try:
+        size = len(mm)
+        if hdr is None or hdr.source_size > size:
+            raise FrameIndexError("Frame index doesn't match the source file.")
+
+        done = 0
+        for block in index.blocks():
+            frames = [view[rec.offset : rec.offset + rec.length] for rec in block]
+            decode_frames(converter, frames, pool, flush)
+
+            # Views shall be released before the file is unmapped
+            for msg in frames:
+                msg.release()
+            del frames
+
+            done = block[-1].offset + block[-1].length
+            log_progress(converter, done, size, throttle)
+
+        converter.count_parse_errors(hdr.parse_errors)
+        if hdr.parse_errors or done < size:
+            log_progress(converter, size, size)
+    finally:
+        try:
+            view.release()
+            mm.close()
+        except BufferError:
+            # Some views are still referenced (interrupted conversion).
+            # The file is unmapped by garbage collector.
+            pass
+
+
+def decode_rtcm_file(
+    fpath: str,
+    converter: ConverterInterface,
+    read_mode: str = "auto",
+    threads: int = 1,
+    inp: InputControls | None = None,
+    flush: str = "none",
+    checkpoints: Checkpointer | None = None,
+    resume: bool = False,
+    index: FrameIndex | None = None,
+) -> bool:
+    """Convert single file. Compressed files are decompressed on the fly.
+    'fpath' STDIN ('-') - convert the standard input.
+    'read_mode': mmap - map file into memory, chunked - read file by chunks,
+    auto - map regular uncompressed files, read others by chunks.
+    If 'threads' > 1, messages are decoded in a pool of threads.
+    'inp' - sizes of reads and frequency of progress records.
+    'flush' - output files are flushed after each 'message' or 'epoch'.
+    'checkpoints' - checkpoints of the conversion are saved if given. Conversion
+    continues from the saved checkpoint if 'resume' is True.
+    'index' - frame index of the file. It's built or extended if required, then
+    messages are extracted by the index. Regular uncompressed files only."""
 
     f = None
+    pool = None
 
     try:
-        f = open(fpath, "rb")
+        f = SourceFile(fpath)
+        if threads > 1:
+            pool = ThreadPoolExecutor(max_workers=threads)
+            logger.info(f"Messages are decoded in {threads} threads.")
 
         logger.info(f"Opened file {fpath}.")
-        file_size = os.path.getsize(fpath)
-        bytes_processed = 0
-
-        chunk = f.read(FILE_CHUNCK_LEN)
-        while len(chunk):
-
-            bytes_processed += len(chunk)
-            rtcm3_lines = converter.parse_bytes(chunk)
-
-            for msg in rtcm3_lines:
-                xblock = converter.decode(msg)
-                if xblock is not None:
-                    converter.print(xblock)
-
-            aux_data = converter.get_statistics()
-            logger.progress(
-                "{0:2.2%}, {1:d} messages, prs-dec-prnt errors {2:d}-{3:d}-{4:d}.".format(
-                    float(bytes_processed) / float(file_size),
-                    aux_data.decoding_attempts,
-                    aux_data.parsing_errors,
-                    aux_data.decoding_errors,
-                    aux_data.printing_errors,
-                )
-            )
-
-            chunk = f.read(FILE_CHUNCK_LEN)
+        if f.compression != "none":
+            logger.info(f"Source file compression: {f.compression}.")
+
+        mapped = f.mappable and read_mode != "chunked"
+        if read_mode == "mmap" and not mapped:
+            logger.warning("Source file can't be mapped. Read it by chunks.")
+
+        if index is not None:
+            index = use_frame_index(index, f)
+
+        start = 0
+        if resume and checkpoints is not None:
+            start = checkpoints.resume(converter, mapped)
+
+        if index is not None:
+            logger.info("Messages are extracted by the frame index.")
+            decode_indexed(f, converter, index, pool, inp, flush)
+        elif mapped:
+            logger.info("Source file is mapped into memory.")
+            decode_mapped(f, converter, pool, inp, flush, checkpoints, start)
+        else:
+            f.skip(start)
+            decode_chunks(f, converter, pool, inp, flush, checkpoints)
 
     except KeyboardInterrupt:
         logger.error("Processing terminated by the user.")
@@ -140,11 +421,21 @@ def decode_rtcm_file(fpath: str, converter: ConverterInterface) -> bool:
         logger.error("Got FileNotFoundError exception.")
         logger.error(f"{type(fe)}: {fe}")
         return False
+    except CheckpointError as ce:
+        logger.error(f"Conversion can't be resumed. {ce}")
+        return False
+    except (OSError, EOFError, lzma.LZMAError) as ce:
+        logger.error("Failed to read source file. File is corrupted or truncated.")
+        logger.error(f"{type(ce)}: {ce}")
+        return False
     except Exception as ex:
         logger.error("Got unexpected exception.")
         logger.error(f"{type(ex)}: {ex}")
         return False
     finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
         converter.release()
 
         if not f is None:
@@ -156,6 +447,175 @@ def decode_rtcm_file(fpath: str, converter: ConverterInterface) -> bool:
     return True
 
 
+def use_frame_index(index: FrameIndex, f: SourceFile) -> FrameIndex | None:
+    """Bring frame index of the opened source file up to date.
+    Return None if messages can't be extracted by the index."""
+
+    if not f.mappable:
+        logger.warning("Frame index requires regular uncompressed file. Not used.")
+        return None
+
+    try:
+        state = index.state()
+        added = index.update()
+    except FrameIndexError as fe:
+        logger.warning(f"Frame index isn't used. {fe}")
+        return None
+
+    if state == "current":
+        logger.info(f"Frame index {index.path} is current.")
+    else:
+        logger.info(f"Frame index {index.path} was {state}, {added} messages indexed.")
+    return index
+
+
+def decode_followed_file(
+    fpath: str,
+    converter: ConverterInterface,
+    inp: InputControls | None = None,
+    flush: str = "epoch",
+    duration: float | None = None,
+) -> bool:
+    """Follow growing file like 'tail -f': the file is kept opened at its end, data
+    appended to it are converted as they appear. Messages split between reads are
+    assembled by the framer of the converter. Rotated and truncated files are read
+    from the beginning, unprocessed bytes of the previous content are dropped.
+    Output files are flushed after each 'epoch' or 'message', so that they are
+    always current. Conversion lasts 'duration' seconds or until interrupted by
+    the user.
+    'inp' - sizes of reads, delays between polls and frequency of progress records."""
+
+    inp = InputControls() if inp is None else inp
+    sizer = ReadSizer(inp.read_size_min, inp.read_size_max)
+    throttle = ProgressThrottle(inp.progress_interval, inp.progress_step)
+    flush = "epoch" if flush == "none" else flush
+    deadline = None if duration is None else time.monotonic() + duration
+    f = None
+
+    try:
+        f = FileFollower(fpath, inp.follow_poll_min, inp.follow_poll_max)
+        logger.info(f"Following file {fpath}.")
+
+        while deadline is None or time.monotonic() < deadline:
+            chunk = f.read(sizer.size)
+            if chunk:
+                rtcm3_lines = converter.parse_bytes(chunk)
+                decode_frames(converter, rtcm3_lines, None, flush)
+                log_progress(converter, f.total, 0, throttle)
+                sizer.update(len(chunk))
+            elif f.reopened():
+                converter.reset_framer()
+                logger.warning(
+                    f"File {fpath} was rotated or truncated. Reading from the beginning."
+                )
+            else:
+                f.wait(None if deadline is None else deadline - time.monotonic())
+
+    except KeyboardInterrupt:
+        logger.info("Following stopped by the user.")
+    except OSError as oe:
+        logger.error("Failed to read source file.")
+        logger.error(f"{type(oe)}: {oe}")
+        return False
+    except Exception as ex:
+        logger.error("Got unexpected exception.")
+        logger.error(f"{type(ex)}: {ex}")
+        return False
+    finally:
+        converter.release()
+        if f is not None:
+            log_progress(converter, f.total, 0)
+            logger.info(
+                f"Closing file {fpath}: {f.rotations} rotations, "
+                + f"{f.truncations} truncations."
+            )
+            f.close()
+
+    return True
+
+
+def decode_rtcm_stream(
+    url: str,
+    converter: ConverterInterface,
+    ctrl: StreamControls | None = None,
+    inp: InputControls | None = None,
+    flush: str = "none",
+    duration: float | None = None,
+) -> bool:
+    """Convert network stream (NTRIP caster, TCP server), see StreamEndpoint.
+    Received bytes are converted as they arrive. Conversion lasts 'duration'
+    seconds, until the client gives up reconnecting or is interrupted by the user.
+    'inp' - frequency of progress records.
+    'flush' - output files are flushed after each 'message' or 'epoch'."""
+
+    inp = InputControls() if inp is None else inp
+    throttle = ProgressThrottle(inp.progress_interval, inp.progress_step)
+    client = None
+
+    def consume(data: bytes) -> int:
+        frames = converter.parse_bytes(data)
+        decode_frames(converter, frames, None, flush)
+        if throttle.due(client.bytes.total, 0):
+            logger.progress(client.summary)
+        return len(frames)
+
+    try:
+        client = StreamClient(StreamEndpoint(url), consume, ctrl)
+        logger.info(f"Reading stream {client.endpoint}.")
+        asyncio.run(client.run(duration))
+    except KeyboardInterrupt:
+        logger.info("Reading stopped by the user.")
+    except ValueError as ve:
+        logger.error(f"Bad stream URL. {type(ve)}: {ve}")
+        return False
+    except Exception as ex:
+        logger.error("Got unexpected exception.")
+        logger.error(f"{type(ex)}: {ex}")
+        return False
+    finally:
+        converter.release()
+        if client is not None:
+            logger.progress(client.summary)
+
+    if client.connects == 0:
+        logger.error(f"Failed to connect to {client.endpoint}.")
+        return False
+    return True
+
+
+# ............................................................................
+
+
+def parse_size(text: str) -> int:
+    """Convert size like '512K', '64M', '1G' or number of bytes into bytes"""
+
+    units = {"K": 2**10, "M": 2**20, "G": 2**30}
+    mult = units.get(text[-1:].upper(), 1)
+    return int(float(text[:-1] if mult > 1 else text) * mult)
+
+
+def parse_size_range(text: str) -> tuple[int, int]:
+    """Convert 'MIN[:MAX]' into (min, max) sizes in bytes. 'MIN' means fixed size."""
+
+    lo, _, hi = text.partition(":")
+    rv = (parse_size(lo), parse_size(hi) if hi else parse_size(lo))
+    if rv[0] < 1 or rv[1] < rv[0]:
+        raise ValueError(f"Bad range of sizes {text}")
+    return rv
+
+
+def parse_progress(text: str) -> tuple[float, float]:
+    """Convert '2s' or '5%' into (interval [s], step [%]) of progress records"""
+
+    if text.endswith("%"):
+        rv = (0.0, float(text[:-1]))
+    else:
+        rv = (float(text[:-1] if text.endswith("s") else text), 0.0)
+    if min(rv) < 0:
+        raise ValueError(f"Bad progress limit {text}")
+    return rv
+
+
 # ............................................................................
 
 
@@ -174,8 +634,20 @@ def create_argument_parser(description: str = "No description") -> ArgParser:
         type=str,
         action="store",
         default="MARGO",
-        choices=["MARGO", "JSON", "JSON-B", "JARGO"],
-        help="FORMAT defines form of representation of output data. Choose from: MARGO | JSON | JSON-B.",
+        choices=[
+            "MARGO",
+            "JSON",
+            "JSON-B",
+            "JARGO",
+            "JSONL",
+            "JSONL-B",
+            "JARGO-L",
+            "NPY",
+            "PARQUET",
+            "SQLITE",
+            "RINEX",
+        ],
+        help="FORMAT defines form of representation of output data. Choose from: MARGO | JSON | JSON-B | JARGO | JSONL | JSONL-B | JARGO-L | NPY | PARQUET | SQLITE | RINEX.",
     )
     # Arbitrary argument: configuration file.
     arg_parser.add_argument(
@@ -194,7 +666,7 @@ def create_argument_parser(description: str = "No description") -> ArgParser:
         metavar="SRC",
         type=str,
         nargs="+",
-        help="List of source files to be processed",
+        help="List of source files to be processed. Use '-' to read the standard input, ntrip://[user:password@]host[:port]/MOUNT, ntrip2://... or tcp://host:port to read network stream.",
     )
     # Arbitrary argument (action): show version.
     arg_parser.add_argument(
@@ -213,6 +685,154 @@ def create_argument_parser(description: str = "No description") -> ArgParser:
         metavar="EXT",
         help="EXT regarded as an extension in RTCM file names. Default: rtcm3",
     )
+    # Arbitrary argument: number of parallel conversion processes.
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        metavar="N",
+        type=int,
+        action="store",
+        default=1,
+        help="N files are converted in parallel processes. Default: 1",
+    )
+    # Arbitrary argument: number of shards a single file is split into.
+    arg_parser.add_argument(
+        "--shards",
+        dest="shards",
+        metavar="N",
+        type=int,
+        action="store",
+        default=1,
+        help="Each file is split into N byte ranges converted in parallel processes. MARGO, JSON and JARGO formats only. Default: 1",
+    )
+    # Arbitrary argument: number of threads decoding messages of a single file.
+    arg_parser.add_argument(
+        "--threads",
+        dest="threads",
+        metavar="N",
+        type=int,
+        action="store",
+        default=1,
+        help="Messages are decoded in N threads, printed in the original order. Scales on free-threaded Python builds. Default: 1",
+    )
+    # Arbitrary argument: number of decoder processes of the shared memory pipeline.
+    arg_parser.add_argument(
+        "--decoders",
+        dest="decoders",
+        metavar="N",
+        type=int,
+        action="store",
+        default=1,
+        help="Messages are framed in one process and decoded in N processes, frames are passed through shared memory. Default: 1",
+    )
+    # Arbitrary argument (flag): select all files found in the source directory.
+    arg_parser.add_argument(
+        "-y",
+        "--yes",
+        dest="select_all",
+        action="store_true",
+        help="Convert all RTCM files found in the source directory, don't prompt.",
+    )
+    # Arbitrary argument (flag): scan source directory recursively.
+    arg_parser.add_argument(
+        "-r",
+        "--recursive",
+        dest="recursive",
+        action="store_true",
+        help="Scan source directory and its subdirectories for RTCM files.",
+    )
+    # Arbitrary argument: source file reading mode.
+    arg_parser.add_argument(
+        "--read",
+        dest="read_mode",
+        metavar="MODE",
+        action="store",
+        default="auto",
+        choices=["auto", "mmap", "chunked"],
+        help="MODE of source files reading: auto | mmap | chunked. Default: auto - map regular uncompressed files into memory.",
+    )
+    # Arbitrary argument: range of sizes of sequential reads.
+    arg_parser.add_argument(
+        "--read-size",
+        dest="read_size",
+        metavar="MIN[:MAX]",
+        type=parse_size_range,
+        action="store",
+        default=None,
+        help="Sizes of sequential reads, e.g. 64K:4M, adapted to throughput. Single value - fixed size. Overrides READ_SIZE_MIN/MAX from ini file.",
+    )
+    # Arbitrary argument: frequency of progress records.
+    arg_parser.add_argument(
+        "--progress",
+        dest="progress",
+        metavar="LIMIT",
+        type=parse_progress,
+        action="store",
+        default=None,
+        help="Log progress not more often than every N seconds (Ns) or N percent (N%%). Overrides PROGRESS_INTERVAL/STEP from ini file.",
+    )
+    # Arbitrary argument: duration of network stream conversion.
+    arg_parser.add_argument(
+        "--duration",
+        dest="duration",
+        metavar="SECONDS",
+        type=float,
+        action="store",
+        default=None,
+        help="Stop conversion of network stream or followed file after SECONDS. Default: until interrupted.",
+    )
+    # Arbitrary argument: flushing of output files.
+    arg_parser.add_argument(
+        "--flush",
+        dest="flush",
+        metavar="MODE",
+        action="store",
+        default=None,
+        choices=FLUSH_MODES,
+        help="MODE of output files flushing: none | epoch | message. Use epoch or message to pass converted stream to other programs with low latency. Overrides FLUSH from ini file.",
+    )
+    # Arbitrary argument: compression of output files.
+    arg_parser.add_argument(
+        "--compress",
+        dest="compress",
+        metavar="METHOD",
+        action="store",
+        default=None,
+        choices=["none", "gz", "xz", "zst"],
+        help="METHOD of output files compression: none | gz | xz | zst. Overrides COMPRESSION from ini file.",
+    )
+    # Arbitrary argument: interval of checkpoints.
+    arg_parser.add_argument(
+        "--checkpoint",
+        dest="checkpoint",
+        metavar="SIZE",
+        type=parse_size,
+        action="store",
+        default=None,
+        help="Save checkpoint of conversion every SIZE bytes of the source, e.g. 256M. 0 - no checkpoints. MARGO, JSON and JARGO formats, uncompressed outputs only. Overrides CHECKPOINT_INTERVAL from ini file.",
+    )
+    # Arbitrary argument (flag): follow growing file.
+    arg_parser.add_argument(
+        "--follow",
+        dest="follow",
+        action="store_true",
+        help="Follow growing source file like 'tail -f': convert appended data as they appear, survive rotation and truncation of the file. Output files are flushed after each epoch at least.",
+    )
+    # Arbitrary argument (flag): use frame index.
+    arg_parser.add_argument(
+        "--index",
+        dest="index",
+        action="store_true",
+        help="Extract messages by the frame index SRC.idx without framing and CRC check. The index is built, extended or rebuilt if required. Regular uncompressed files only.",
+    )
+    # Arbitrary argument (flag): continue interrupted conversion.
+    arg_parser.add_argument(
+        "--resume",
+        dest="resume",
+        action="store_true",
+        help="Continue interrupted conversion from the checkpoint saved in the work folder. Output files are kept.",
+    )
 
     return arg_parser
 
@@ -221,17 +841,31 @@ def create_argument_parser(description: str = "No description") -> ArgParser:
 
 
 def make_list_of_source_files(
-    f_arguments: list[str], rtcm_ext: str = "rtcm3"
+    f_arguments: list[str],
+    rtcm_ext: str = "rtcm3",
+    recursive: bool = False,
+    select_all: bool = False,
 ) -> list[str]:
     """Create list of source  files.
     Implements formal check of files listed in f_arguments.
-    Implements interactive interface if 'f_arguments' specifies directory."""
+    Implements interactive interface if 'f_arguments' specifies directory.
+    If 'select_all' is True, all files found in directory are selected without prompt.
+    If 'recursive' is True, subdirectories are scanned as well.
+    STDIN ('-') or network stream URL is accepted as the only source."""
 
     # Make list of source files to be processed
     # Two scenarios:
     # 1. Files listed directly in f_arguments.
     # 2. Source folder specified in f_arguments. Folder should be scanned and
     #    list of source files should be specified interactively.
+    #    Compressed files (*.rtcm3.gz, *.rtcm3.xz ...) are listed as well.
+
+    streams = [path for path in f_arguments if is_stream_source(path)]
+    if streams:
+        if len(f_arguments) > 1:
+            print("Streams can't be converted together with other sources.")
+            return []
+        return streams
 
     # Check, weather f_arguments specifies directory.
     src_is_dir = False
@@ -253,11 +887,20 @@ def make_list_of_source_files(
     else:
         fpattern = ".".join(["*", rtcm_ext])
         path = os.path.abspath(f_arguments[0])
-        pattern = os.path.join(path, fpattern)
+        if recursive:
+            pattern = os.path.join(path, "**", fpattern)
+        else:
+            pattern = os.path.join(path, fpattern)
         # Find files matching pattern
-        file_list = glob.glob(pattern)
+        file_list = glob.glob(pattern, recursive=recursive)
+        for ext in COMPRESSED_EXT:
+            file_list.extend(glob.glob(pattern + ext, recursive=recursive))
+        file_list.sort()
         if 0 == len(file_list):
             print(f"There are no files matching {fpattern} in {path}.")
+        elif select_all:
+            print(f"Found {len(file_list)} files matching {fpattern} pattern.")
+            files = file_list
         else:
             print(f"Found {len(file_list)} files matching {fpattern} pattern:")
             for idx, src in enumerate(file_list, start=1):
@@ -279,6 +922,167 @@ def make_list_of_source_files(
 # ............................................................................
 
 
+def convert_file(
+    fpath: str,
+    output_format: str,
+    boxed_controls: BoxWithConverterControls | None,
+    read_mode: str = "auto",
+    console: bool = True,
+    shards: int = 1,
+    threads: int = 1,
+    decoders: int = 1,
+    duration: float | None = None,
+    resume: bool = False,
+    follow: bool = False,
+    index: bool = False,
+) -> ConverterStatistics | None:
+    """Convert single file into its own work folder, log into the folder.
+    Return conversion statistics or None if conversion failed.
+    Runs in worker processes in batch mode, 'console' is False there.
+    If 'shards' > 1, the file is split into byte ranges converted in parallel.
+    If 'threads' > 1, messages are decoded in a pool of threads.
+    If 'decoders' > 1, messages are decoded in processes of shared memory pipeline.
+    Network stream is converted for 'duration' seconds or until interrupted.
+    If 'follow' is True, the growing file is followed for 'duration' seconds or
+    until interrupted.
+    If 'index' is True, messages are extracted by the frame index of the file, see
+    frame_index.py.
+    If 'resume' is True, interrupted conversion continues from the checkpoint saved
+    in the work folder, see checkpoint.py."""
+
+    if console:
+        print("-" * 80)
+        print(f"Started decoding: {fpath}")
+
+    if resume and not os.path.isfile(
+        checkpoint_path(work_folder_name(fpath, output_format))
+    ):
+        print("Checkpoint not found. Converting from the beginning.")
+        resume = False
+
+    # Create work folder. Work folder will have the same name as source file.
+    # There would be an empty text file in it to log decoding process.
+    wfld = create_work_folder(fpath, output_format, keep=resume)
+    if not wfld:
+        return None
+
+    # Init logger
+    lfile = os.path.join(wfld, make_log_file_name(fpath))
+    init_logger(lfile, console, append=resume)
+
+    rv = None
+    try:
+        # Check availability of controls
+        if boxed_controls is None:
+            logger.error("Conversion aborted. No valid controls.")
+            return None
+
+        if shards > 1:
+            if can_shard(fpath, output_format):
+                rv = convert_sharded(fpath, wfld, output_format, boxed_controls, shards)
+                if rv is None:
+                    logger.error("Decoding was terminated.")
+                elif rv.parsing_errors or rv.decoding_errors or rv.printing_errors:
+                    logger.progress("Finished with errors.")
+                else:
+                    logger.progress("Finished without errors.")
+                return rv
+            logger.warning(
+                f"Can't split file into shards (format {output_format}, "
+                + "compressed source or not a regular file). Converting sequentially."
+            )
+
+        # GPS week of observations is guessed from the source if not defined
+        boxed_controls.MARGO.ref_time = source_time(fpath)
+
+        # Create converter.
+        cf = ConverterFactory(output_format)
+        converter = cf(wfld, boxed_controls)
+        if converter is None:
+            logger.error("Conversion aborted. Converter hasn't been created.")
+            return None
+
+        checkpoints = None
+        interval = boxed_controls.INPUT.checkpoint_interval
+        followed = follow or is_stream_source(fpath)
+        if (interval > 0 or resume) and not followed and not index and decoders < 2:
+            if can_checkpoint(output_format, boxed_controls.OUTPUT):
+                checkpoints = Checkpointer(
+                    wfld, fpath, output_format, interval, (lfile,)
+                )
+            elif resume:
+                logger.error(f"Conversion into {output_format} can't be resumed.")
+                converter.release()
+                return None
+            else:
+                logger.warning(
+                    f"Checkpoints aren't supported (format {output_format} or "
+                    + "compressed outputs). Converting without checkpoints."
+                )
+
+        if decoders > 1 and not pipeline_available():
+            logger.warning("Shared memory pipeline isn't supported. Decoding sequentially.")
+            decoders = 1
+
+        if follow:
+            if decode_followed_file(
+                fpath,
+                converter,
+                boxed_controls.INPUT,
+                boxed_controls.OUTPUT.flush,
+                duration,
+            ):
+                rv = converter.get_statistics()
+        elif is_stream_url(fpath):
+            if decode_rtcm_stream(
+                fpath,
+                converter,
+                boxed_controls.STREAM,
+                boxed_controls.INPUT,
+                boxed_controls.OUTPUT.flush,
+                duration,
+            ):
+                rv = converter.get_statistics()
+        elif decoders > 1:
+            rv = decode_rtcm_pipelined(fpath, converter, decoders, read_mode)
+        elif decode_rtcm_file(
+            fpath,
+            converter,
+            read_mode,
+            threads,
+            boxed_controls.INPUT,
+            boxed_controls.OUTPUT.flush,
+            checkpoints,
+            resume,
+            (
+                FrameIndex(
+                    fpath,
+                    boxed_controls.MARGO.gps_utc_shift,
+                    boxed_controls.MARGO.gps_week,
+                )
+                if index
+                else None
+            ),
+        ):
+            rv = converter.get_statistics()
+            if checkpoints is not None:
+                checkpoints.remove()
+
+        if rv is None:
+            logger.error("Decoding was terminated.")
+        elif rv.parsing_errors or rv.decoding_errors or rv.printing_errors:
+            logger.progress("Finished with errors.")
+        else:
+            logger.progress("Finished without errors.")
+    finally:
+        logger.deinit()
+
+    return rv
+
+
+# ............................................................................
+
+
 def main(local_args: str | None = None) -> None:
     """Convert one or multiple RTCM files"""
 
@@ -301,53 +1105,132 @@ def main(local_args: str | None = None) -> None:
         ctrl_strg.update_from_file(args.ini_file)
         boxed_controls = ctrl_strg.boxed_controls
 
-    files = make_list_of_source_files(args.source, args.rtcm_ext)
-
-    output_format = args.format
-
-    for fpath in files:
-
-        print("-" * 80)
-        print(f"Started decoding: {fpath}")
-
-        # Create work folder. Work folder will have the same name as source file.
-        # There would be an empty text file in it to log decoding process.
-        wfld = create_work_folder(fpath, output_format)
-        if not wfld:
-            continue
-
-        # Init logger
-        lfile = os.path.join(wfld, make_log_file_name(fpath))
-        init_logger(lfile)
-
-        # Check availability of controls
-        if boxed_controls is None:
-            logger.error("Conversion aborted. No valid controls.")
-            logger.deinit()
-            continue
+    if args.compress is not None and boxed_controls is not None:
+        if not compression_available(args.compress):
+            print(f"Compression '{args.compress}' not available. Install 'zstandard'.")
+            return
+        boxed_controls.OUTPUT.compression = args.compress
+
+    if args.flush is not None and boxed_controls is not None:
+        boxed_controls.OUTPUT.flush = args.flush
+
+    if boxed_controls is not None:
+        if args.read_size is not None:
+            inp = boxed_controls.INPUT
+            inp.read_size_min, inp.read_size_max = args.read_size
+        if args.progress is not None:
+            inp = boxed_controls.INPUT
+            inp.progress_interval, inp.progress_step = args.progress
+        if args.checkpoint is not None:
+            boxed_controls.INPUT.checkpoint_interval = max(0, args.checkpoint)
+
+    files = make_list_of_source_files(
+        args.source, args.rtcm_ext, args.recursive, args.select_all
+    )
 
-        # Create converter.
-        cf = ConverterFactory(output_format)
-        converter = cf(wfld, boxed_controls)
-        if converter is None:
-            logger.error("Conversion aborted. Converter hasn't been created.")
-            logger.deinit()
-            continue
-
-        if decode_rtcm_file(fpath, converter):
-            err = converter.get_statistics()
-            if (
-                err.printing_errors
-                or err.decoding_errors
-                or err.printing_errors
-            ):
-                logger.progress("Finished with errors.")
+    if args.jobs > 1 and args.shards > 1:
+        print("Options --jobs and --shards can't be used together.")
+        return
+    if args.decoders > 1 and (args.jobs > 1 or args.shards > 1):
+        print("Option --decoders can't be used with --jobs or --shards.")
+        return
+    if files and is_stream_source(files[0]) and (args.shards > 1 or args.decoders > 1):
+        print("Streams can't be converted with --shards or --decoders.")
+        return
+    if args.resume and (args.shards > 1 or args.decoders > 1):
+        print("Option --resume can't be used with --shards or --decoders.")
+        return
+    if args.resume and files and is_stream_source(files[0]):
+        print("Streams can't be resumed.")
+        return
+    if args.follow and (
+        args.shards > 1 or args.decoders > 1 or args.jobs > 1 or args.resume
+    ):
+        print("Option --follow can't be used with --jobs, --shards, --decoders or --resume.")
+        return
+    if args.follow and (len(files) != 1 or is_stream_source(files[0])):
+        print("Option --follow requires a single source file.")
+        return
+    if args.index and (
+        args.shards > 1 or args.decoders > 1 or args.follow or args.resume
+    ):
+        print("Option --index can't be used with --shards, --decoders, --follow or --resume.")
+        return
+    if args.index and files and is_stream_source(files[0]):
+        print("Streams can't be indexed.")
+        return
+
+    summary = ConverterStatistics()
+    failed = []
+
+    if args.jobs > 1 and len(files) > 1:
+        # Largest files first: long jobs don't remain at the end of the queue
+        files.sort(key=os.path.getsize, reverse=True)
+        print(f"Converting {len(files)} files in {args.jobs} processes.")
+
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            jobs = {
+                pool.submit(
+                    convert_file,
+                    fpath,
+                    args.format,
+                    boxed_controls,
+                    args.read_mode,
+                    False,
+                    1,
+                    args.threads,
+                    1,
+                    None,
+                    args.resume,
+                    False,
+                    args.index,
+                ): fpath
+                for fpath in files
+            }
+            for cnt, job in enumerate(as_completed(jobs), start=1):
+                fpath = jobs[job]
+                try:
+                    stat = job.result()
+                except Exception as ex:
+                    print(f"Conversion of {fpath} failed. {type(ex)}: {ex}")
+                    stat = None
+                status = "FAILED" if stat is None else "OK"
+                print(f"[{cnt}/{len(files)}] {status}: {fpath}")
+                if stat is None:
+                    failed.append(fpath)
+                else:
+                    summary.accumulate(stat)
+    else:
+        for fpath in files:
+            stat = convert_file(
+                fpath,
+                args.format,
+                boxed_controls,
+                args.read_mode,
+                True,
+                args.shards,
+                args.threads,
+                args.decoders,
+                args.duration,
+                args.resume,
+                args.follow,
+                args.index,
+            )
+            if stat is None:
+                failed.append(fpath)
             else:
-                logger.progress("Finished without errors.")
-        else:
-            logger.error("Decoding was terminated.")
+                summary.accumulate(stat)
 
-        logger.deinit()
+    if len(files) > 1:
+        print("-" * 80)
+        print(
+            f"Converted {len(files) - len(failed)} of {len(files)} files: "
+            + f"{summary.decoding_attempts} messages, "
+            + f"prs-dec-prnt errors {summary.parsing_errors}-"
+            + f"{summary.decoding_errors}-{summary.printing_errors}."
+        )
+        for fpath in failed:
+            print(f"Failed: {fpath}")
 
 
 if __name__ == "__main__":
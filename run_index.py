@@ -0,0 +1,140 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Frame index builder. Use main(argv) to launch. Builds sidecar frame index
+    <source>.idx of RTCM files, extends indexes of growing files and rebuilds stale
+    ones, see frame_index.py. Converter uses indexes with --index option.
+
+    python run_index.py /data/2024-05/*.rtcm3
+    python run_index.py --check /data/2024-05
+"""
+
+# pylint: disable = line-too-long, broad-exception-caught
+
+import os
+import sys
+
+from argparse import ArgumentParser as ArgParser
+from run_conversion import make_list_of_source_files
+from run_shards import load_controls
+from frame_index import FrameIndex, FrameIndexError
+
+ARGS = None
+
+# ............................................................................
+
+
+def create_argument_parser() -> ArgParser:
+    """Create parser of command line arguments"""
+
+    arg_parser = ArgParser("Build frame indexes of RTCM files")
+    arg_parser.add_argument(
+        "source",
+        metavar="SRC",
+        nargs="+",
+        help="Source files or directory. Regular uncompressed files only.",
+    )
+    arg_parser.add_argument(
+        "-i",
+        "--ini",
+        dest="ini_file",
+        metavar="PATH",
+        default=None,
+        help="PATH to configuration file: [TIME] section: GPS2UTC shift for GLONASS epochs, GPS_WEEK.",
+    )
+    arg_parser.add_argument(
+        "--week",
+        dest="week",
+        metavar="WEEK",
+        type=int,
+        default=None,
+        help="GPS WEEK of the first epoch of new indexes. Default: GPS_WEEK of [TIME] section of ini file, 0 - the week nearest to modification time of the source.",
+    )
+    arg_parser.add_argument(
+        "--check",
+        dest="check",
+        action="store_true",
+        help="Report state of indexes without updating them.",
+    )
+    arg_parser.add_argument(
+        "--rebuild",
+        dest="rebuild",
+        action="store_true",
+        help="Rebuild indexes from scratch.",
+    )
+    arg_parser.add_argument(
+        "-ext",
+        dest="rtcm_ext",
+        metavar="EXT",
+        default="rtcm3",
+        help="Extension of RTCM files in the source directory. Default: rtcm3",
+    )
+    arg_parser.add_argument(
+        "-r",
+        "--recursive",
+        dest="recursive",
+        action="store_true",
+        help="Scan source directory and its subdirectories.",
+    )
+
+    return arg_parser
+
+
+# ............................................................................
+
+
+def index_file(index: FrameIndex, check: bool, rebuild: bool) -> bool:
+    """Update index of the file, print its state"""
+
+    state = index.state()
+    if check:
+        print(f"[{state}] {index.src}")
+        return state == "current"
+
+    if rebuild and os.path.isfile(index.path):
+        os.remove(index.path)
+    added = index.update()
+
+    hdr = index.header()
+    print(
+        f"[{state}] {index.src}: {hdr.frames} messages ({added} added), "
+        + f"parsing errors {hdr.parse_errors}."
+    )
+    return True
+
+
+def main(local_args: str | None = None) -> bool:
+    """Build indexes. Return True if succeeded."""
+
+    arg_parser = create_argument_parser()
+    if local_args is None:
+        args = arg_parser.parse_args()
+    else:
+        args = arg_parser.parse_args(local_args.split(" "))
+
+    boxed_controls = load_controls(args.ini_file)
+    if boxed_controls is None:
+        print("No valid controls.")
+        return False
+    week = boxed_controls.MARGO.gps_week if args.week is None else args.week
+
+    files = make_list_of_source_files(args.source, args.rtcm_ext, args.recursive, True)
+    if not files:
+        print("No source files.")
+        return False
+
+    ok = True
+    for fpath in files:
+        index = FrameIndex(fpath, boxed_controls.MARGO.gps_utc_shift, week)
+        try:
+            ok = index_file(index, args.check, args.rebuild) and ok
+        except (OSError, FrameIndexError) as ex:
+            print(f"[failed] {fpath}: {ex}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+
+    sys.exit(0 if main(ARGS) else 1)
@@ -0,0 +1,169 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Multi-stream ingest server. Use main(argv) to launch.
+    Base stations (NTRIP sources or raw TCP streams) connect to the server, each
+    stream is converted into its own folder in the work directory.
+    See ingest_server.py for details.
+
+    python run_ingest.py -o MARGO -i ingest.ini --listen 0.0.0.0:2101 --work /data/live
+"""
+
+# pylint: disable = line-too-long, broad-exception-caught
+
+import os
+import sys
+import asyncio
+
+from argparse import ArgumentParser as ArgParser
+from ingest_server import IngestServer
+from printers.file_pool import FLUSH_MODES
+from run_conversion import init_logger
+from run_shards import load_controls
+from sources.stream_client import NTRIP_PORT
+from logger import LOGGER_CF as logger
+
+ARGS = None
+
+INGEST_FORMATS = [
+    "MARGO",
+    "JSON",
+    "JSON-B",
+    "JARGO",
+    "JSONL",
+    "JSONL-B",
+    "JARGO-L",
+    "NPY",
+    "PARQUET",
+    "SQLITE",
+    "RINEX",
+]
+
+# ............................................................................
+
+
+def parse_listen(text: str) -> tuple[str, int]:
+    """Convert 'HOST:PORT', 'HOST' or ':PORT' into (host, port)"""
+
+    host, sep, port = text.rpartition(":")
+    if not sep:
+        host, port = text, ""
+    return host or "0.0.0.0", int(port) if port else NTRIP_PORT
+
+
+def create_argument_parser() -> ArgParser:
+    """Create parser of command line arguments"""
+
+    arg_parser = ArgParser("Receive and convert RTCM streams of many base stations")
+    arg_parser.add_argument(
+        "-o",
+        "--output",
+        dest="format",
+        metavar="FORMAT",
+        default="MARGO",
+        choices=INGEST_FORMATS,
+        help="Output FORMAT: " + " | ".join(INGEST_FORMATS) + ". Default: MARGO",
+    )
+    arg_parser.add_argument(
+        "-i",
+        "--ini",
+        dest="ini_file",
+        metavar="PATH",
+        default=None,
+        help="PATH to configuration file.",
+    )
+    arg_parser.add_argument(
+        "--listen",
+        dest="listen",
+        metavar="HOST:PORT",
+        type=parse_listen,
+        default=("0.0.0.0", NTRIP_PORT),
+        help=f"Address to listen on. Default: 0.0.0.0:{NTRIP_PORT}",
+    )
+    arg_parser.add_argument(
+        "--work",
+        dest="work_dir",
+        metavar="DIR",
+        default="ingest",
+        help="DIR for outputs of streams and the log. Default: ingest",
+    )
+    arg_parser.add_argument(
+        "--workers",
+        dest="workers",
+        metavar="N",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) - 1),
+        help="Number of decoder processes, 0 - decode in the server process. "
+        + "Default: number of CPUs - 1",
+    )
+    arg_parser.add_argument(
+        "--duration",
+        dest="duration",
+        metavar="SECONDS",
+        type=float,
+        default=None,
+        help="Stop the server after SECONDS. Default: run until interrupted.",
+    )
+    arg_parser.add_argument(
+        "--flush",
+        dest="flush",
+        metavar="MODE",
+        default=None,
+        choices=FLUSH_MODES,
+        help="Flush output files after each: "
+        + " | ".join(FLUSH_MODES)
+        + ". Default: [OUTPUT] FLUSH of ini file",
+    )
+    return arg_parser
+
+
+# ............................................................................
+
+
+async def serve(server: IngestServer, host: str, port: int, duration: float | None):
+    """Start the server and serve connections"""
+    await server.start(host, port)
+    await server.serve(duration)
+
+
+def main(local_args: str | None = None) -> bool:
+    """Run the server. Return True if it was stopped normally."""
+
+    arg_parser = create_argument_parser()
+    if local_args is None:
+        args = arg_parser.parse_args()
+    else:
+        args = arg_parser.parse_args(local_args.split(" "))
+
+    boxed_controls = load_controls(args.ini_file)
+    if boxed_controls is None:
+        print("No valid controls.")
+        return False
+    if args.flush is not None:
+        boxed_controls.OUTPUT.flush = args.flush
+
+    try:
+        os.makedirs(args.work_dir, exist_ok=True)
+    except OSError as oe:
+        print(f"Work folder wasn't created. {type(oe)}: {oe}")
+        return False
+
+    init_logger(os.path.join(args.work_dir, "ingest-log.txt"))
+    server = IngestServer(args.format, boxed_controls, args.work_dir, args.workers)
+    try:
+        asyncio.run(serve(server, *args.listen, args.duration))
+    except KeyboardInterrupt:
+        logger.info("Server stopped by the user.")
+    except (OSError, ValueError) as ex:
+        logger.error(f"Server failed. {type(ex)}: {ex}")
+        return False
+    finally:
+        logger.deinit()
+
+    return True
+
+
+if __name__ == "__main__":
+
+    sys.exit(0 if main(ARGS) else 1)
@@ -0,0 +1,288 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Multi-node conversion on a shared filesystem. Use main(argv) to launch.
+    Commands:
+    - plan - scan source files and write JSON manifest of frame aligned shards;
+    - run-shard - convert shards of the manifest, each into its own folder. Run it on
+    several nodes (or in several processes) with different shard indexes;
+    - merge - check that all shards are converted and merge their outputs into
+    <manifest>-<FORMAT> folder next to the manifest.
+
+    python run_shards.py plan -o MARGO -m month.json --shard-size 64M /data/2024-05
+    python run_shards.py run-shard month.json --node 0 --nodes 8
+    python run_shards.py merge month.json
+"""
+
+# pylint: disable = line-too-long, broad-exception-caught
+
+import os
+import sys
+
+from argparse import ArgumentParser as ArgParser
+from controls import ConverterControls, BoxWithConverterControls
+from run_conversion import (
+    DEFAULT_CONFIG,
+    create_work_folder,
+    init_logger,
+    make_list_of_source_files,
+    make_log_file_name,
+    parse_size,
+)
+from shards import (
+    MANIFEST_SHARD_LEN,
+    SHARDABLE_FORMATS,
+    plan_manifest,
+    save_manifest,
+    load_manifest,
+    run_manifest_shard,
+    merge_manifest,
+)
+from logger import LOGGER_CF as logger
+
+ARGS = None
+
+# ............................................................................
+
+
+def load_controls(ini: str | None) -> BoxWithConverterControls | None:
+    """Load default controls, update them from 'ini' file"""
+
+    ctrl_strg = ConverterControls()
+    ctrl_strg.init_from_file(DEFAULT_CONFIG)
+    if ini is not None:
+        ctrl_strg.update_from_file(ini)
+    return ctrl_strg.boxed_controls
+
+
+# ............................................................................
+
+
+def create_argument_parser() -> ArgParser:
+    """Create parser of command line arguments"""
+
+    arg_parser = ArgParser("Convert RTCM files on several nodes")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    plan = commands.add_parser("plan", help="Split source files into shards.")
+    plan.add_argument(
+        "source",
+        metavar="SRC",
+        nargs="+",
+        help="Source files or directory.",
+    )
+    plan.add_argument(
+        "-m",
+        "--manifest",
+        dest="manifest",
+        metavar="PATH",
+        required=True,
+        help="PATH of the manifest to be created.",
+    )
+    plan.add_argument(
+        "-o",
+        "--output",
+        dest="format",
+        metavar="FORMAT",
+        default="MARGO",
+        choices=SHARDABLE_FORMATS,
+        help="Output FORMAT: " + " | ".join(SHARDABLE_FORMATS) + ". Default: MARGO",
+    )
+    plan.add_argument(
+        "-i",
+        "--ini",
+        dest="ini_file",
+        metavar="PATH",
+        default=None,
+        help="PATH to configuration file used by all nodes.",
+    )
+    plan.add_argument(
+        "--work",
+        dest="work_dir",
+        metavar="DIR",
+        default=None,
+        help="DIR for outputs of shards. Default: <manifest>-shards",
+    )
+    plan.add_argument(
+        "--shard-size",
+        dest="shard_len",
+        metavar="SIZE",
+        type=parse_size,
+        default=MANIFEST_SHARD_LEN,
+        help="Approximate SIZE of shards, e.g. 512K, 64M. Default: 64M",
+    )
+    plan.add_argument(
+        "-ext",
+        dest="rtcm_ext",
+        metavar="EXT",
+        default="rtcm3",
+        help="Extension of RTCM files in the source directory. Default: rtcm3",
+    )
+    plan.add_argument(
+        "-r",
+        "--recursive",
+        dest="recursive",
+        action="store_true",
+        help="Scan source directory and its subdirectories.",
+    )
+
+    run = commands.add_parser("run-shard", help="Convert shards of the manifest.")
+    run.add_argument("manifest", metavar="MANIFEST", help="Path to the manifest.")
+    run.add_argument(
+        "indexes",
+        metavar="INDEX",
+        type=int,
+        nargs="*",
+        help="Indexes of shards to be converted.",
+    )
+    run.add_argument(
+        "--node",
+        dest="node",
+        metavar="K",
+        type=int,
+        default=None,
+        help="Convert shards with index %% N == K. Use with --nodes.",
+    )
+    run.add_argument(
+        "--nodes",
+        dest="nodes",
+        metavar="N",
+        type=int,
+        default=1,
+        help="Number of nodes. Default: 1",
+    )
+
+    merge = commands.add_parser("merge", help="Merge outputs of shards.")
+    merge.add_argument("manifest", metavar="MANIFEST", help="Path to the manifest.")
+
+    return arg_parser
+
+
+# ............................................................................
+
+
+def plan(args) -> bool:
+    """Make manifest"""
+
+    files = make_list_of_source_files(args.source, args.rtcm_ext, args.recursive, True)
+    if not files:
+        print("No source files.")
+        return False
+
+    boxed_controls = load_controls(args.ini_file)
+    if boxed_controls is None:
+        print("No valid controls.")
+        return False
+
+    work_dir = args.work_dir
+    if work_dir is None:
+        work_dir = os.path.splitext(args.manifest)[0] + "-shards"
+
+    try:
+        manifest = plan_manifest(
+            files,
+            args.format,
+            work_dir,
+            args.ini_file,
+            args.shard_len,
+            boxed_controls.MARGO.gps_utc_shift,
+        )
+        save_manifest(manifest, args.manifest)
+    except (OSError, ValueError) as ex:
+        print(f"Failed to make manifest. {type(ex)}: {ex}")
+        return False
+
+    shards = manifest["shards"]
+    print(
+        f"Planned {len(shards)} shards of {len(files)} files, "
+        + f"{sum(e['messages'] for e in shards)} messages: {args.manifest}"
+    )
+    return True
+
+
+def run_shards(args) -> bool:
+    """Convert shards of manifest"""
+
+    manifest = load_manifest(args.manifest)
+    indexes = list(args.indexes)
+    if args.node is not None:
+        indexes += [
+            e["index"]
+            for e in manifest["shards"]
+            if e["index"] % args.nodes == args.node
+        ]
+    if not indexes:
+        print("No shards selected. Use INDEX or --node.")
+        return False
+
+    boxed_controls = load_controls(manifest["ini"])
+    if boxed_controls is None:
+        print("No valid controls.")
+        return False
+
+    ok = True
+    for index in indexes:
+        if not 0 <= index < len(manifest["shards"]):
+            print(f"[{index}] FAILED: no such shard.")
+            ok = False
+            continue
+        res = run_manifest_shard(manifest, index, boxed_controls)
+        status = "FAILED" if res.statistics is None else "OK"
+        print(f"[{index}] {status}: {res.messages} messages.")
+        ok = ok and res.statistics is not None
+    return ok
+
+
+def merge(args) -> bool:
+    """Merge outputs of shards"""
+
+    manifest = load_manifest(args.manifest)
+    boxed_controls = load_controls(manifest["ini"])
+    if boxed_controls is None:
+        print("No valid controls.")
+        return False
+
+    wfld = create_work_folder(args.manifest, manifest["format"])
+    if not wfld:
+        return False
+
+    init_logger(os.path.join(wfld, make_log_file_name(args.manifest)))
+    try:
+        rv = merge_manifest(manifest, wfld, boxed_controls)
+        if rv is None:
+            logger.error("Merging was terminated.")
+            return False
+        logger.progress(
+            f"Merged {len(manifest['shards'])} shards: {rv.decoding_attempts} "
+            + f"messages, prs-dec-prnt errors {rv.parsing_errors}-"
+            + f"{rv.decoding_errors}-{rv.printing_errors}."
+        )
+    finally:
+        logger.deinit()
+
+    return True
+
+
+COMMANDS = {"plan": plan, "run-shard": run_shards, "merge": merge}
+
+
+def main(local_args: str | None = None) -> bool:
+    """Run command. Return True if succeeded."""
+
+    arg_parser = create_argument_parser()
+    if local_args is None:
+        args = arg_parser.parse_args()
+    else:
+        args = arg_parser.parse_args(local_args.split(" "))
+
+    try:
+        return COMMANDS[args.command](args)
+    except (OSError, ValueError, AssertionError) as ex:
+        print(f"Command {args.command} failed. {type(ex)}: {ex}")
+        return False
+
+
+if __name__ == "__main__":
+
+    sys.exit(0 if main(ARGS) else 1)
@@ -0,0 +1,553 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Intra-file parallel conversion. Use convert_sharded() to convert a single large
+    source file in several processes.
+
+    Source file is split into N byte ranges (shards). Each shard is converted in a
+    separate process into its own folder: the worker synchronizes to the first valid
+    RTCM message at or after the range start and stops at the first message starting
+    at or after the range end. Then outputs of shards are concatenated in order,
+    headers of the 2nd and following shards are dropped. The result is byte-identical
+    to the result of sequential conversion.
+
+    Consistency check. Message extraction is deterministic: the next message is the
+    first valid message after the end of the previous one. So shard N+1 is consistent
+    if shard N stopped at or before the first message of shard N+1. Otherwise (false
+    synchronization inside a message crossing the border of ranges) shard N+1 is
+    converted again starting where shard N stopped.
+
+    Parsing errors are counted per shard: bytes skipped right at the border of ranges
+    may be missed in statistics.
+
+    Multi-node conversion. plan_manifest() scans source files and splits them into
+    frame aligned shards described in a JSON manifest. Each shard is converted by
+    run_manifest_shard() on any node sharing the filesystem, merge_manifest() puts
+    outputs of shards together in epoch order. See run_shards.py.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import copy
+import json
+import math
+import shutil
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
+
+from controls import BoxWithConverterControls
+from converter_top import ConverterFactory, ConverterStatistics
+from decoder_top import DecoderTop
+from gnss_types import ObservablesMSM
+from printers.file_pool import COMPRESSION_EXT, open_output
+from printers.margo_printer import MargoCore
+from sources import SourceFile
+from sub_decoders import SubdecoderMSM4567, SubdecoderMSM123
+
+from logger import LOGGER_CF as logger
+
+
+# Formats which outputs can be concatenated
+SHARDABLE_FORMATS = ("MARGO", "JSON", "JSON-B", "JSONL", "JSONL-B", "JARGO", "JARGO-L")
+
+# Minimal length of the byte range
+MIN_SHARD_LEN: int = 2**16
+# Length of the window of the mapped file processed at once
+SHARD_WINDOW_LEN: int = 2**20
+
+# Number of header lines of output files by extension.
+# JSON files are processed separately.
+_HEADER_LINES = {".obs": 2, ".jsonl": 1}
+_JSON_HEAD = b"[\r"
+_JSON_TAIL = b"\r]"
+_JSON_SEPARATOR = b",\r"
+
+MANIFEST_VERSION: int = 1
+# Default length of manifest shards
+MANIFEST_SHARD_LEN: int = 2**26
+_WEEK_MS: int = 604800000
+
+
+@dataclass
+class ShardResult:
+    """Result of a single shard conversion"""
+
+    index: int = 0
+    # Offset of the first message of the shard
+    first: int = 0
+    # Offset the shard processing stopped at
+    end: int = 0
+    messages: int = 0
+    statistics: ConverterStatistics | None = None
+
+
+def can_shard(fpath: str, output_format: str) -> bool:
+    """Check whether the file can be converted by shards"""
+    if output_format not in SHARDABLE_FORMATS:
+        return False
+    try:
+        with SourceFile(fpath) as f:
+            return f.mappable
+    except OSError:
+        return False
+
+
+def plan_shards(size: int, shards: int) -> list[tuple[int, int]]:
+    """Split 'size' bytes into byte ranges [start, stop) of nearly equal length.
+    Ranges are not shorter than MIN_SHARD_LEN."""
+
+    shards = max(1, min(shards, size // MIN_SHARD_LEN))
+    bounds = [size * i // shards for i in range(shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def shard_folder(wfld: str, index: int) -> str:
+    """Make path to the work folder of the shard"""
+    return os.path.join(wfld, f".shard-{index:02d}")
+
+
+def convert_shard(
+    fpath: str,
+    wfld: str,
+    index: int,
+    start: int,
+    stop: int,
+    output_format: str,
+    controls: BoxWithConverterControls,
+) -> ShardResult:
+    """Convert messages starting in [start, stop) byte range of the file.
+    Runs in a worker process."""
+
+    rv = ShardResult(index=index, first=stop, end=stop)
+
+    folder = shard_folder(wfld, index)
+    if os.path.isdir(folder):
+        shutil.rmtree(folder)
+    os.makedirs(folder)
+    # Forked worker inherits logger of the main process
+    logger.deinit()
+    logger.init_2CH(os.path.join(folder, f"shard-{index:02d}-log.txt"), "RTCMDEC", False)
+
+    converter = None
+    try:
+        converter = ConverterFactory(output_format)(folder, controls)
+        if converter is None:
+            logger.error("Conversion aborted. Converter hasn't been created.")
+            return rv
+
+        with SourceFile(fpath) as f:
+            mm = f.map()
+            size = len(mm)
+            try:
+                pos = DecoderTop().find_frame(mm, start, size)
+                rv.first = pos
+                while pos < stop:
+                    end = min(size, pos + SHARD_WINDOW_LEN)
+                    frames, pos = converter.parse_buffer(mm, pos, end, stop)
+
+                    for msg in frames:
+                        xblock = converter.decode(msg)
+                        if xblock is not None:
+                            converter.print(xblock)
+                    rv.messages += len(frames)
+
+                    for msg in frames:
+                        msg.release()
+                    del frames
+
+                    if end == size:
+                        break
+                rv.end = pos
+            finally:
+                try:
+                    mm.close()
+                except BufferError:
+                    pass
+
+        logger.info(
+            f"Shard {index}: bytes {start}..{stop}, messages from {rv.first} "
+            + f"to {rv.end}, {rv.messages} messages."
+        )
+    except Exception as ex:
+        logger.error(f"Shard {index} failed. {type(ex)}: {ex}")
+        return rv
+    finally:
+        if converter is not None:
+            converter.release()
+        logger.deinit()
+
+    rv.statistics = converter.get_statistics()
+    return rv
+
+
+def _copy_range(src, dst, length: int) -> None:
+    """Copy 'length' bytes from src to dst file"""
+    while length > 0:
+        buf = src.read(min(length, 2**20))
+        if not buf:
+            break
+        dst.write(buf)
+        length -= len(buf)
+
+
+def merge_file(parts: list[str], dst) -> None:
+    """Concatenate outputs of shards into 'dst' binary file. Header of the first
+    part is kept, headers of other parts are dropped."""
+
+    _, ext = os.path.splitext(parts[0])
+
+    for k, part in enumerate(parts):
+        size = os.path.getsize(part)
+        with open(part, "rb") as src:
+            if ext == ".json":
+                # JSON array: '[\r' + header + (',\r' + record)... + '\r]'
+                ofs = 0
+                if k > 0:
+                    head = src.read(2**16)
+                    ofs = head.find(_JSON_SEPARATOR)
+                    assert head.startswith(_JSON_HEAD) and ofs > 0, f"Bad file {part}"
+                    src.seek(ofs)
+                tail = 0 if k == len(parts) - 1 else len(_JSON_TAIL)
+                _copy_range(src, dst, size - ofs - tail)
+            else:
+                lines = _HEADER_LINES.get(ext)
+                assert lines is not None, f"Can't merge file {part}"
+                if k > 0:
+                    for _ in range(lines):
+                        src.readline()
+                shutil.copyfileobj(src, dst)
+
+
+def merge_shards(
+    wfld: str, folders: list[str], controls: BoxWithConverterControls
+) -> int:
+    """Merge outputs of shards into the work folder. Return number of files."""
+
+    out = controls.OUTPUT
+    rpaths: dict[str, list[str]] = {}
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            for fname in sorted(files):
+                if fname.endswith("-log.txt"):
+                    continue
+                path = os.path.join(root, fname)
+                rpaths.setdefault(os.path.relpath(path, folder), []).append(path)
+
+    for rpath, parts in rpaths.items():
+        path = os.path.join(wfld, rpath) + COMPRESSION_EXT[out.compression]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open_output(path, "w", True, out.compression, out.compression_level) as dst:
+            merge_file(parts, dst)
+
+    return len(rpaths)
+
+
+def convert_sharded(
+    fpath: str,
+    wfld: str,
+    output_format: str,
+    controls: BoxWithConverterControls,
+    shards: int,
+) -> ConverterStatistics | None:
+    """Convert file in 'shards' processes, merge results into 'wfld' folder.
+    Return conversion statistics or None if conversion failed."""
+
+    assert output_format in SHARDABLE_FORMATS, f"Can't shard {output_format}"
+
+    # Shards are written without compression and merged with compression
+    sctrls = copy.deepcopy(controls)
+    sctrls.OUTPUT.compression = "none"
+    sctrls.OUTPUT.writer_thread = False
+
+    ranges = plan_shards(os.path.getsize(fpath), shards)
+    logger.info(f"Source file is split into {len(ranges)} shards.")
+
+    args = (fpath, wfld)
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        jobs = [
+            pool.submit(convert_shard, *args, i, start, stop, output_format, sctrls)
+            for i, (start, stop) in enumerate(ranges)
+        ]
+        results = [job.result() for job in jobs]
+
+        # Check the chain of shards
+        pos = 0
+        for i, res in enumerate(results):
+            if res.statistics is not None and res.first < pos:
+                logger.warning(
+                    f"Shard {i} is out of sync: starts at {res.first}, previous shard "
+                    + f"ends at {pos}. Converting again."
+                )
+                res = pool.submit(
+                    convert_shard, *args, i, pos, ranges[i][1], output_format, sctrls
+                ).result()
+                results[i] = res
+            if res.statistics is None:
+                logger.error(f"Conversion of shard {i} failed.")
+                return None
+            if res.messages:
+                pos = res.end
+
+    summary = ConverterStatistics()
+    folders = []
+    for res in results:
+        summary.accumulate(res.statistics)
+        folders.append(shard_folder(wfld, res.index))
+
+    try:
+        nfiles = merge_shards(wfld, folders, controls)
+        logger.info(f"Merged {nfiles} files of {len(folders)} shards.")
+    except (OSError, AssertionError) as ex:
+        logger.error(f"Failed to merge shards. {type(ex)}: {ex}")
+        return None
+
+    # Keep logs of shards, remove the rest
+    for folder in folders:
+        for log in os.listdir(folder):
+            if log.endswith("-log.txt"):
+                shutil.move(os.path.join(folder, log), os.path.join(wfld, log))
+        shutil.rmtree(folder)
+
+    return summary
+
+
+# ............................................................................
+# Multi-node conversion
+
+
+def shard_result_path(wfld: str, index: int) -> str:
+    """Make path to the result of the shard conversion"""
+    return shard_folder(wfld, index) + ".json"
+
+
+def _is_msm(mnum: int) -> bool:
+    """Check whether message is MSM1..7"""
+    return 1070 < mnum < 1140 and 1 <= mnum % 10 <= 7
+
+
+def _msm_epoch(dec: DecoderTop, msg: bytes, utc_shift: int) -> int | None:
+    """Decode MSM message, return its epoch as GPS time of week [ms]"""
+    obs = dec.decode(msg)
+    if not isinstance(obs, ObservablesMSM):
+        return None
+    return MargoCore.conv_to_gps_time(obs.hdr.time, obs.hdr.day, utc_shift, obs.atr.gnss)
+
+
+def plan_file(fpath: str, shard_len: int, utc_shift: int) -> list[dict]:
+    """Scan file, split it into shards of about 'shard_len' bytes. Borders of shards
+    are offsets of messages. Return list of manifest entries."""
+
+    scanner = DecoderTop()
+    epochs = DecoderTop()
+    epochs.register_decoder(SubdecoderMSM4567().io)
+    epochs.register_decoder(SubdecoderMSM123().io)
+
+    entries = []
+    with SourceFile(fpath) as f:
+        if not f.mappable:
+            raise ValueError(f"File {fpath} is compressed or not a regular file.")
+        mm = f.map()
+        try:
+            size = len(mm)
+            pos = scanner.find_frame(mm, 0, size)
+            for _, stop in plan_shards(size, math.ceil(size / max(shard_len, 1))):
+                entry = {"file": fpath, "start": pos, "stop": size, "messages": 0}
+                counts: dict[int, int] = {}
+                first_msm, last_msm = None, None
+                while pos < stop:
+                    end = min(size, pos + SHARD_WINDOW_LEN)
+                    frames, pos = scanner.catch_frames(mm, pos, end, stop)
+                    for msg in frames:
+                        mnum = (msg[3] << 4) | (msg[4] >> 4)
+                        counts[mnum] = counts.get(mnum, 0) + 1
+                        if _is_msm(mnum):
+                            if first_msm is None:
+                                first_msm = bytes(msg)
+                            last_msm = msg
+                    if last_msm is not None:
+                        last_msm = bytes(last_msm)
+                    for msg in frames:
+                        msg.release()
+                    del frames
+                    if end == size:
+                        break
+                # The next shard starts exactly at the next message
+                pos = scanner.find_frame(mm, pos, size) if pos < size else size
+                entry["stop"] = pos
+
+                if not counts:
+                    continue
+                entry["messages"] = sum(counts.values())
+                entry["counts"] = {str(k): v for k, v in sorted(counts.items())}
+                entry["first_epoch"] = (
+                    None if first_msm is None else _msm_epoch(epochs, first_msm, utc_shift)
+                )
+                entry["last_epoch"] = (
+                    None if last_msm is None else _msm_epoch(epochs, last_msm, utc_shift)
+                )
+                entries.append(entry)
+        finally:
+            try:
+                mm.close()
+            except BufferError:
+                pass
+
+    return entries
+
+
+def plan_manifest(
+    files: list[str],
+    output_format: str,
+    wfld: str,
+    ini: str | None = None,
+    shard_len: int = MANIFEST_SHARD_LEN,
+    utc_shift: int = 18,
+) -> dict:
+    """Make manifest of frame aligned shards of source files.
+    Outputs of shards are placed into 'wfld' folder."""
+
+    assert output_format in SHARDABLE_FORMATS, f"Can't shard {output_format}"
+
+    entries = []
+    for fpath in files:
+        entries.extend(plan_file(os.path.abspath(fpath), shard_len, utc_shift))
+    for index, entry in enumerate(entries):
+        entry["index"] = index
+
+    return {
+        "version": MANIFEST_VERSION,
+        "format": output_format,
+        "ini": None if ini is None else os.path.abspath(ini),
+        "work_dir": os.path.abspath(wfld),
+        "shards": entries,
+    }
+
+
+def save_manifest(manifest: dict, path: str) -> None:
+    """Save manifest into JSON file"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+
+def load_manifest(path: str) -> dict:
+    """Load manifest from JSON file"""
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest.get("version") == MANIFEST_VERSION, f"Bad manifest {path}"
+    return manifest
+
+
+def run_manifest_shard(
+    manifest: dict, index: int, controls: BoxWithConverterControls
+) -> ShardResult:
+    """Convert single shard of the manifest. Save result next to the shard folder."""
+
+    entry = manifest["shards"][index]
+    wfld = manifest["work_dir"]
+    os.makedirs(wfld, exist_ok=True)
+
+    # Shards are written without compression and merged with compression
+    sctrls = copy.deepcopy(controls)
+    sctrls.OUTPUT.compression = "none"
+    sctrls.OUTPUT.writer_thread = False
+
+    rv = convert_shard(
+        entry["file"], wfld, index, entry["start"], entry["stop"], manifest["format"], sctrls
+    )
+    with open(shard_result_path(wfld, index), "w", encoding="utf-8") as f:
+        json.dump(asdict(rv), f)
+    return rv
+
+
+def _load_shard_result(wfld: str, index: int) -> ShardResult | None:
+    """Load result of the shard conversion. Return None if shard wasn't converted."""
+    try:
+        with open(shard_result_path(wfld, index), "r", encoding="utf-8") as f:
+            rv = ShardResult(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+    if rv.statistics is not None:
+        rv.statistics = ConverterStatistics(**rv.statistics)
+    return rv
+
+
+def epoch_order(entries: list[dict]) -> list[dict]:
+    """Sort entries by epoch. Files are ordered by the first epoch, shards of a file
+    keep their order. GPS time of week is unwrapped along the manifest: a step back
+    by more than half a week is regarded as week rollover."""
+
+    files: dict[str, list[dict]] = {}
+    for entry in entries:
+        files.setdefault(entry["file"], []).append(entry)
+
+    keys = {}
+    week, last, key = 0, None, -1
+    for k, (fpath, shards) in enumerate(files.items()):
+        first = None
+        for e in shards:
+            for t in (e["first_epoch"], e["last_epoch"]):
+                if t is None:
+                    continue
+                if last is not None and last - t > _WEEK_MS // 2:
+                    week += 1
+                elif last is not None and t - last > _WEEK_MS // 2:
+                    week -= 1
+                last = t
+                if first is None:
+                    first = week * _WEEK_MS + t
+        # Files without observables keep position after the previous file
+        key = key if first is None else first
+        keys[fpath] = (key, k)
+
+    rv = []
+    for fpath in sorted(files, key=lambda p: keys[p]):
+        rv.extend(sorted(files[fpath], key=lambda e: e["start"]))
+    return rv
+
+
+def merge_manifest(
+    manifest: dict, wfld: str, controls: BoxWithConverterControls
+) -> ConverterStatistics | None:
+    """Check results of all shards of the manifest and merge their outputs into 'wfld'
+    folder in epoch order. Return conversion statistics or None if some shards are
+    absent or inconsistent."""
+
+    sfld = manifest["work_dir"]
+    summary = ConverterStatistics()
+    folders = []
+    missed = []
+    for entry in epoch_order(manifest["shards"]):
+        index = entry["index"]
+        res = _load_shard_result(sfld, index)
+        if res is None or res.statistics is None:
+            missed.append(index)
+            continue
+        if res.first != entry["start"] or res.messages != entry["messages"]:
+            logger.error(
+                f"Shard {index}: {res.messages} messages from {res.first}, planned "
+                + f"{entry['messages']} messages from {entry['start']}. Source file changed?"
+            )
+            missed.append(index)
+            continue
+        summary.accumulate(res.statistics)
+        folders.append(shard_folder(sfld, index))
+
+    if missed:
+        logger.error(f"Shards {sorted(missed)} are not converted or inconsistent.")
+        return None
+
+    try:
+        nfiles = merge_shards(wfld, folders, controls)
+        logger.info(f"Merged {nfiles} files of {len(folders)} shards.")
+    except (OSError, AssertionError) as ex:
+        logger.error(f"Failed to merge shards. {type(ex)}: {ex}")
+        return None
+
+    for folder in folders:
+        for log in os.listdir(folder):
+            if log.endswith("-log.txt"):
+                shutil.copy(os.path.join(folder, log), os.path.join(wfld, log))
+
+    return summary
@@ -0,0 +1,289 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Shared memory pipeline. Use decode_rtcm_pipelined() to convert a single file in
+    several processes without pickling of RTCM frames.
+
+    Processes:
+    1. Framer - reads source file, extracts frames and copies them into a ring of
+    frame slots in shared memory. The ring is handed over in blocks of BLOCK_FRAMES
+    slots: block index and lengths of frames are sent to decoders through a queue.
+    Framer waits for a free block when all blocks are in use (backpressure).
+    2. Decoders - decode frames directly from the shared buffer, send decoded data to
+    the printer, then return the block to the framer.
+    3. Printer - the calling process. Restores the order of blocks and prints data.
+
+    Framer and decoders are forked from the calling process and reuse DecoderTop of
+    its converter with registered sub-decoders. Printers are used by the calling
+    process only. Requires 'fork' start method, not available on Windows.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+from converter_top import Converter, ConverterStatistics
+from decoder_top import DecoderTop
+from sources import SourceFile
+
+from logger import LOGGER_CF as logger
+
+
+# Maximal length of RTCM frame: header, 1023 bytes of payload, CRC
+FRAME_SLOT_LEN: int = 3 + 1023 + 3
+# Number of frame slots handed over at once
+BLOCK_FRAMES: int = 64
+# Number of blocks in the ring per decoder process
+RING_BLOCKS_PER_DECODER: int = 4
+# Reading of the source file
+FILE_CHUNCK_LEN: int = 2**16
+MMAP_WINDOW_LEN: int = 2**20
+# Period of checking pipeline processes, s
+POLL_PERIOD: float = 1.0
+
+_CTX = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+
+
+def pipeline_available() -> bool:
+    """Check whether the platform supports the pipeline"""
+    return _CTX is not None
+
+
+def _read_frames(f: SourceFile, decoder: DecoderTop, mapped: bool):
+    """Yield lists of frames extracted from the file and the number of processed
+    bytes. Mapped frames are valid until the next iteration."""
+
+    if not mapped:
+        chunk = f.read(FILE_CHUNCK_LEN)
+        while len(chunk):
+            yield decoder.catch_message(chunk), f.consumed
+            chunk = f.read(FILE_CHUNCK_LEN)
+        return
+
+    mm = f.map()
+    try:
+        size = len(mm)
+        start = 0
+        while start < size:
+            end = min(size, start + MMAP_WINDOW_LEN)
+            frames, start = decoder.catch_frames(mm, start, end)
+            yield frames, end
+
+            for msg in frames:
+                msg.release()
+            del frames
+
+            if end == size:
+                break
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            pass
+
+
+def _run_framer(
+    fpath: str,
+    mapped: bool,
+    decoder: DecoderTop,
+    ring: shared_memory.SharedMemory,
+    free,
+    work,
+    results,
+    decoders: int,
+) -> None:
+    """Framer process. Copies frames into the ring, sends blocks to decoders."""
+
+    seq = 0
+    error = ""
+    try:
+        block, lens, pos = None, [], 0
+        with SourceFile(fpath) as f:
+            for frames, pos in _read_frames(f, decoder, mapped):
+                for msg in frames:
+                    if block is None:
+                        # Blocks if all blocks are in use
+                        block = free.get()
+                    ofs = (block * BLOCK_FRAMES + len(lens)) * FRAME_SLOT_LEN
+                    ring.buf[ofs : ofs + len(msg)] = msg
+                    lens.append(len(msg))
+                    if len(lens) == BLOCK_FRAMES:
+                        work.put((seq, block, lens, pos))
+                        seq += 1
+                        block, lens = None, []
+        if block is not None:
+            work.put((seq, block, lens, pos))
+            seq += 1
+    except KeyboardInterrupt:
+        error = "Processing terminated by the user."
+    except Exception as ex:
+        error = f"{type(ex)}: {ex}"
+    finally:
+        for _ in range(decoders):
+            work.put(None)
+        results.put(("framer", seq, decoder.parse_errors, error))
+
+
+def _run_decoder(
+    decoder: DecoderTop, ring: shared_memory.SharedMemory, free, work, results
+) -> None:
+    """Decoder process. Decodes frames in place, returns blocks to the framer."""
+
+    try:
+        item = work.get()
+        while item is not None:
+            seq, block, lens, pos = item
+            base = block * BLOCK_FRAMES * FRAME_SLOT_LEN
+            xblocks = []
+            for k, length in enumerate(lens):
+                ofs = base + k * FRAME_SLOT_LEN
+                with ring.buf[ofs : ofs + length] as msg:
+                    xblock = decoder.decode(msg)
+                if xblock is not None:
+                    xblocks.append(xblock)
+            results.put(("block", seq, xblocks, len(lens), pos))
+            free.put(block)
+            item = work.get()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        results.put(("decoder", decoder.dec_attempts, decoder.dec_errors))
+
+
+def _check_processes(procs: list) -> None:
+    """Raise exception if any process of the pipeline has gone"""
+    for p in procs:
+        if p.exitcode is not None and p.exitcode != 0:
+            raise RuntimeError(f"Process {p.name} terminated, exit code {p.exitcode}.")
+    if all(p.exitcode is not None for p in procs):
+        raise RuntimeError("Processes finished, but some data were not received.")
+
+
+def decode_rtcm_pipelined(
+    fpath: str, converter: Converter, decoders: int, read_mode: str = "auto"
+) -> ConverterStatistics | None:
+    """Convert single file: frame it in a separate process, decode in 'decoders'
+    processes, print in the calling process. Return conversion statistics or None
+    if conversion failed."""
+
+    assert pipeline_available(), "Shared memory pipeline requires 'fork' start method."
+
+    rv = ConverterStatistics()
+    ring = None
+    procs = []
+    failed = False
+
+    try:
+        with SourceFile(fpath) as f:
+            size = f.size
+            mapped = f.mappable and read_mode != "chunked"
+            logger.info(f"Opened file {fpath}.")
+            if f.compression != "none":
+                logger.info(f"Source file compression: {f.compression}.")
+
+        blocks = RING_BLOCKS_PER_DECODER * decoders
+        ring = shared_memory.SharedMemory(
+            create=True, size=blocks * BLOCK_FRAMES * FRAME_SLOT_LEN
+        )
+        free, work = _CTX.SimpleQueue(), _CTX.SimpleQueue()
+        results = _CTX.Queue()
+        for block in range(blocks):
+            free.put(block)
+
+        decoder = converter.decoder
+        procs.append(
+            _CTX.Process(
+                target=_run_framer,
+                args=(fpath, mapped, decoder, ring, free, work, results, decoders),
+                name="framer",
+                daemon=True,
+            )
+        )
+        for i in range(decoders):
+            procs.append(
+                _CTX.Process(
+                    target=_run_decoder,
+                    args=(decoder, ring, free, work, results),
+                    name=f"decoder-{i}",
+                    daemon=True,
+                )
+            )
+        for p in procs:
+            p.start()
+        logger.info(
+            f"Frames are decoded in {decoders} processes, ring of {blocks} x "
+            + f"{BLOCK_FRAMES} slots."
+        )
+
+        # Reorder buffer: {sequence number: (data blocks, processed bytes)}
+        pending: dict[int, tuple[list, int]] = {}
+        next_seq = 0
+        total = None
+        finished = 0
+        frames = 0
+        while total is None or next_seq < total or finished < decoders:
+            try:
+                item = results.get(timeout=POLL_PERIOD)
+            except queue.Empty:
+                _check_processes(procs)
+                continue
+
+            if item[0] == "block":
+                _, seq, xblocks, count, pos = item
+                pending[seq] = (xblocks, pos)
+                frames += count
+                while next_seq in pending:
+                    xblocks, pos = pending.pop(next_seq)
+                    for xblock in xblocks:
+                        converter.print(xblock)
+                    next_seq += 1
+                    done = f"{pos / size:2.2%}" if size > 0 else f"{pos:d} bytes"
+                    logger.progress(f"{done}, {frames:d} frames.")
+            elif item[0] == "framer":
+                _, total, rv.parsing_errors, error = item
+                if error:
+                    logger.error("Failed to read source file.")
+                    logger.error(error)
+                    failed = True
+            else:
+                rv.decoding_attempts += item[1]
+                rv.decoding_errors += item[2]
+                finished += 1
+
+    except KeyboardInterrupt:
+        logger.error("Processing terminated by the user.")
+        failed = True
+    except OSError as oe:
+        logger.error("Failed to open source file or shared memory.")
+        logger.error(f"{type(oe)}: {oe}")
+        failed = True
+    except Exception as ex:
+        logger.error("Got unexpected exception.")
+        logger.error(f"{type(ex)}: {ex}")
+        failed = True
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+        if ring is not None:
+            ring.close()
+            ring.unlink()
+
+        converter.release()
+        logger.info(f"Closing file {fpath}.")
+
+    if failed:
+        return None
+
+    stat = converter.get_statistics()
+    rv.printing_attempts = stat.printing_attempts
+    rv.printing_errors = stat.printing_errors
+    logger.progress(
+        f"{rv.decoding_attempts:d} messages, prs-dec-prnt errors "
+        + f"{rv.parsing_errors:d}-{rv.decoding_errors:d}-{rv.printing_errors:d}."
+    )
+    return rv
@@ -0,0 +1,19 @@
+from .source_file import SourceFile
+from .source_file import STDIN
+from .source_file import COMPRESSED_EXT
+from .source_file import detect_compression
+from .source_file import strip_compression_ext
+from .reader import InputControls
+from .reader import ReadSizer
+from .reader import ProgressThrottle
+from .stream_client import StreamControls
+from .stream_client import IngestControls
+from .stream_client import StreamEndpoint
+from .stream_client import StreamClient
+from .stream_client import RateCounter
+from .stream_client import NtripError
+from .stream_client import is_stream_url
+from .stream_client import read_chunk
+from .follower import FileFollower
+from .serial_source import SerialSource
+from .serial_source import LatencyHistogram
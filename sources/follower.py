@@ -0,0 +1,120 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    FileFollower() - reads a growing file like 'tail -f'. The file is kept opened at
+    its end, data appended by the writer are returned as they appear. When there are
+    no new data, the file is polled with exponential backoff.
+
+    Rotation (the path refers to another file, e.g. the hourly log was renamed and
+    a new one created) and truncation (the file became shorter than the read
+    position) are detected, reading continues from the beginning of the new
+    content. Data appended to the rotated file before rotation are read first.
+    Truncation followed by growth beyond the read position between two polls
+    can't be detected.
+
+    Regular uncompressed files only.
+"""
+
+# pylint: disable = invalid-name, consider-using-with
+
+import os
+import stat
+import time
+
+from .source_file import detect_compression
+
+
+class FileFollower:
+    """Reads data appended to the file, see module description"""
+
+    def __init__(self, path: str, poll_min: float = 0.1, poll_max: float = 2.0) -> None:
+        """'poll_min', 'poll_max' - range of delays between polls, [s].
+        Raises OSError if the file can't be followed."""
+
+        if detect_compression(path) != "none":
+            raise OSError(f"Compressed file {path} can't be followed.")
+
+        self.path = path
+        self.poll_min = max(0.001, poll_min)
+        self.poll_max = max(self.poll_min, poll_max)
+        self.__f = self.__open()
+        self.__delay = self.poll_min
+        # Read position in the current file, [bytes]
+        self.position: int = 0
+        # Bytes read from all files
+        self.total: int = 0
+        self.rotations: int = 0
+        self.truncations: int = 0
+
+    def __open(self):
+        """Open the file unbuffered: reads return data available so far"""
+
+        f = open(self.path, "rb", buffering=0)
+        if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            f.close()
+            raise OSError(f"{self.path} is not a regular file.")
+        return f
+
+    def read(self, size: int) -> bytes:
+        """Read up to 'size' bytes appended since the previous read.
+        Return empty bytes if there are no new data."""
+
+        data = self.__f.read(size)
+        if data:
+            self.position += len(data)
+            self.total += len(data)
+            self.__delay = self.poll_min
+        return data
+
+    def reopened(self) -> bool:
+        """Check whether the file was rotated or truncated. Call when read() returns
+        no data. Rotated file is replaced by the new one, truncated file is rewound.
+        Return True if reading restarts from the beginning of the new content."""
+
+        own = os.fstat(self.__f.fileno())
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotation in progress: the file is renamed, the new one isn't created
+            return False
+
+        if (st.st_ino, st.st_dev) != (own.st_ino, own.st_dev):
+            # Read the rest of the rotated file first
+            if own.st_size > self.position:
+                return False
+            try:
+                f = self.__open()
+            except FileNotFoundError:
+                return False
+            self.__f.close()
+            self.__f = f
+            self.rotations += 1
+        elif own.st_size < self.position:
+            self.__f.seek(0)
+            self.truncations += 1
+        else:
+            return False
+
+        self.position = 0
+        self.__delay = self.poll_min
+        return True
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Sleep before the next poll. The delay is doubled after each poll without
+        new data up to 'poll_max'. 'timeout' limits the sleep, [s]."""
+
+        delay = self.__delay if timeout is None else min(self.__delay, timeout)
+        if delay > 0:
+            time.sleep(delay)
+        self.__delay = min(self.__delay * 2, self.poll_max)
+
+    def close(self) -> None:
+        """Close the file"""
+        self.__f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
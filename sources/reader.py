@@ -0,0 +1,99 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    There are 3 classes here:
+    1. InputControls() - DTO for control parameters of source files reading.
+    2. ReadSizer() - adapts size of sequential reads to measured throughput.
+    3. ProgressThrottle() - limits frequency of progress records.
+"""
+
+# pylint: disable = invalid-name
+
+import time
+
+
+class InputControls:
+    """Defines some parameters to control reading of source files"""
+
+    __slots__ = (
+        "read_size_min",
+        "read_size_max",
+        "progress_interval",
+        "progress_step",
+        "checkpoint_interval",
+        "follow_poll_min",
+        "follow_poll_max",
+    )
+
+    def __init__(self) -> None:
+        # Range of sizes of sequential reads, [bytes]
+        self.read_size_min: int = 2**16
+        self.read_size_max: int = 2**22
+        # Min. period of progress records, [s]. 0 - no limit.
+        self.progress_interval: float = 1.0
+        # Min. progress between progress records, [%]. 0 - no limit.
+        self.progress_step: float = 0.0
+        # Checkpoints of conversion are saved every N bytes of the source. 0 - never.
+        self.checkpoint_interval: int = 0
+        # Range of delays between polls of the followed file, [s]
+        self.follow_poll_min: float = 0.1
+        self.follow_poll_max: float = 2.0
+
+
+class ReadSizer:
+    """Size of the next read. Chunks are read and converted in about TARGET_PERIOD
+    seconds: size is doubled or halved after each chunk according to measured
+    throughput and kept within [size_min, size_max]."""
+
+    TARGET_PERIOD: float = 0.1
+
+    def __init__(self, size_min: int, size_max: int) -> None:
+        self.size_min = max(1, size_min)
+        self.size_max = max(self.size_min, size_max)
+        self.size = self.size_min
+        self.__t = time.perf_counter()
+
+    def update(self, nbytes: int) -> int:
+        """Account 'nbytes' processed since the previous call. Return size of the
+        next read."""
+
+        now = time.perf_counter()
+        period, self.__t = now - self.__t, now
+        if period <= 0.0 or nbytes <= 0:
+            return self.size
+
+        wanted = nbytes / period * self.TARGET_PERIOD
+        if wanted >= 2 * self.size:
+            self.size = min(self.size * 2, self.size_max)
+        elif wanted < self.size // 2:
+            self.size = max(self.size // 2, self.size_min)
+        return self.size
+
+
+class ProgressThrottle:
+    """Decides whether the progress record is due. Records are emitted not more often
+    than every 'interval' seconds and every 'step' percent. The first and the final
+    (100 %) records are always due."""
+
+    def __init__(self, interval: float = 0.0, step: float = 0.0) -> None:
+        self.interval = interval
+        self.step = step
+        self.__t: float | None = None
+        self.__pct = 0.0
+
+    def due(self, processed: int, size: int) -> bool:
+        """Check whether progress of 'processed' bytes of 'size' shall be logged"""
+
+        now = time.perf_counter()
+        pct = 100.0 * processed / size if size > 0 else 0.0
+        # Size of pipes is unknown, only the period is limited
+        if self.__t is not None and not 0 < size <= processed:
+            if now - self.__t < self.interval:
+                return False
+            if size > 0 and pct - self.__pct < self.step:
+                return False
+
+        self.__t = now
+        self.__pct = pct
+        return True
@@ -0,0 +1,232 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Low latency input of serial ports and pseudo terminals. There are 2 classes here:
+    1. LatencyHistogram() - histogram of latencies with logarithmic buckets.
+    2. SerialSource() - reads tty device in non-blocking mode and hands each decoded
+       message to the user as soon as its CRC passes:
+       - run(callback) calls 'callback' with each decoded message;
+       - 'async for msg in source.messages()' yields decoded messages.
+       Latency is measured from arrival of the last byte of the message (return of
+       the read call) to the callback or yield.
+
+    Tty devices are switched to raw mode: no line editing, echo or translation of
+    bytes. Baud rate is set if given. Requires POSIX (termios).
+"""
+
+# pylint: disable = invalid-name
+
+import os
+import time
+import errno
+import bisect
+import asyncio
+import selectors
+from typing import Callable, AsyncIterator
+
+try:
+    import termios
+    import tty
+except ImportError:
+    termios = None
+    tty = None
+
+from decoder_top import DecoderTop
+
+
+class LatencyHistogram:
+    """Histogram of latencies. Buckets are bounded by BOUNDS_MS, the last bucket
+    holds latencies above the last bound."""
+
+    BOUNDS_MS: tuple[float, ...] = (
+        0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 500.0, 1000.0
+    )
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total: int = 0
+        self.sum_ms: float = 0.0
+        self.max_ms: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Account latency"""
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    @property
+    def mean_ms(self) -> float:
+        """Mean latency, [ms]"""
+        return self.sum_ms / self.total if self.total else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding 'pct' percentile, [ms].
+        Maximal latency for the last bucket."""
+
+        rank = pct / 100.0 * self.total
+        acc = 0
+        for i, n in enumerate(self.counts):
+            acc += n
+            if n and acc >= rank:
+                return self.BOUNDS_MS[i] if i < len(self.BOUNDS_MS) else self.max_ms
+        return 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.total:d} messages, latency mean {self.mean_ms:.3f} ms, "
+            + f"p50 <= {self.percentile(50):g} ms, p99 <= {self.percentile(99):g} ms, "
+            + f"max {self.max_ms:.3f} ms."
+        )
+
+    def table(self) -> str:
+        """Histogram as text table"""
+        rows, lo = [], 0.0
+        for i, n in enumerate(self.counts):
+            hi = f"{self.BOUNDS_MS[i]:g}" if i < len(self.BOUNDS_MS) else "inf"
+            rows.append(f"{lo:>8g} .. {hi:>6} ms {n:10d}")
+            lo = self.BOUNDS_MS[min(i, len(self.BOUNDS_MS) - 1)]
+        return "\n".join(rows)
+
+
+class SerialSource:
+    """Reads RTCM messages of serial port or pseudo terminal, see module description"""
+
+    READ_SIZE: int = 2**12
+
+    def __init__(
+        self, path: str, decoder: DecoderTop, baudrate: int | None = None
+    ) -> None:
+        """'path' - tty device, e.g. /dev/ttyUSB0 or os.ttyname() of a pty.
+        'decoder' - DecoderTop with registered sub-decoders, see
+        rtcm_api.make_decoder(). Its framer state belongs to the source.
+        Raises OSError if the device can't be opened, ValueError if baud rate
+        is not supported."""
+
+        if termios is None:
+            raise OSError("Serial ports require POSIX termios.")
+        self.path = path
+        self.decoder = decoder
+        self.latency = LatencyHistogram()
+        self.bytes: int = 0
+        self.decoded: int = 0
+        self.__fd = os.open(path, os.O_RDONLY | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            if os.isatty(self.__fd):
+                self.__setup_tty(baudrate)
+        except (OSError, ValueError, termios.error):
+            os.close(self.__fd)
+            raise
+        self.__eof = False
+        self.__stop = False
+
+    def __setup_tty(self, baudrate: int | None) -> None:
+        """Switch tty to raw mode, set baud rate"""
+
+        tty.setraw(self.__fd, termios.TCSANOW)
+        if baudrate is not None:
+            speed = getattr(termios, f"B{baudrate}", None)
+            if speed is None:
+                raise ValueError(f"Baud rate {baudrate} is not supported.")
+            attrs = termios.tcgetattr(self.__fd)
+            attrs[4] = attrs[5] = speed
+            termios.tcsetattr(self.__fd, termios.TCSANOW, attrs)
+
+    def fileno(self) -> int:
+        """Descriptor of the device"""
+        return self.__fd
+
+    @property
+    def eof(self) -> bool:
+        """The other side of pty is closed or the device is gone"""
+        return self.__eof
+
+    def close(self) -> None:
+        """Close the device"""
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+    def stop(self) -> None:
+        """Stop run() or messages() after the current read"""
+        self.__stop = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __read(self) -> tuple[bytes, float]:
+        """Read all available bytes. Return data and time of arrival."""
+
+        chunks = []
+        while True:
+            try:
+                data = os.read(self.__fd, self.READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError as oe:
+                # Linux reports closed other side of pty by EIO
+                if oe.errno != errno.EIO:
+                    raise
+                self.__eof = True
+                break
+            if not data:
+                self.__eof = True
+                break
+            chunks.append(data)
+        self.bytes += sum(map(len, chunks))
+        return b"".join(chunks), time.perf_counter()
+
+    def __decode(self, data: bytes, t: float):
+        """Extract messages, decode them one by one. Yield decoded messages, account
+        latency of handing over since 't'."""
+
+        for msg in self.decoder.catch_message(data):
+            xblock = self.decoder.decode(msg)
+            if xblock is not None:
+                self.latency.add(time.perf_counter() - t)
+                self.decoded += 1
+                yield xblock
+
+    def run(
+        self,
+        callback: Callable[[object], None],
+        duration: float | None = None,
+    ) -> None:
+        """Call 'callback' with each decoded message until EOF, stop() or
+        'duration' seconds"""
+
+        deadline = None if duration is None else time.monotonic() + duration
+        self.__stop = False
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.__fd, selectors.EVENT_READ)
+            while not (self.__eof or self.__stop):
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                if not sel.select(timeout):
+                    continue
+                for xblock in self.__decode(*self.__read()):
+                    callback(xblock)
+
+    async def messages(self) -> AsyncIterator[object]:
+        """Yield decoded messages until EOF or stop()"""
+
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        loop.add_reader(self.__fd, ready.set)
+        self.__stop = False
+        try:
+            while not (self.__eof or self.__stop):
+                await ready.wait()
+                ready.clear()
+                for xblock in self.__decode(*self.__read()):
+                    yield xblock
+        finally:
+            loop.remove_reader(self.__fd)
@@ -0,0 +1,195 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    SourceFile() - read-only access to RTCM source file. Compressed files
+    (gzip, bzip2, xz, zstd) are decompressed on the fly, chunk by chunk, nothing is
+    written to disk. Compression is detected by magic bytes, then by file extension.
+    Multi-member gzip files, multi-stream xz/bz2 files and multi-frame zstd files
+    are read as a whole.
+
+    Progress of reading is measured in bytes consumed from the file on disk
+    (compressed bytes), see SourceFile.size and SourceFile.consumed.
+
+    Regular uncompressed files may be memory mapped, see SourceFile.map(). Pipes,
+    character devices and compressed files are read sequentially.
+
+    Path STDIN ('-') stands for the standard input. Streams (pipes, sockets, serial
+    ports) shall be read by SourceFile.read1() which returns data as soon as they
+    arrive.
+"""
+
+# pylint: disable = invalid-name, consider-using-with
+
+import os
+import io
+import sys
+import bz2
+import mmap
+import stat
+import gzip
+import lzma
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Path of the standard input
+STDIN = "-"
+
+# Extensions of compressed files and compression methods
+COMPRESSED_EXT = {".gz": "gz", ".bz2": "bz2", ".xz": "xz", ".zst": "zst"}
+
+# Magic bytes of compressed streams
+_MAGIC = (
+    (b"\x1f\x8b", "gz"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zst"),
+)
+
+
+def detect_compression(path: str) -> str:
+    """Detect compression method of the file: none | gz | bz2 | xz | zst.
+    Raises OSError if file can't be read."""
+
+    with open(path, "rb") as f:
+        return _detect(f.read(6), path)
+
+
+def _detect(head: bytes, path: str) -> str:
+    """Detect compression method by the first bytes of the file and file name"""
+
+    for magic, method in _MAGIC:
+        if head.startswith(magic):
+            return method
+
+    # Empty or truncated file. Rely on extension.
+    if len(head) < 6:
+        _, ext = os.path.splitext(path)
+        return COMPRESSED_EXT.get(ext.lower(), "none")
+
+    return "none"
+
+
+def strip_compression_ext(path: str) -> str:
+    """Remove extension of compressed file: 'a.rtcm3.gz' -> 'a.rtcm3'"""
+    name, ext = os.path.splitext(path)
+    return name if ext.lower() in COMPRESSED_EXT else path
+
+
+class SourceFile:
+    """Reads RTCM source file, decompresses data if required.
+    Use as a context manager or call close()."""
+
+    def __init__(self, path: str) -> None:
+
+        self.path = path
+        if path == STDIN:
+            self.__raw = open(sys.stdin.fileno(), "rb", closefd=False)
+        else:
+            self.__raw = open(path, "rb")
+        # Number of bytes returned by read(), read1() or skipped
+        self.__nread = 0
+        try:
+            st = os.fstat(self.__raw.fileno())
+            # Size of the file on disk, 0 for pipes
+            self.size = st.st_size
+            self.regular = stat.S_ISREG(st.st_mode)
+            # Peek doesn't consume data, so pipes can be checked as well.
+            # Peek of a pipe may return less than 6 bytes, extension is used then.
+            self.compression = _detect(self.__raw.peek(6)[:6], path)
+            self.__stream = self.__make_stream(self.__raw, self.compression)
+        except Exception:
+            self.__raw.close()
+            raise
+
+    @staticmethod
+    def __make_stream(raw: io.BufferedReader, method: str):
+        """Wrap raw file into decompressing reader"""
+
+        if method == "gz":
+            return gzip.GzipFile(fileobj=raw, mode="rb")
+        if method == "bz2":
+            return bz2.BZ2File(raw, "rb")
+        if method == "xz":
+            return lzma.LZMAFile(raw, "rb")
+        if method == "zst":
+            if zstandard is None:
+                raise OSError("Package 'zstandard' not installed.")
+            dctx = zstandard.ZstdDecompressor()
+            return dctx.stream_reader(raw, read_across_frames=True, closefd=False)
+        return raw
+
+    @property
+    def mappable(self) -> bool:
+        """Check whether the file can be memory mapped"""
+        return self.regular and self.compression == "none" and self.size > 0
+
+    def map(self) -> mmap.mmap:
+        """Map the whole file read-only. Use if 'mappable' only.
+        Raises OSError, ValueError if file can't be mapped."""
+        return mmap.mmap(self.__raw.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def stream(self) -> bool:
+        """Check whether the source is a stream: pipe, socket, character device"""
+        return not self.regular
+
+    @property
+    def consumed(self) -> int:
+        """Number of bytes consumed from the file on disk. For streams - number of
+        (decompressed) bytes read."""
+        return self.__raw.tell() if self.regular else self.__nread
+
+    @property
+    def position(self) -> int:
+        """Number of (decompressed) bytes read or skipped"""
+        return self.__nread
+
+    def skip(self, nbytes: int) -> None:
+        """Skip 'nbytes' of (decompressed) data, e.g. to continue interrupted
+        conversion. Regular uncompressed files are positioned, others are read.
+        Raises EOFError if the source is shorter."""
+
+        if self.__stream is self.__raw and self.regular:
+            if self.__raw.tell() + nbytes > self.size:
+                raise EOFError(f"Can't skip {nbytes} bytes, source is shorter.")
+            self.__raw.seek(nbytes, os.SEEK_CUR)
+        else:
+            left = nbytes
+            while left > 0:
+                data = self.__stream.read(min(left, 2**20))
+                if not data:
+                    raise EOFError(f"Can't skip {nbytes} bytes, source is shorter.")
+                left -= len(data)
+        self.__nread += nbytes
+
+    def read(self, size: int) -> bytes:
+        """Read up to 'size' bytes of (decompressed) data. Empty bytes at the end.
+        Raises OSError, EOFError, lzma.LZMAError... if the file is corrupted."""
+        data = self.__stream.read(size)
+        self.__nread += len(data)
+        return data
+
+    def read1(self, size: int) -> bytes:
+        """Read up to 'size' bytes of (decompressed) data with at most one read of
+        the underlying file. Waits for the data only if nothing is buffered, so the
+        stream is not waited for until 'size' bytes arrive. Empty bytes at the end."""
+        data = self.__stream.read1(size)
+        self.__nread += len(data)
+        return data
+
+    def close(self) -> None:
+        """Close the file. The standard input is left opened."""
+        if self.__stream is not self.__raw:
+            self.__stream.close()
+        self.__raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
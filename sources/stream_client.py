@@ -0,0 +1,345 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Asyncio client of RTCM network streams. There are 5 classes here:
+    1. StreamControls() - DTO for control parameters of network streams.
+       IngestControls() - DTO for control parameters of multi-stream ingest server.
+    2. StreamEndpoint() - address of the stream, parsed from URL:
+       ntrip://[user:password@]host[:port]/MOUNT - NTRIP v1 mountpoint;
+       ntrip2://[user:password@]host[:port]/MOUNT - NTRIP v2 mountpoint (HTTP/1.1);
+       tcp://host:port - raw TCP stream.
+       Default port of NTRIP casters is 2101.
+    3. RateCounter() - total count and rate over the last period.
+    4. StreamClient() - connects to the endpoint and passes received bytes to the
+       consumer as they arrive. Reconnects with exponential backoff when connection
+       fails or is closed, and when no data are received for 'idle_timeout' seconds.
+"""
+
+# pylint: disable = invalid-name
+
+import time
+import base64
+import asyncio
+from typing import Callable
+from urllib.parse import urlsplit, unquote
+
+from logger import LOGGER_CF as logger
+
+
+# Schemes of stream URLs: {scheme: NTRIP version, 0 - raw TCP}
+STREAM_SCHEMES = {"ntrip": 1, "ntrip2": 2, "tcp": 0}
+NTRIP_PORT: int = 2101
+
+
+def is_stream_url(path: str) -> bool:
+    """Check whether the source is a network stream URL"""
+    scheme, sep, _ = path.partition("://")
+    return bool(sep) and scheme.lower() in STREAM_SCHEMES
+
+
+async def read_chunk(reader: asyncio.StreamReader) -> bytes:
+    """Read chunk of HTTP chunked transfer encoding. Empty bytes at the end.
+    Raises ConnectionError, asyncio.IncompleteReadError if the stream is broken."""
+
+    line = await reader.readline()
+    if not line:
+        return b""
+    try:
+        size = int(line.split(b";")[0].strip(), 16)
+    except ValueError as ve:
+        raise ConnectionError(f"Bad chunk size {line[:16]!r}") from ve
+    if size == 0:
+        return b""
+    data = await reader.readexactly(size + 2)
+    return data[:-2]
+
+
+class NtripError(ConnectionError):
+    """Caster refused the request: unknown mountpoint, authorization failure..."""
+
+
+class StreamControls:
+    """Defines some parameters to control reading of network streams"""
+
+    __slots__ = ("reconnect_min", "reconnect_max", "idle_timeout", "max_retries")
+
+    def __init__(self) -> None:
+        # Delay before reconnection, [s]. Doubled after each failed attempt
+        # up to 'reconnect_max', reset when data are received.
+        self.reconnect_min: float = 1.0
+        self.reconnect_max: float = 60.0
+        # Reconnect if no data received for 'idle_timeout' seconds. 0 - never.
+        self.idle_timeout: float = 30.0
+        # Give up after 'max_retries' failed attempts in a row. Negative - never.
+        self.max_retries: int = -1
+
+
+class IngestControls:
+    """Defines some parameters to control multi-stream ingest server"""
+
+    __slots__ = (
+        "batch_frames",
+        "batch_delay",
+        "max_pending_frames",
+        "max_open_files",
+        "password",
+        "stats_interval",
+    )
+
+    def __init__(self) -> None:
+        # Frames of all streams are decoded in batches of up to 'batch_frames'
+        # frames, collected for not longer than 'batch_delay' seconds.
+        self.batch_frames: int = 256
+        self.batch_delay: float = 0.01
+        # Reading of a stream is paused while it has 'max_pending_frames' frames
+        # waiting for decoding.
+        self.max_pending_frames: int = 1024
+        # Max. number of simultaneously opened output files of each stream
+        self.max_open_files: int = 2
+        # Password of sources. Empty - any password is accepted.
+        self.password: str = ""
+        # Period of statistics records, [s]
+        self.stats_interval: float = 10.0
+
+
+class StreamEndpoint:
+    """Address of network stream"""
+
+    __slots__ = ("url", "version", "host", "port", "mount", "user", "password")
+
+    def __init__(self, url: str) -> None:
+        """Parse stream URL. Raises ValueError if URL is not valid."""
+
+        parts = urlsplit(url)
+        if parts.scheme.lower() not in STREAM_SCHEMES:
+            raise ValueError(f"Unknown stream scheme in {url}")
+
+        self.url = url
+        # NTRIP version, 0 - raw TCP stream
+        self.version: int = STREAM_SCHEMES[parts.scheme.lower()]
+        self.host: str = parts.hostname or ""
+        self.port: int = parts.port or (NTRIP_PORT if self.version else 0)
+        self.mount: str = unquote(parts.path.strip("/"))
+        self.user: str = unquote(parts.username or "")
+        self.password: str = unquote(parts.password or "")
+
+        if not self.host or not self.port:
+            raise ValueError(f"Host and port are required in {url}")
+        if self.version and not self.mount:
+            raise ValueError(f"Mountpoint is required in {url}")
+
+    @property
+    def name(self) -> str:
+        """Name of the stream products: mountpoint or host and port"""
+        if self.mount:
+            return self.mount.replace("/", "_")
+        return f"{self.host}-{self.port}".replace(".", "_")
+
+    def __str__(self) -> str:
+        kind = f"NTRIP v{self.version}" if self.version else "TCP"
+        mount = f"/{self.mount}" if self.mount else ""
+        return f"{kind} {self.host}:{self.port}{mount}"
+
+    def make_request(self, agent: str) -> bytes:
+        """Make NTRIP request of the mountpoint"""
+
+        lines = []
+        if self.version == 1:
+            lines.append(f"GET /{self.mount} HTTP/1.0")
+        else:
+            lines.append(f"GET /{self.mount} HTTP/1.1")
+            lines.append(f"Host: {self.host}:{self.port}")
+            lines.append("Ntrip-Version: Ntrip/2.0")
+        lines.append(f"User-Agent: NTRIP {agent}")
+        if self.user:
+            token = base64.b64encode(f"{self.user}:{self.password}".encode()).decode()
+            lines.append(f"Authorization: Basic {token}")
+        lines.append("Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+class RateCounter:
+    """Total count and its rate over the last 'period' seconds"""
+
+    def __init__(self, period: float = 1.0) -> None:
+        self.period = period
+        self.total: int = 0
+        self.__t0 = time.perf_counter()
+        self.__n0 = 0
+        self.__rate = 0.0
+
+    def add(self, n: int) -> None:
+        """Account 'n' items"""
+        self.total += n
+        now = time.perf_counter()
+        if now - self.__t0 >= self.period:
+            self.__rate = (self.total - self.__n0) / (now - self.__t0)
+            self.__t0, self.__n0 = now, self.total
+
+    @property
+    def rate(self) -> float:
+        """Rate over the last period, [1/s]. Goes down if nothing is counted."""
+        now = time.perf_counter()
+        if now - self.__t0 >= self.period:
+            return (self.total - self.__n0) / (now - self.__t0)
+        return self.__rate
+
+
+class StreamClient:
+    """Reads network stream, passes data to 'consumer'. The consumer gets received
+    bytes and returns the number of extracted messages."""
+
+    USER_AGENT = "rtcm3-converter"
+    READ_SIZE: int = 2**16
+
+    def __init__(
+        self,
+        endpoint: StreamEndpoint,
+        consumer: Callable[[bytes], int],
+        ctrl: StreamControls | None = None,
+    ) -> None:
+        self.endpoint = endpoint
+        self.consumer = consumer
+        self.ctrl = ctrl if ctrl is not None else StreamControls()
+        self.bytes = RateCounter()
+        self.messages = RateCounter()
+        # Successful connections, read-idle watchdog timeouts
+        self.connects: int = 0
+        self.idle_timeouts: int = 0
+        self.__stop: asyncio.Event | None = None
+
+    def stop(self) -> None:
+        """Stop the client. Call from the event loop of the client."""
+        if self.__stop is not None:
+            self.__stop.set()
+
+    @property
+    def summary(self) -> str:
+        """Statistics of the stream"""
+        return (
+            f"{self.bytes.total:d} bytes ({self.bytes.rate / 1024:.1f} kB/s), "
+            + f"{self.messages.total:d} messages ({self.messages.rate:.1f} msg/s), "
+            + f"{self.connects:d} connections, {self.idle_timeouts:d} idle timeouts."
+        )
+
+    async def run(self, duration: float | None = None) -> None:
+        """Read the stream until stop(), 'duration' seconds or 'max_retries'
+        failed attempts in a row."""
+
+        self.__stop = asyncio.Event()
+        deadline = None if duration is None else time.monotonic() + duration
+        retries = 0
+        while not self.__stop.is_set():
+            received = self.bytes.total
+            session = asyncio.ensure_future(self.__session())
+            stop = asyncio.ensure_future(self.__stop.wait())
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait(
+                    (session, stop), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                for task in (session, stop):
+                    task.cancel()
+                await asyncio.gather(session, stop, return_exceptions=True)
+
+            if session.done() and not session.cancelled() and session.exception():
+                ex = session.exception()
+                # Errors of the consumer are not stream failures
+                if not isinstance(ex, (OSError, EOFError)):
+                    raise ex
+                logger.warning(f"Stream {self.endpoint}: {type(ex).__name__}: {ex}")
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            if self.__stop.is_set():
+                break
+
+            # Data received - the connection was good, restart backoff
+            retries = 0 if self.bytes.total > received else retries + 1
+            if 0 <= self.ctrl.max_retries < retries:
+                logger.error(f"Stream {self.endpoint}: gave up after {retries} attempts.")
+                break
+
+            delay = min(
+                self.ctrl.reconnect_max, self.ctrl.reconnect_min * 2 ** max(0, retries - 1)
+            )
+            logger.info(f"Stream {self.endpoint}: reconnect in {delay:.1f} s.")
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            try:
+                await asyncio.wait_for(self.__stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+        self.__stop = None
+
+    async def __read(self, coro):
+        """Await read operation, raise TimeoutError if the stream is idle"""
+        idle = self.ctrl.idle_timeout
+        try:
+            return await asyncio.wait_for(coro, idle if idle > 0 else None)
+        except asyncio.TimeoutError:
+            self.idle_timeouts += 1
+            raise TimeoutError(f"No data for {idle} s.") from None
+
+    async def __session(self) -> None:
+        """Connect, request the mountpoint and read the stream until EOF"""
+
+        ep = self.endpoint
+        idle = self.ctrl.idle_timeout
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(ep.host, ep.port), idle if idle > 0 else None
+        )
+        try:
+            chunked = False
+            if ep.version:
+                writer.write(ep.make_request(self.USER_AGENT))
+                await writer.drain()
+                chunked = await self.__read_response(reader)
+
+            self.connects += 1
+            logger.info(f"Stream {ep}: connected.")
+
+            while True:
+                if chunked:
+                    data = await self.__read(read_chunk(reader))
+                else:
+                    data = await self.__read(reader.read(self.READ_SIZE))
+                if not data:
+                    raise ConnectionError("Connection closed by the server.")
+                self.bytes.add(len(data))
+                self.messages.add(self.consumer(data))
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, asyncio.CancelledError):
+                pass
+
+    async def __read_response(self, reader: asyncio.StreamReader) -> bool:
+        """Check response of the caster. Return True if the stream is chunked.
+        Raises NtripError if the caster refused the request."""
+
+        status = (await self.__read(reader.readline())).decode(errors="replace").strip()
+        if status.startswith("ICY 200"):
+            return False
+        if status.startswith("SOURCETABLE"):
+            raise NtripError(f"Mountpoint '{self.endpoint.mount}' not found.")
+        if not (status.startswith("HTTP/1.") and status[9:12] == "200"):
+            raise NtripError(f"Request refused: {status}")
+
+        chunked = False
+        line = await self.__read(reader.readline())
+        while line.strip():
+            key, _, value = line.decode(errors="replace").partition(":")
+            key, value = key.strip().lower(), value.strip().lower()
+            if key == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif key == "content-type" and "sourcetable" in value:
+                raise NtripError(f"Mountpoint '{self.endpoint.mount}' not found.")
+            line = await self.__read(reader.readline())
+        return chunked
+
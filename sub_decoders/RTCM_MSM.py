@@ -374,10 +374,8 @@ class Bare2Scaled:
         "dpl": MSMT.isDF404_OK,
     }
 
-    def __init__(self) -> None:
-        self.sgn_map: tuple[str, ...] = (str(),)
-        self.slots_per_sat: tuple[int, ...] = (int(),)
-        self.sat_list: tuple[int, ...] = (int(),)
+    # No instance state: all intermediate data are local to the convert() call,
+    # so one instance may be used by several threads.
 
     def convert(
         self, src: BareObservablesMSM4567 | BareObservablesMSM123 | None
@@ -416,35 +414,42 @@ class Bare2Scaled:
             return rv
 
         # Make list of satellites
-        self.sat_list = tuple(
+        sat_list = tuple(
             (i + 1 for i in range(0, 64) if (src.hdr.sat_mask & (1 << i)))
         )
-        sat_num = len(self.sat_list)
-        rv.hdr.sats = self.sat_list
+        sat_num = len(sat_list)
+        rv.hdr.sats = sat_list
         # Make list of signals
-        self.sgn_map = (  # type: ignore
-            (i + 1 for i in range(0, 32) if (src.hdr.sgn_mask & (1 << i)))
-        )
-        self.sgn_map = tuple(  # type: ignore
-            MSMT.rnx_lit(src.atr.gnss, s) for s in self.sgn_map  # type: ignore
+        sgn_map = tuple(
+            MSMT.rnx_lit(src.atr.gnss, i + 1)
+            for i in range(0, 32)
+            if (src.hdr.sgn_mask & (1 << i))
         )
-        rv.hdr.signals = {s: MSMT.crr_frq(src.atr.gnss, s) for s in self.sgn_map}
+        rv.hdr.signals = {s: MSMT.crr_frq(src.atr.gnss, s) for s in sgn_map}
 
         # Calc. number of frequency bins per sat.
         M = src.hdr.sgn_mask.bit_count()
         mask = (1 << M) - 1
-        self.slots_per_sat = tuple(
+        slots_per_sat = tuple(
             (((src.hdr.cell_mask >> M * i) & mask) for i in range(0, sat_num))
         )
 
+        cells = (sat_list, sgn_map, slots_per_sat)
         if isinstance(src, BareObservablesMSM4567):
-            self._convert_obs47(src, rv)
+            self._convert_obs47(src, rv, *cells)
         else:
-            self._convert_obs13(src, rv)
+            self._convert_obs13(src, rv, *cells)
 
         return rv
 
-    def _convert_obs47(self, src: BareObservablesMSM4567, rv: ObservablesMSM) -> None:
+    def _convert_obs47(
+        self,
+        src: BareObservablesMSM4567,
+        rv: ObservablesMSM,
+        sat_list: tuple[int, ...],
+        sgn_map: tuple[str, ...],
+        slots_per_sat: tuple[int, ...],
+    ) -> None:
 
         # Choose scalers (fine/coarse resolution)
         if src.atr.is_msm7 or src.atr.is_msm6:
@@ -456,7 +461,7 @@ class Bare2Scaled:
 
         # Create frequency slots in output structure
         # Add empty dictionary for each frequency slot
-        for sgn in self.sgn_map:
+        for sgn in sgn_map:
             rv.obs.rng.update({sgn: {}})
             rv.obs.c2n.update({sgn: {}})
             rv.obs.dpl.update({sgn: {}})
@@ -470,9 +475,9 @@ class Bare2Scaled:
         # Here 'sat_idx' and 'sgn_idx' are indexes in the lists of observables
         sat_idx, sgn_idx = 0, 0
         # Pass through satellites in the list
-        for slots in self.slots_per_sat:
+        for slots in slots_per_sat:
             # sat - satellite number
-            sat = self.sat_list[sat_idx]
+            sat = sat_list[sat_idx]
 
             rng = 0.0  # to avoid pylance warnings
             phase_rate = 0.0  # to avoid pylance warnings
@@ -507,7 +512,7 @@ class Bare2Scaled:
             while slots:
 
                 # sgn - RINEX literal - code of signal
-                sgn = self.sgn_map[i]
+                sgn = sgn_map[i]
                 i += 1
                 slotExist = slots & 0x01
                 slots = slots >> 1
@@ -568,7 +573,7 @@ class Bare2Scaled:
             sat_idx += 1
 
         # Delete empty frequency slots.
-        for sgn in self.sgn_map:
+        for sgn in sgn_map:
             if 0 == len(rv.obs.dpl[sgn]):
                 del rv.obs.dpl[sgn]
             if 0 == len(rv.obs.rng[sgn]):
@@ -582,13 +587,20 @@ class Bare2Scaled:
             if 0 == len(rv.obs.hca[sgn]):
                 del rv.obs.hca[sgn]
 
-    def _convert_obs13(self, src: BareObservablesMSM123, rv: ObservablesMSM) -> None:
+    def _convert_obs13(
+        self,
+        src: BareObservablesMSM123,
+        rv: ObservablesMSM,
+        sat_list: tuple[int, ...],
+        sgn_map: tuple[str, ...],
+        slots_per_sat: tuple[int, ...],
+    ) -> None:
 
         scalers = self.__SCALERS45
 
         # Create frequency slots in output structure
         # Add empty dictionary for each frequency slot
-        for sgn in self.sgn_map:
+        for sgn in sgn_map:
             rv.obs.rng.update({sgn: {}})
             rv.obs.phs.update({sgn: {}})
             rv.obs.ltm.update({sgn: {}})
@@ -600,9 +612,9 @@ class Bare2Scaled:
         # Here 'sat_idx' and 'sgn_idx' are indexes in the lists of observables
         sat_idx, sgn_idx = 0, 0
         # Pass through satellites in the list
-        for slots in self.slots_per_sat:
+        for slots in slots_per_sat:
             # sat - satellite number
-            sat = self.sat_list[sat_idx]
+            sat = sat_list[sat_idx]
 
             rng = float(src.sat.rng_rough[sat_idx]) / 1024.0
             rng_ok = src.atr.is_msm1 or src.atr.is_msm3
@@ -613,7 +625,7 @@ class Bare2Scaled:
             while slots:
 
                 # sgn - RINEX literal - code of signal
-                sgn = self.sgn_map[i]
+                sgn = sgn_map[i]
                 i += 1
                 slotExist = slots & 0x01
                 slots = slots >> 1
@@ -658,7 +670,7 @@ class Bare2Scaled:
             sat_idx += 1
 
         # Delete empty frequency slots.
-        for sgn in self.sgn_map:
+        for sgn in sgn_map:
             if 0 == len(rv.obs.rng[sgn]):
                 del rv.obs.rng[sgn]
             if 0 == len(rv.obs.phs[sgn]):
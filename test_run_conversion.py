@@ -8,7 +8,18 @@
 from run_conversion import main as convert  # pylint: disable = unused-import
 from tests.base_data_test_samples import test_base_message
 from tests.ephemeris_test_samples import test_eph_message
-from tests.msm_test_samples import test_msm_message
+from tests.msm_test_samples import test_msm_message, msm_batch_test
+from tests.table_test_samples import table_test
+from tests.shard_test_samples import shard_test, manifest_test
+from tests.stream_test_samples import stream_test
+from tests.ingest_test_samples import ingest_test
+from tests.serial_test_samples import serial_test
+from tests.api_test_samples import api_test
+from tests.resume_test_samples import resume_test
+from tests.follow_test_samples import follow_test
+from tests.index_test_samples import index_test
+from tests.serializer_test_samples import serializer_test
+from tests.writer_test_samples import writer_test
 
 # ARGS = r"-o JSON RTCM3_TEST_DATA/EPH/msg1045.rtcm3"
 # ARGS = r"-o JSON-B RTCM3_TEST_DATA/EPH/msg1019.rtcm3"
@@ -39,6 +50,9 @@ def test_eph_messages() -> bool:
     summary.append(test_eph_message(1042, "JSON-B"))
     summary.append(test_eph_message(1045, "JSON-B"))
     summary.append(test_eph_message(1046, "JSON-B"))
+    summary.append(test_eph_message(1019, "JSONL"))
+    summary.append(test_eph_message(1020, "JSONL"))
+    summary.append(test_eph_message(1046, "JSONL-B"))
 
     print("-" * 80)
     result = "FAILED" if False in summary else "SUCCEED"
@@ -66,6 +80,8 @@ def test_base_messages() -> bool:
     summary.append(test_base_message(1029, "JSON-B"))
     summary.append(test_base_message(1033, "JSON-B"))
     summary.append(test_base_message(1230, "JSON-B"))
+    summary.append(test_base_message(1033, "JSONL"))
+    summary.append(test_base_message(1230, "JSONL-B"))
     # No data for 1013.
     # No data for 1008. But 1007 and 1033 work fine. Msg 1008 is OK 99%.
 
@@ -94,6 +110,50 @@ def test_msm_messages() -> bool:
     summary.append(test_msm_message(1095, "MARGO"))
     summary.append(test_msm_message(1125, "MARGO"))
 
+    print("Start MSM-to-MARGO test procedure with a small pool of output files.")
+
+    summary.append(test_msm_message(1075, "MARGO-LRU"))
+    summary.append(test_msm_message(1085, "MARGO-LRU"))
+
+    print("Start MSM-to-MARGO test procedure with the writer thread.")
+
+    summary.append(test_msm_message(1077, "MARGO-WT"))
+    summary.append(test_msm_message(1085, "MARGO-WT"))
+
+    print("Start MSM-to-MARGO test procedure with compressed output files.")
+
+    summary.append(test_msm_message(1077, "MARGO-GZ"))
+    summary.append(test_msm_message(1085, "MARGO-GZ"))
+
+    print("Start MSM-to-MARGO test procedure with compressed source files.")
+
+    summary.append(test_msm_message(1077, "MARGO-SRC"))
+    summary.append(test_msm_message(1125, "MARGO-SRC"))
+
+    print("Start MSM-to-MARGO test procedure with decoding in threads.")
+
+    summary.append(test_msm_message(1077, "MARGO-MT"))
+    summary.append(test_msm_message(1125, "MARGO-MT"))
+
+    print("Start MSM-to-MARGO test procedure with shared memory pipeline.")
+
+    summary.append(test_msm_message(1087, "MARGO-SHM"))
+    summary.append(test_msm_message(1095, "MARGO-SHM"))
+
+    print("Start MSM-to-MARGO test procedure with adaptive read size.")
+
+    summary.append(test_msm_message(1097, "MARGO-RS"))
+    summary.append(test_msm_message(1137, "MARGO-RS"))
+
+    print("Start MSM-to-MARGO test procedure with the standard input.")
+
+    summary.append(test_msm_message(1077, "MARGO-STDIN"))
+    summary.append(test_msm_message(1085, "MARGO-STDIN"))
+
+    print("Start MSM-to-MARGO batch conversion test procedure.")
+
+    summary.append(msm_batch_test([1077, 1087, 1097, 1075, 1085], 3))
+
     print("Start MSM-to-JSON test procedure.")
 
     summary.append(test_msm_message(1077, "JSON"))
@@ -107,6 +167,28 @@ def test_msm_messages() -> bool:
     summary.append(test_msm_message(1095, "JSON"))
     summary.append(test_msm_message(1125, "JSON"))
 
+    print("Start MSM-to-NPY test procedure.")
+
+    summary.append(test_msm_message(1077, "NPY"))
+    summary.append(test_msm_message(1087, "NPY"))
+    summary.append(test_msm_message(1075, "NPY"))
+    summary.append(test_msm_message(1085, "NPY"))
+
+    print("Start MSM-to-RINEX test procedure.")
+
+    summary.append(test_msm_message(1077, "RINEX"))
+    summary.append(test_msm_message(1087, "RINEX"))
+    summary.append(test_msm_message(1127, "RINEX"))
+    summary.append(test_msm_message(1075, "RINEX"))
+    summary.append(test_msm_message(1085, "RINEX"))
+    summary.append(test_msm_message(1077, "RINEX-WEEK"))
+    summary.append(test_msm_message(1085, "RINEX-GLO7"))
+
+    print("Start MSM-to-JSONL test procedure.")
+
+    summary.append(test_msm_message(1077, "JSONL"))
+    summary.append(test_msm_message(1085, "JSONL"))
+
     print("-" * 80)
     result = "FAILED" if False in summary else "SUCCEED"
     print(f"End MSM conversion test procedure. Final result: {result}")
@@ -114,6 +196,218 @@ def test_msm_messages() -> bool:
     return result == "SUCCEED"
 
 
+def test_table_formats() -> bool:
+    """Run conversion into tabular formats"""
+
+    summary = []
+
+    print("Start tabular formats test procedure.")
+
+    summary.append(table_test("MSM7", "PARQUET"))
+    summary.append(table_test("MSM5", "PARQUET"))
+    summary.append(table_test("EPH", "PARQUET"))
+    summary.append(table_test("BASE", "PARQUET"))
+    summary.append(table_test("BASE", "PARQUET-FAIL"))
+    summary.append(table_test("MSM7", "SQLITE"))
+    summary.append(table_test("MSM5", "SQLITE"))
+    summary.append(table_test("EPH", "SQLITE"))
+    summary.append(table_test("BASE", "SQLITE"))
+    summary.append(table_test("MSM7", "SQLITE-WT"))
+    summary.append(table_test("EPH", "SQLITE-WT"))
+    summary.append(table_test("BASE", "SQLITE-FAIL"))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End tabular formats test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_sharded_conversion() -> bool:
+    """Run conversion of a file split into shards"""
+
+    summary = []
+
+    print("Start sharded conversion test procedure.")
+
+    summary.append(shard_test("MARGO", 4))
+    summary.append(shard_test("JSON", 3))
+    summary.append(shard_test("JSONL-B", 2))
+    summary.append(shard_test("JARGO", 5))
+
+    print("Start multi-node conversion by manifest test procedure.")
+
+    summary.append(manifest_test("MARGO", 3))
+    summary.append(manifest_test("JSON", 2))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End sharded conversion test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_stream_conversion() -> bool:
+    """Run conversion of network streams replayed by local caster"""
+
+    summary = []
+
+    print("Start network streams test procedure.")
+
+    summary.append(stream_test("NTRIP1"))
+    summary.append(stream_test("NTRIP2"))
+    summary.append(stream_test("TCP", "JSONL"))
+    summary.append(stream_test("DROP"))
+    summary.append(stream_test("STALL", "JSON"))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End network streams test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_ingest_conversion() -> bool:
+    """Run conversion of many streams by ingest server"""
+
+    summary = []
+
+    print("Start ingest server test procedure.")
+
+    summary.append(ingest_test("MARGO", 20, 2))
+    summary.append(ingest_test("JSONL", 6, 0))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End ingest server test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_serial_input() -> bool:
+    """Run reading of pseudo terminal with message callbacks"""
+
+    summary = []
+
+    print("Start serial input test procedure.")
+
+    summary.append(serial_test("CALLBACK"))
+    summary.append(serial_test("ASYNC"))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End serial input test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_library_api() -> bool:
+    """Run decoding by library API"""
+
+    summary = []
+
+    print("Start library API test procedure.")
+
+    for mode in ("PATH", "GZIP", "FILEOBJ", "BYTES", "BARE", "FILTER"):
+        summary.append(api_test(mode))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End library API test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_resumed_conversion() -> bool:
+    """Run conversion interrupted after a checkpoint and resumed"""
+
+    summary = []
+
+    print("Start resumed conversion test procedure.")
+
+    summary.append(resume_test("MARGO", "mmap"))
+    summary.append(resume_test("JSON", "chunked"))
+    summary.append(resume_test("JARGO-L", "auto", compressed=True))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End resumed conversion test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_followed_files() -> bool:
+    """Run conversion of growing, rotated and truncated files"""
+
+    summary = []
+
+    print("Start followed files test procedure.")
+
+    summary.append(follow_test("GROW", "MARGO"))
+    summary.append(follow_test("ROTATE", "MARGO"))
+    summary.append(follow_test("TRUNCATE", "JSON"))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End followed files test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_frame_index() -> bool:
+    """Build frame indexes, convert by them"""
+
+    summary = []
+
+    print("Start frame index test procedure.")
+
+    summary.append(index_test("MARGO"))
+    summary.append(index_test("JSON"))
+    summary.append(index_test("GROW"))
+    summary.append(index_test("STALE"))
+    summary.append(index_test("EPOCHS"))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End frame index test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_json_serializers() -> bool:
+    """Compare fast JSON serializer with the default one"""
+
+    summary = []
+
+    print("Start fast serializer test procedure.")
+
+    summary.append(serializer_test("FALLBACK"))
+    summary.append(serializer_test("PRECISION"))
+    summary.append(serializer_test("CONVERSION"))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End fast serializer test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
+def test_writer_thread() -> bool:
+    """Check handling of sub-printer failures on the writer thread"""
+
+    summary = []
+
+    print("Start writer thread test procedure.")
+
+    summary.append(writer_test("FAILURES"))
+
+    print("-" * 80)
+    result = "FAILED" if False in summary else "SUCCEED"
+    print(f"End writer thread test procedure. Final result: {result}")
+
+    return result == "SUCCEED"
+
+
 def full_test():
     """Run summary of tests"""
 
@@ -123,6 +417,17 @@ def full_test():
     summary.append(test_eph_messages())
     summary.append(test_base_messages())
     summary.append(test_msm_messages())
+    summary.append(test_table_formats())
+    summary.append(test_sharded_conversion())
+    summary.append(test_stream_conversion())
+    summary.append(test_ingest_conversion())
+    summary.append(test_serial_input())
+    summary.append(test_library_api())
+    summary.append(test_resumed_conversion())
+    summary.append(test_followed_files())
+    summary.append(test_frame_index())
+    summary.append(test_json_serializers())
+    summary.append(test_writer_thread())
 
     print("-" * 80)
     summary = "FAILED" if False in summary else "SUCCEED"
@@ -138,3 +443,6 @@ if __name__ == "__main__":
     # test_base_messages()
     # test_eph_messages()
     # test_msm_messages()
+    # test_table_formats()
+    # test_sharded_conversion()
+    # test_stream_conversion()
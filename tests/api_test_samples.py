@@ -0,0 +1,119 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of library API (rtcm_api.py).
+    Messages of iter_decoded() shall be identical to messages decoded by converters,
+    for any kind of source. Nothing shall be written, the logger shall stay idle.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import io
+import os
+import gzip
+import pickle
+import tempfile
+
+from rtcm_api import iter_decoded, CHUNK_LEN
+from run_shards import load_controls
+from converter_top import ConverterFactory
+from logger import LOGGER_CF as logger
+
+
+__all__ = ["api_test"]
+
+
+API_TEST_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+
+
+class _CountingReader(io.BytesIO):
+    """File object counting read calls"""
+
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+    def read1(self, size=-1):
+        self.reads += 1
+        return super().read1(size)
+
+
+def _reference(data: bytes, fmt: str) -> list[tuple[int, bytes]]:
+    """Messages decoded by the converter of 'fmt'"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conv = ConverterFactory(fmt)(tmp, load_controls(None))
+        rv = []
+        for frame in conv.parse_bytes(data):
+            dto = conv.decode(frame)
+            if dto is not None:
+                rv.append((conv.decoder.mnum(frame), pickle.dumps(dto)))
+        conv.release()
+    return rv
+
+
+def _pickled(messages) -> list[tuple[int, bytes]]:
+    return [(num, pickle.dumps(dto)) for num, dto in messages]
+
+
+def _test_api(mode: str) -> bool:
+    """Decode test file given as 'mode' source, compare with the converter"""
+
+    with open(API_TEST_SOURCE, "rb") as f:
+        data = f.read()
+    bare = mode == "BARE"
+    expected = _reference(data, "JSON-B" if bare else "JSON")
+    cwd = sorted(os.listdir("."))
+
+    if mode == "PATH":
+        received = _pickled(iter_decoded(API_TEST_SOURCE))
+    elif mode == "GZIP":
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "api.rtcm3.gz")
+            with gzip.open(src, "wb") as f:
+                f.write(data)
+            received = _pickled(iter_decoded(src))
+    elif mode == "FILEOBJ":
+        fobj = _CountingReader(data)
+        messages = iter_decoded(fobj)
+        first = next(messages)
+        assert fobj.reads == 1, "Source isn't read lazily"
+        received = _pickled([first, *messages])
+        assert fobj.reads == len(data) // CHUNK_LEN + 2, "Unexpected reads"
+    elif mode == "FILTER":
+        wanted = {1077, 1019}
+        received = _pickled(iter_decoded(memoryview(data), messages=wanted))
+        expected = [e for e in expected if e[0] in wanted]
+        assert expected, "No messages to filter"
+    else:
+        received = _pickled(iter_decoded(data, bare=bare))
+
+    assert len(received) == len(expected), f"{len(received)} of {len(expected)} messages"
+    assert received == expected, "Messages differ"
+    assert not logger.ready, "Logger was initialized"
+    assert sorted(os.listdir(".")) == cwd, "Files were created"
+    return True
+
+
+def api_test(mode: str = "PATH") -> bool:
+    """Test iter_decoded() of 'PATH', 'GZIP', 'FILEOBJ', 'BYTES' sources, 'BARE'
+    data and 'FILTER' of messages."""
+
+    print("-" * 80)
+    print(f"TESTER: start decoding of {mode} source by library API.")
+
+    ret = False
+    try:
+        ret = _test_api(mode)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
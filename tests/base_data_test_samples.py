@@ -74,8 +74,7 @@ def _test_base(msgNum: int, mode: str) -> bool:
     ofile, *_ = PJ.make_opath(tpath, msgNum, mode)
     assert os.path.isfile(ofile), "Output file not found"
 
-    with open(ofile, "r", encoding="utf-8") as file:
-        baseMsgs = json.load(file)
+    baseMsgs = PJ.load(ofile)
 
     tp = baseMsgs.pop(0)
     tp = _determin_type(tp["source_type"])
@@ -96,7 +95,7 @@ def _test_base(msgNum: int, mode: str) -> bool:
     for i, _ in enumerate(baseMsgs):
         base = tp(**baseMsgs[i])
         ref = tp(**refMsgs[i])
-        if mode == "JSON-B":
+        if mode in ("JSON-B", "JSONL-B"):
             base = BSDD.scale(base)
         if isinstance(base, gt.DataClassMethods):
             assert base.compare(
@@ -118,7 +117,7 @@ def test_base_message(msgNum: int, mode: str) -> bool:
         print(f"TESTER: no test data for MSG{msgNum}")
         return ret
 
-    if not mode in ("JSON", "JSON-B"):
+    if not mode in ("JSON", "JSON-B", "JSONL", "JSONL-B"):
         print(f"TESTER: format {mode} is not supported in this test")
         return ret
 
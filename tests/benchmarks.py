@@ -0,0 +1,486 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Performance benchmarks. Not a part of the test procedure.
+    Run from the project root:
+
+        python -m tests.benchmarks json
+        python -m tests.benchmarks printers
+        python -m tests.benchmarks readers [SIZE_MB]
+        python -m tests.benchmarks shards [SIZE_MB]
+        python -m tests.benchmarks threads [SIZE_MB]
+        python -m tests.benchmarks pipeline [SIZE_MB]
+        python -m tests.benchmarks chunks [SIZE_MB]
+        python -m tests.benchmarks stream [SIZE_MB]
+        python -m tests.benchmarks ingest [STREAMS]
+"""
+
+# pylint: disable = invalid-name
+
+import os
+import sys
+import glob
+import time
+import asyncio
+import tempfile
+import contextlib
+import multiprocessing as mp
+
+from decoder_top import DecoderTop
+from sub_decoders import (
+    SubdecoderMSM4567,
+    SubdecoderMSM123,
+    SubdecoderEph,
+    SubdecoderBaseStationData,
+)
+from printers.json_printer import JSONControls, JSONCore, JSONFastCore
+from printers import PrintMARGO, PrintNPY, PrintRINEX, PrintSQLite
+from gnss_types import ObservablesMSM, BareObservablesMSM123, BareObservablesMSM4567
+from sources import SourceFile, InputControls
+from sources import StreamClient, StreamEndpoint, StreamControls
+from tests.caster_stub import CasterStub, push_source
+from ingest_server import IngestServer
+from run_shards import load_controls
+from run_conversion import MMAP_WINDOW_LEN
+from run_conversion import main as convert
+
+
+BENCH_FILES = {
+    "MSM": sorted(
+        glob.glob("RTCM3_TEST_DATA/MSM5/*.rtcm3")
+        + glob.glob("RTCM3_TEST_DATA/MSM7/*.rtcm3")
+    ),
+    "EPH": sorted(glob.glob("RTCM3_TEST_DATA/EPH/*.rtcm3")),
+    "BASE": sorted(glob.glob("RTCM3_TEST_DATA/BASE/*.rtcm3")),
+    "RTK134": ["RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"],
+}
+
+
+def make_decoder(bare: bool = False) -> DecoderTop:
+    """Create decoder supporting all implemented messages."""
+
+    dec = DecoderTop()
+    dec.register_decoder(SubdecoderMSM4567(bare_data=bare).io)
+    dec.register_decoder(SubdecoderMSM123(bare_data=bare).io)
+    dec.register_decoder(SubdecoderEph(bare_data=bare).io)
+    dec.register_decoder(SubdecoderBaseStationData(bare_data=bare).io)
+    return dec
+
+
+def load_dtos(files: list[str], bare: bool = False) -> list[object]:
+    """Decode files and return list of DTO objects."""
+
+    dec = make_decoder(bare)
+    rv = []
+    for path in files:
+        with open(path, "rb") as f:
+            for msg in dec.catch_message(f.read()):
+                dto = dec.decode(msg)
+                if dto is not None:
+                    rv.append(dto)
+    return rv
+
+
+def serialize_all(core: JSONCore, dtos: list[object]) -> int:
+    """Serialize DTO objects, return total length of JSON strings."""
+
+    total = 0
+    for dto in dtos:
+        if isinstance(dto, ObservablesMSM):
+            total += len(core.ObservablesMSMtoPrintBuffer(dto))
+        elif isinstance(dto, (BareObservablesMSM4567, BareObservablesMSM123)):
+            total += len(core.BareObservablesMSMtoPrintBuffer(dto))
+        else:
+            total += len(core.dataClassToPrintBuffer(dto))
+    return total
+
+
+def timeit(func, repeat: int) -> float:
+    """Return the best execution time of 'func' in [s]."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_json_serializers(repeat: int = 5) -> None:
+    """Compare JSON serializers on MSM/EPH/BASE test files."""
+
+    print("JSON serialization, best of", repeat, "runs.")
+    print(f"{'data':>10} {'DTOs':>6} {'serializer':>24} {'time, ms':>10} {'chars':>10}")
+
+    for pretty in (False, True):
+        for name, files in BENCH_FILES.items():
+            for bare in (False, True):
+                dtos = load_dtos(files, bare)
+                if not dtos:
+                    continue
+
+                ctrls = JSONControls()
+                ctrls.enable_hdr_data = True
+                ctrls.enable_aux_data = True
+                ctrls.enable_pretty_view = pretty
+
+                cores = {
+                    "JSONCore": JSONCore(ctrls),
+                    "JSONFastCore(json)": JSONFastCore(ctrls, use_orjson=False),
+                    "JSONFastCore(orjson)": JSONFastCore(ctrls),
+                }
+                ctrls6 = JSONControls()
+                ctrls6.enable_hdr_data = True
+                ctrls6.enable_aux_data = True
+                ctrls6.float_precision = 6
+                ctrls6.enable_pretty_view = pretty
+                cores["JSONFastCore(prec=6)"] = JSONFastCore(ctrls6)
+
+                label = name + ("-B" if bare else "") + ("/P" if pretty else "")
+                for cname, core in cores.items():
+                    size = serialize_all(core, dtos)
+                    t = timeit(lambda c=core: serialize_all(c, dtos), repeat)
+                    print(
+                        f"{label:>10} {len(dtos):6d} {cname:>24} {t * 1e3:10.2f} {size:10d}"
+                    )
+
+
+def bench_printers(repeat: int = 3) -> None:
+    """Compare observables printers on RTK134 test file, print + close."""
+
+    dtos = [d for d in load_dtos(BENCH_FILES["RTK134"]) if isinstance(d, ObservablesMSM)]
+    printers = {
+        "MARGO": lambda wd: PrintMARGO(wd, None),
+        "NPY": lambda wd: PrintNPY(wd, None),
+        "RINEX": lambda wd: PrintRINEX(wd, None),
+        "SQLITE": lambda wd: PrintSQLite(wd, None),
+    }
+
+    def run(make_printer):
+        with tempfile.TemporaryDirectory() as wd:
+            p = make_printer(wd)
+            for dto in dtos:
+                p.io.print(dto)
+            p.io.close()
+
+    print("Observables printers, best of", repeat, "runs,", len(dtos), "messages.")
+    print(f"{'printer':>10} {'time, ms':>10}")
+    for name, make_printer in printers.items():
+        t = timeit(lambda m=make_printer: run(m), repeat)
+        print(f"{name:>10} {t * 1e3:10.2f}")
+
+
+# Size of chunks in 'frame_chunked'
+READ_SIZE = InputControls().read_size_min
+
+
+def frame_chunked(path: str) -> int:
+    """Extract messages reading file by chunks. Return number of messages."""
+
+    dec = DecoderTop()
+    total = 0
+    with SourceFile(path) as f:
+        chunk = f.read(READ_SIZE)
+        while chunk:
+            total += len(dec.catch_message(chunk))
+            chunk = f.read(READ_SIZE)
+    return total
+
+
+def frame_mapped(path: str) -> int:
+    """Extract messages from memory mapped file. Return number of messages."""
+
+    dec = DecoderTop()
+    total = 0
+    with SourceFile(path) as f:
+        mm = f.map()
+        size = len(mm)
+        start = 0
+        while start < size:
+            end = min(size, start + MMAP_WINDOW_LEN)
+            frames, start = dec.catch_frames(mm, start, end)
+            total += len(frames)
+            for msg in frames:
+                msg.release()
+            del frames
+            if end == size:
+                break
+        mm.close()
+    return total
+
+
+def make_synthetic_file(path: str, size_mb: int) -> None:
+    """Make file of 'size_mb' megabytes repeating RTK134 test file."""
+
+    with open(BENCH_FILES["RTK134"][0], "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        for _ in range(max(1, size_mb * 2**20 // len(data))):
+            f.write(data)
+
+
+def bench_readers(size_mb: int = 256, repeat: int = 3) -> None:
+    """Compare chunked and memory mapped readers (message extraction only)
+    on RTK134 test file and on a synthetic file of 'size_mb' megabytes."""
+
+    src = BENCH_FILES["RTK134"][0]
+    readers = {"chunked": frame_chunked, "mmap": frame_mapped}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        big = os.path.join(tmp, "synthetic.rtcm3")
+        make_synthetic_file(big, size_mb)
+
+        print("Message extraction, best of", repeat, "runs.")
+        print(f"{'file':>12} {'MB':>8} {'reader':>8} {'messages':>10} {'time, ms':>10} {'MB/s':>8}")
+        for name, path in (("RTK134", src), ("synthetic", big)):
+            mbytes = os.path.getsize(path) / 2**20
+            for rname, reader in readers.items():
+                count = reader(path)
+                t = timeit(lambda r=reader, p=path: r(p), repeat)
+                print(
+                    f"{name:>12} {mbytes:8.1f} {rname:>8} {count:10d} {t * 1e3:10.1f} {mbytes / t:8.1f}"
+                )
+
+
+def bench_shards(size_mb: int = 8, workers: tuple[int, ...] = (1, 2, 4, 8, 16)) -> None:
+    """Scaling of intra-file parallel conversion (MARGO) on a synthetic file."""
+
+    print(f"Sharded conversion to MARGO, {size_mb} MB synthetic file, {os.cpu_count()} CPUs.")
+    print(f"{'shards':>8} {'time, s':>10} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "synthetic.rtcm3")
+        make_synthetic_file(src, size_mb)
+
+        base = None
+        for n in workers:
+            with open(os.devnull, "w", encoding="utf-8") as null:
+                with contextlib.redirect_stdout(null), contextlib.redirect_stderr(null):
+                    t0 = time.perf_counter()
+                    convert(f"-o MARGO --shards {n} {src}")
+                    t = time.perf_counter() - t0
+            base = t if base is None else base
+            print(f"{n:8d} {t:10.2f} {base / t:8.2f}")
+
+
+def bench_threads(size_mb: int = 8, threads: tuple[int, ...] = (1, 2, 4, 8)) -> None:
+    """Scaling of decoding in a pool of threads (JSON) on a synthetic file.
+    Speedup is expected on free-threaded builds only. Results recorded in
+    DOCs/CommandLineArgs.md (--threads) are of a GIL build, free-threaded builds
+    haven't been measured yet."""
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(
+        f"Decoding in threads to JSON, {size_mb} MB synthetic file, "
+        + f"{os.cpu_count()} CPUs, Python {sys.version.split()[0]}, "
+        + f"GIL {'enabled' if gil else 'disabled'}."
+    )
+    if gil:
+        print("No speedup is expected with the GIL. Run on a free-threaded build.")
+    print(f"{'threads':>8} {'time, s':>10} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "synthetic.rtcm3")
+        make_synthetic_file(src, size_mb)
+
+        base = None
+        for n in threads:
+            with open(os.devnull, "w", encoding="utf-8") as null:
+                with contextlib.redirect_stdout(null), contextlib.redirect_stderr(null):
+                    t0 = time.perf_counter()
+                    convert(f"-o JSON --threads {n} {src}")
+                    t = time.perf_counter() - t0
+            base = t if base is None else base
+            print(f"{n:8d} {t:10.2f} {base / t:8.2f}")
+
+
+def bench_pipeline(size_mb: int = 8, decoders: tuple[int, ...] = (1, 2, 4, 8)) -> None:
+    """Scaling of shared memory pipeline (JSON) on a synthetic file.
+    One decoder means sequential conversion without the pipeline."""
+
+    print(f"Shared memory pipeline to JSON, {size_mb} MB synthetic file, {os.cpu_count()} CPUs.")
+    print(f"{'decoders':>8} {'time, s':>10} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "synthetic.rtcm3")
+        make_synthetic_file(src, size_mb)
+
+        base = None
+        for n in decoders:
+            with open(os.devnull, "w", encoding="utf-8") as null:
+                with contextlib.redirect_stdout(null), contextlib.redirect_stderr(null):
+                    t0 = time.perf_counter()
+                    convert(f"-o JSON --decoders {n} {src}")
+                    t = time.perf_counter() - t0
+            base = t if base is None else base
+            print(f"{n:8d} {t:10.2f} {base / t:8.2f}")
+
+
+def bench_chunks(size_mb: int = 8) -> None:
+    """Chunked conversion (MARGO): fixed 4 kB reads with progress after each chunk
+    against adaptive reads with throttled progress."""
+
+    print(f"Chunked conversion to MARGO, {size_mb} MB synthetic file.")
+    print(f"{'reads':>24} {'time, s':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "synthetic.rtcm3")
+        make_synthetic_file(src, size_mb)
+
+        for name, opts in (
+            ("4K, every chunk", "--read-size 4K --progress 0s"),
+            ("64K:4M, every 1 s", "--read-size 64K:4M --progress 1s"),
+        ):
+            with open(os.devnull, "w", encoding="utf-8") as null:
+                with contextlib.redirect_stdout(null), contextlib.redirect_stderr(null):
+                    t0 = time.perf_counter()
+                    convert(f"-o MARGO --read chunked {opts} {src}")
+                    t = time.perf_counter() - t0
+            print(f"{name:>24} {t:10.2f}")
+
+
+async def _replay_stream(data: bytes, url: str, raw: bool) -> tuple[float, int]:
+    """Replay data by caster stub, frame and decode the stream.
+    Return time and number of messages."""
+
+    stub = CasterStub({"BENCH": data}, raw=raw, piece=2**14)
+    port = await stub.start()
+    dec = make_decoder()
+
+    def consume(chunk: bytes) -> int:
+        frames = dec.catch_message(chunk)
+        for msg in frames:
+            dec.decode(msg)
+        return len(frames)
+
+    ctrl = StreamControls()
+    ctrl.max_retries = 0
+    ctrl.reconnect_min = 0.0
+    client = StreamClient(StreamEndpoint(url.format(port=port)), consume, ctrl)
+    t0 = time.perf_counter()
+    await client.run()
+    return time.perf_counter() - t0, client.messages.total
+
+
+def bench_stream(size_mb: int = 8) -> None:
+    """Throughput of network stream input: synthetic file replayed by local caster
+    stub as fast as possible, framed and decoded (no printing)."""
+
+    print(f"Network stream input, {size_mb} MB synthetic file, framing and decoding.")
+    print(f"{'stream':>12} {'time, s':>10} {'MB/s':>8} {'msg/s':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "synthetic.rtcm3")
+        make_synthetic_file(src, size_mb)
+        with open(src, "rb") as f:
+            data = f.read()
+
+    for name, url, raw in (
+        ("TCP", "tcp://127.0.0.1:{port}", True),
+        ("NTRIP v1", "ntrip://127.0.0.1:{port}/BENCH", False),
+        ("NTRIP v2", "ntrip2://127.0.0.1:{port}/BENCH", False),
+    ):
+        t, msgs = asyncio.run(_replay_stream(data, url, raw))
+        print(f"{name:>12} {t:10.2f} {len(data) / 2**20 / t:8.2f} {msgs / t:10.0f}")
+
+
+def _replay_sources(port: int, data: bytes, streams: int, rate: float) -> None:
+    """Replayer process: push data by 'streams' simultaneous sources"""
+
+    async def replay():
+        rv = await asyncio.gather(
+            *(
+                push_source("127.0.0.1", port, f"BENCH{i:04d}", data, i % 3, rate)
+                for i in range(streams)
+            ),
+            return_exceptions=True,
+        )
+        failed = [ex for ex in rv if ex is not None]
+        if failed:
+            print(f"Replayer: {len(failed)} sources failed, e.g. {failed[0]!r}")
+
+    asyncio.run(replay())
+
+
+async def _run_ingest(
+    wdir: str, data: bytes, streams: int, rate: float, workers: int
+) -> tuple[float, IngestServer]:
+    """Serve sources of the replayer process. Return time and the stopped server."""
+
+    server = IngestServer("MARGO", load_controls(None), wdir, workers)
+    port = await server.start("127.0.0.1")
+    replayer = mp.get_context("spawn").Process(
+        target=_replay_sources, args=(port, data, streams, rate)
+    )
+    t0 = time.perf_counter()
+    replayer.start()
+    try:
+        while replayer.is_alive() or server.active:
+            await asyncio.sleep(0.05)
+        t = time.perf_counter() - t0
+    finally:
+        replayer.join()
+        await server.close()
+    return t, server
+
+
+def bench_ingest(streams: int = 500, kb: int = 32, rate: float = 0.0) -> None:
+    """Load of ingest server: 'streams' sources of a local replayer process send
+    'kb' kB of RTCM data each, at 'rate' bytes/s (0 - as fast as possible).
+    Streams are converted to MARGO."""
+
+    with open(BENCH_FILES["RTK134"][0], "rb") as f:
+        data = f.read(kb * 1024)
+
+    print(f"Ingest server, {streams} streams x {kb} kB, conversion to MARGO.")
+    print(
+        f"{'workers':>8} {'time, s':>10} {'MB/s':>8} {'msg/s':>10} "
+        + f"{'pauses':>8} {'lost':>6}"
+    )
+    for workers in (0, 1, max(1, (os.cpu_count() or 2) - 1)):
+        with tempfile.TemporaryDirectory() as tmp:
+            t, server = asyncio.run(_run_ingest(tmp, data, streams, rate, workers))
+        stats = server.statistics
+        msgs = sum(s.decoding_attempts for s in stats)
+        pauses = sum(s.pauses for s in stats)
+        lost = streams - len([s for s in stats if s.bytes == len(data)])
+        mb = streams * len(data) / 2**20
+        print(
+            f"{workers:>8} {t:10.2f} {mb / t:8.2f} {msgs / t:10.0f} "
+            + f"{pauses:>8} {lost:>6}"
+        )
+
+
+BENCHMARKS = {
+    "json": bench_json_serializers,
+    "printers": bench_printers,
+    "readers": bench_readers,
+    "shards": bench_shards,
+    "threads": bench_threads,
+    "pipeline": bench_pipeline,
+    "chunks": bench_chunks,
+    "stream": bench_stream,
+    "ingest": bench_ingest,
+}
+
+
+if __name__ == "__main__":
+
+    if sys.argv[1:2] == ["readers"] and len(sys.argv) > 2:
+        bench_readers(int(sys.argv[2]))
+    elif sys.argv[1:2] == ["shards"] and len(sys.argv) > 2:
+        bench_shards(int(sys.argv[2]))
+    elif sys.argv[1:2] == ["threads"] and len(sys.argv) > 2:
+        bench_threads(int(sys.argv[2]))
+    elif sys.argv[1:2] == ["pipeline"] and len(sys.argv) > 2:
+        bench_pipeline(int(sys.argv[2]))
+    elif sys.argv[1:2] == ["chunks"] and len(sys.argv) > 2:
+        bench_chunks(int(sys.argv[2]))
+    elif sys.argv[1:2] == ["stream"] and len(sys.argv) > 2:
+        bench_stream(int(sys.argv[2]))
+    elif sys.argv[1:2] == ["ingest"] and len(sys.argv) > 2:
+        bench_ingest(int(sys.argv[2]))
+    else:
+        for arg in sys.argv[1:] or BENCHMARKS.keys():
+            BENCHMARKS[arg]()
@@ -0,0 +1,254 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Local asyncio NTRIP caster replaying RTCM files. Used by tests and benchmarks
+    of network streams input.
+
+    CasterStub() serves NTRIP v1 and v2 requests (chunked transfer encoding for v2)
+    or raw TCP connections. Data of each mountpoint are 'live': a new connection
+    continues from the position where the previous one was broken. Faults may be
+    injected once per mountpoint: the connection is dropped or stalls at a given
+    position. When all data of the mountpoint are sent, the connection is closed
+    and, if 'close_at_end' is True, the caster stops listening.
+
+    Use serve_in_thread() to run the caster on a thread of synchronous tests.
+    Use push_source() to replay data as NTRIP source or raw TCP stream to a server.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import base64
+import asyncio
+import threading
+import contextlib
+
+
+class CasterStub:
+    """NTRIP caster or raw TCP server replaying data of mountpoints"""
+
+    def __init__(
+        self,
+        mounts: dict[str, bytes],
+        raw: bool = False,
+        rate: float = 0.0,
+        piece: int = 1024,
+        close_at_end: bool = True,
+        user: str = "",
+        password: str = "",
+    ) -> None:
+        """'mounts' - {mountpoint: data}. 'raw' - serve the first mountpoint to
+        any TCP connection without NTRIP handshake. 'rate' - bytes per second,
+        0 - as fast as possible. 'piece' - size of sent pieces (chunks)."""
+
+        self.mounts = mounts
+        self.raw = raw
+        self.rate = rate
+        self.piece = piece
+        self.close_at_end = close_at_end
+        self.auth = ""
+        if user:
+            self.auth = base64.b64encode(f"{user}:{password}".encode()).decode()
+        # Position of each mountpoint, {mountpoint: offset}
+        self.pos = {mount: 0 for mount in mounts}
+        # Injected faults {mountpoint: (offset, 'drop' | 'stall')}
+        self.faults: dict[str, tuple[int, str]] = {}
+        self.stall_time: float = 5.0
+        self.connections: int = 0
+        self.__server: asyncio.AbstractServer | None = None
+        self.__finished = 0
+
+    def inject(self, mount: str, offset: int, fault: str) -> None:
+        """Drop ('drop') or stall ('stall') connection once at 'offset'"""
+        self.faults[mount] = (offset, fault)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening. Return the port."""
+        self.__server = await asyncio.start_server(self.__handle, host, port)
+        return self.__server.sockets[0].getsockname()[1]
+
+    def close(self) -> None:
+        """Stop listening"""
+        if self.__server is not None:
+            self.__server.close()
+
+    async def __read_request(self, reader: asyncio.StreamReader) -> dict[str, str]:
+        """Read request line and headers"""
+
+        request = {"line": (await reader.readline()).decode().strip()}
+        line = await reader.readline()
+        while line.strip():
+            key, _, value = line.decode().partition(":")
+            request[key.strip().lower()] = value.strip()
+            line = await reader.readline()
+        return request
+
+    async def __handle(self, reader, writer) -> None:
+        """Serve a connection"""
+
+        self.connections += 1
+        try:
+            if self.raw:
+                mount, v2 = next(iter(self.mounts)), False
+            else:
+                request = await self.__read_request(reader)
+                parts = request["line"].split(" ")
+                mount = parts[1].strip("/") if len(parts) > 1 else ""
+                v2 = "Ntrip/2.0" in request.get("ntrip-version", "")
+                if not self.__respond(writer, request, mount, v2):
+                    await writer.drain()
+                    return
+            await self.__send(writer, mount, v2)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def __respond(self, writer, request: dict[str, str], mount: str, v2: bool) -> bool:
+        """Write response to NTRIP request. Return True if data are to be sent."""
+
+        proto = "HTTP/1.1" if v2 else "HTTP/1.0"
+        if self.auth and request.get("authorization") != f"Basic {self.auth}":
+            writer.write(f"{proto} 401 Unauthorized\r\n\r\n".encode())
+            return False
+
+        if mount not in self.mounts:
+            table = "".join(
+                f"STR;{m};{m};RTCM 3.3;;2;GPS;;;0;0;;;N;N;0;\r\n" for m in self.mounts
+            )
+            table += "ENDSOURCETABLE\r\n"
+            if v2:
+                head = f"{proto} 200 OK\r\nNtrip-Version: Ntrip/2.0\r\n"
+                head += "Content-Type: gnss/sourcetable\r\n"
+                head += f"Content-Length: {len(table)}\r\n\r\n"
+            else:
+                head = f"SOURCETABLE 200 OK\r\nContent-Length: {len(table)}\r\n\r\n"
+            writer.write((head + table).encode())
+            return False
+
+        if v2:
+            writer.write(
+                (
+                    f"{proto} 200 OK\r\nNtrip-Version: Ntrip/2.0\r\n"
+                    + "Content-Type: gnss/data\r\nTransfer-Encoding: chunked\r\n\r\n"
+                ).encode()
+            )
+        else:
+            writer.write(b"ICY 200 OK\r\n")
+        return True
+
+    async def __send(self, writer, mount: str, v2: bool) -> None:
+        """Send data of the mountpoint from its current position"""
+
+        data = self.mounts[mount]
+        while self.pos[mount] < len(data):
+            start = self.pos[mount]
+            end = min(len(data), start + self.piece)
+
+            fault = self.faults.get(mount)
+            if fault is not None and start <= fault[0] < end:
+                end = fault[0]
+            piece = data[start:end]
+            if piece:
+                writer.write(b"%x\r\n%s\r\n" % (len(piece), piece) if v2 else piece)
+                await writer.drain()
+                self.pos[mount] = end
+
+            if fault is not None and end == fault[0]:
+                del self.faults[mount]
+                if fault[1] == "stall":
+                    await asyncio.sleep(self.stall_time)
+                return
+
+            if self.rate > 0:
+                await asyncio.sleep(len(piece) / self.rate)
+
+        if v2:
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        self.__finished += 1
+        if self.close_at_end and self.__finished == len(self.mounts):
+            self.close()
+
+
+async def push_source(
+    host: str,
+    port: int,
+    mount: str,
+    data: bytes,
+    version: int = 1,
+    rate: float = 0.0,
+    piece: int = 1024,
+    password: str = "",
+) -> None:
+    """Send data to the server as NTRIP source of the mountpoint: 'version' 1 -
+    'SOURCE' request, 2 - chunked 'POST' request, 0 - raw TCP stream.
+    'rate' - bytes per second, 0 - as fast as possible.
+    Raises ConnectionError if the server refused the source."""
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        if version == 1:
+            writer.write(f"SOURCE {password} /{mount}\r\n".encode())
+            writer.write(b"Source-Agent: NTRIP replayer\r\n\r\n")
+        elif version == 2:
+            token = base64.b64encode(f"source:{password}".encode()).decode()
+            head = [
+                f"POST /{mount} HTTP/1.1",
+                f"Host: {host}:{port}",
+                "Ntrip-Version: Ntrip/2.0",
+                "User-Agent: NTRIP replayer",
+                f"Authorization: Basic {token}",
+                "Transfer-Encoding: chunked",
+            ]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+        if version:
+            status = (await reader.readline()).decode(errors="replace")
+            if " 200 " not in status:
+                raise ConnectionError(f"Source refused: {status.strip()}")
+            while version == 2 and (await reader.readline()).strip():
+                pass
+
+        for pos in range(0, len(data), piece):
+            chunk = data[pos : pos + piece]
+            if version == 2:
+                chunk = b"%x\r\n%s\r\n" % (len(chunk), chunk)
+            writer.write(chunk)
+            await writer.drain()
+            if rate > 0:
+                await asyncio.sleep(piece / rate)
+        if version == 2:
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def _shutdown(stub: CasterStub) -> None:
+    """Stop listening, cancel connections being served"""
+    stub.close()
+    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@contextlib.contextmanager
+def serve_in_thread(stub: CasterStub, host: str = "127.0.0.1"):
+    """Run the caster on its own event loop in a thread. Yield the port."""
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="CasterStub", daemon=True)
+    thread.start()
+    try:
+        port = asyncio.run_coroutine_threadsafe(stub.start(host), loop).result()
+        yield port
+    finally:
+        asyncio.run_coroutine_threadsafe(_shutdown(stub), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
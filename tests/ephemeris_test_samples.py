@@ -8,7 +8,6 @@
 # pylint: disable = invalid-name, consider-iterating-dictionary, broad-exception-caught
 
 import os
-import json
 from typing import Any
 
 import gnss_types as gt
@@ -60,8 +59,7 @@ def _test_eph(msgNum: int, mode: str) -> bool:
     ofile, *_ = PJ.make_opath(tpath, msgNum, mode)
     assert os.path.isfile(ofile), "Output file not found"
 
-    with open(ofile, "r", encoding="utf-8") as file:
-        ephs = json.load(file)
+    ephs = PJ.load(ofile)
 
     tp = ephs.pop(0)
     tp = _determin_type(tp["source_type"])
@@ -73,7 +71,7 @@ def _test_eph(msgNum: int, mode: str) -> bool:
     for i, _ in enumerate(ephs):
         ref = refs[i]
         eph = tp(**ephs[i])
-        if mode == "JSON-B":
+        if mode in ("JSON-B", "JSONL-B"):
             eph = ED.scale(eph)
         if isinstance(eph, gt.DataClassMethods):
             assert eph.compare(
@@ -91,7 +89,7 @@ def test_eph_message(msgNum: int, mode: str) -> bool:
 
     ret = False
 
-    if not mode in ("JSON", "JSON-B"):
+    if not mode in ("JSON", "JSON-B", "JSONL", "JSONL-B"):
         print(f"TESTER: format {mode} is not supported in this test")
         return ret
 
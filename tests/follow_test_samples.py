@@ -0,0 +1,155 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of growing files conversion (--follow).
+    Test file is written piece by piece by a logger thread, messages are split
+    between writes. The file may be rotated or truncated in the middle. Products
+    shall be current while the file is followed and byte-identical to conversion of
+    the file at the end.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import time
+import tempfile
+import threading
+
+from run_conversion import main as convert, end_of_epoch
+from decoder_top import DecoderTop
+from rtcm_api import make_decoder
+from tests.shard_test_samples import _compare_trees
+
+
+__all__ = ["follow_test"]
+
+
+FOLLOW_TEST_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+# Size of writes of the logger thread and the pause after each write
+FOLLOW_TEST_PIECE = 3000
+FOLLOW_TEST_PAUSE = 0.005
+# Duration of following, [s]
+FOLLOW_TEST_DURATION = 5.0
+
+
+def _complete_epochs(data: bytes) -> bytes:
+    """Cut messages of the last incomplete epoch: they are flushed when the epoch
+    is completed"""
+
+    dec = make_decoder()
+    pos = end = 0
+    while (pos := dec.find_frame(data, pos)) < len(data):
+        nxt = pos + DecoderTop.mlen(data[pos : pos + 3])
+        xblock = dec.decode(data[pos:nxt])
+        if xblock is not None and end_of_epoch(xblock):
+            end = nxt
+        pos = nxt
+    return data[:end]
+
+
+def _write_pieces(f, data: bytes) -> None:
+    """Write data piece by piece like a logger"""
+    for pos in range(0, len(data), FOLLOW_TEST_PIECE):
+        f.write(data[pos : pos + FOLLOW_TEST_PIECE])
+        f.flush()
+        time.sleep(FOLLOW_TEST_PAUSE)
+
+
+def _write_log(path: str, data: bytes, event: str, done: threading.Event) -> None:
+    """Write data piece by piece. In the middle (at a message boundary) the file is
+    renamed and a new one created ('ROTATE') or the file is truncated ('TRUNCATE')."""
+
+    split = len(data)
+    if event != "GROW":
+        split = DecoderTop().find_frame(data, len(data) // 2)
+
+    f = open(path, "ab")  # pylint: disable = consider-using-with
+    try:
+        _write_pieces(f, data[:split])
+        if split < len(data):
+            # The follower reads the rest of the content
+            time.sleep(0.3)
+            if event == "ROTATE":
+                f.close()
+                os.rename(path, path + ".1")
+                f = open(path, "ab")  # pylint: disable = consider-using-with
+            else:
+                f.truncate(0)
+                f.seek(0)
+            _write_pieces(f, data[split:])
+    finally:
+        f.close()
+        done.set()
+
+
+def _test_follow(event: str, fmt: str) -> bool:
+    """Convert test file, follow the file written by the logger thread,
+    compare products"""
+
+    with open(FOLLOW_TEST_SOURCE, "rb") as f:
+        data = _complete_epochs(f.read())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        name = os.path.basename(FOLLOW_TEST_SOURCE)
+        os.makedirs(os.path.join(tmp, "ref"))
+        ref = os.path.join(tmp, "ref", name)
+        with open(ref, "wb") as f:
+            f.write(data)
+        convert(f"-o {fmt} -i tests/follow.ini {ref}")
+        ref = os.path.splitext(ref)[0] + "-" + fmt
+        assert os.path.isdir(ref), "Output directory not found"
+
+        src = os.path.join(tmp, name)
+        odir = os.path.splitext(src)[0] + "-" + fmt
+        open(src, "wb").close()  # pylint: disable = consider-using-with
+        done = threading.Event()
+        writer = threading.Thread(
+            target=_write_log, args=(src, data, event, done), daemon=True
+        )
+        current = []
+
+        def check_current():
+            # Products are compared while the file is still followed
+            done.wait()
+            time.sleep(1.0)
+            try:
+                _compare_trees(ref, odir)
+                current.append(True)
+            except AssertionError as asrt:
+                current.append(asrt.args[0])
+
+        checker = threading.Thread(target=check_current, daemon=True)
+        writer.start()
+        if fmt == "MARGO":
+            checker.start()
+        convert(
+            f"-o {fmt} -i tests/follow.ini --follow --duration {FOLLOW_TEST_DURATION} {src}"
+        )
+        writer.join()
+        assert done.is_set(), "Logger thread didn't finish"
+        if fmt == "MARGO":
+            checker.join()
+            assert current == [True], f"Products weren't current. {current[0]}"
+
+        _compare_trees(ref, odir)
+
+    return True
+
+
+def follow_test(event: str = "GROW", fmt: str = "MARGO") -> bool:
+    """Test following of growing file. 'event': GROW, ROTATE or TRUNCATE."""
+
+    print("-" * 80)
+    print(f"TESTER: start following of growing file to {fmt}, event {event}.")
+
+    ret = False
+    try:
+        ret = _test_follow(event, fmt)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
@@ -0,0 +1,209 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of frame indexes (frame_index.py, --index).
+    Products of conversion by the index shall be byte-identical to products of
+    conversion by the framer. Extended index of the growing file shall be identical
+    to the index of the whole file.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import shutil
+import tempfile
+
+from run_conversion import main as convert
+from run_index import main as build_index
+from frame_index import FrameIndex
+from gnss_types import ObservablesMSM
+from printers.margo_printer import MargoCore, EpochClock
+from printers.margo_printer import MS_IN_WEEK, MS_IN_DAY, NO_EPOCH
+from rtcm_api import iter_decoded
+from tests.shard_test_samples import _compare_trees
+
+
+__all__ = ["index_test"]
+
+
+INDEX_TEST_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+# GPS week of the test source
+INDEX_TEST_WEEK = 2143
+
+
+def _records(index: FrameIndex) -> bytes:
+    """Read records of the index"""
+    with open(index.path, "rb") as f:
+        return f.read()[64:]
+
+
+def _log_name(wfld: str) -> str:
+    """Find log file of the work folder"""
+    return [name for name in os.listdir(wfld) if name.endswith("-log.txt")][0]
+
+
+def _test_convert(mode: str) -> bool:
+    """Convert test file by the framer and by the index, compare products"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = shutil.copy(INDEX_TEST_SOURCE, tmp)
+        odir = os.path.splitext(src)[0] + "-" + mode
+        ref = os.path.join(tmp, "framed")
+
+        convert(f"-o {mode} -i addons.ini {src}")
+        assert os.path.isdir(odir), "Output directory not found"
+        os.rename(odir, ref)
+
+        convert(f"-o {mode} -i addons.ini --index {src}")
+        assert os.path.isfile(src + ".idx"), "Index wasn't built"
+        _compare_trees(ref, odir)
+        shutil.rmtree(odir)
+
+        # The index is current, messages are extracted by it only
+        assert FrameIndex(src).state() == "current", "Index isn't current"
+        convert(f"-o {mode} -i addons.ini --index --threads 2 {src}")
+        _compare_trees(ref, odir)
+        with open(os.path.join(odir, _log_name(odir)), "r", encoding="utf-8") as f:
+            assert "is current" in f.read(), "Current index wasn't used"
+
+    return True
+
+
+def _test_grow() -> bool:
+    """Index the head of the file, append the rest, extend the index"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(INDEX_TEST_SOURCE, "rb") as f:
+            data = f.read()
+        whole = os.path.join(tmp, "whole.rtcm3")
+        with open(whole, "wb") as f:
+            f.write(data)
+        ref = FrameIndex(whole, gps_week=INDEX_TEST_WEEK)
+        ref.update()
+
+        grown = os.path.join(tmp, "grown.rtcm3")
+        index = FrameIndex(grown, gps_week=INDEX_TEST_WEEK)
+        # Borders of pieces split messages
+        cuts = (100003, 500017, 777777, len(data))
+        for cut in cuts:
+            with open(grown, "ab") as f:
+                f.write(data[f.tell() : cut])
+            state = index.state()
+            assert state in ("missing", "growing"), f"Index is {state}"
+            assert index.update() > 0, "No messages added"
+            assert index.state() == "current", "Index isn't current"
+        print(f"TESTER: index extended {len(cuts) - 1} times.")
+
+        assert _records(index) == _records(ref), "Extended index differs"
+        hdr, rhdr = index.header(), ref.header()
+        assert (hdr.frames, hdr.scanned, hdr.parse_errors, hdr.week, hdr.tow) == (
+            rhdr.frames,
+            rhdr.scanned,
+            rhdr.parse_errors,
+            rhdr.week,
+            rhdr.tow,
+        ), "Header of extended index differs"
+
+    return True
+
+
+def _test_stale() -> bool:
+    """Modify the source in place, truncate it. Index shall be rebuilt."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = shutil.copy(INDEX_TEST_SOURCE, tmp)
+        index = FrameIndex(src)
+        assert build_index(src), "Index wasn't built"
+        assert index.state() == "current", "Index isn't current"
+
+        # The first message is damaged
+        with open(src, "r+b") as f:
+            f.seek(10)
+            f.write(b"\xff")
+        assert index.state() == "stale", "Modification wasn't detected"
+        assert build_index(src), "Index wasn't rebuilt"
+        assert index.state() == "current", "Index isn't current"
+
+        frames = index.header().frames
+        os.truncate(src, os.path.getsize(src) // 2)
+        assert index.state() == "stale", "Truncation wasn't detected"
+        assert build_index(src), "Index wasn't rebuilt"
+        assert index.header().frames < frames, "Index wasn't rebuilt"
+
+        # Appended data replace the last indexed message
+        with open(src, "r+b") as f:
+            last = list(index.records())[-1]
+            f.seek(last.offset)
+            f.write(b"\x00" * last.length + b"\x00" * 1000)
+        assert index.state() == "stale", "Rewritten tail wasn't detected"
+
+    return True
+
+
+def _test_epochs() -> bool:
+    """Compare epochs of the index with decoded MSM, check week rollovers"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = shutil.copy(INDEX_TEST_SOURCE, tmp)
+        index = FrameIndex(src, 18, INDEX_TEST_WEEK)
+        index.update()
+        records = list(index.records())
+
+        decoded = [dto for _, dto in iter_decoded(src)]
+        msm = [r for r in records if 1070 < r.number < 1140]
+        assert len(msm) == sum(
+            isinstance(dto, ObservablesMSM) for dto in decoded
+        ), "Number of MSM differs"
+        obs = (dto for dto in decoded if isinstance(dto, ObservablesMSM))
+        for rec, dto in zip(msm, obs):
+            tow = MargoCore.conv_to_gps_time(
+                dto.hdr.time, dto.hdr.day, 18, dto.atr.gnss
+            )
+            assert rec.epoch == INDEX_TEST_WEEK * MS_IN_WEEK + tow, "Wrong epoch"
+            assert rec.station == dto.aux.rs_id, "Wrong station"
+
+        sel = list(index.select(numbers={1077, 1075}, start=msm[0].epoch + 1000))
+        assert sel and all(r.number == 1075 for r in sel), "Wrong selection"
+        assert all(r.epoch > msm[0].epoch for r in sel), "Wrong selection"
+
+    # Rollover, late epochs of the previous week, GLONASS time of day
+    clock = EpochClock(2000)
+    week = 2001 * MS_IN_WEEK
+    assert clock.resolve(MS_IN_WEEK - 1000) == week - 1000, "Wrong epoch"
+    assert clock.resolve(2000) == week + 2000, "Rollover missed"
+    assert clock.resolve(MS_IN_WEEK - 500) == week - 500, "Late epoch missed"
+    assert clock.resolve(3000) == week + 3000, "Clock moved by late epoch"
+    assert clock.resolve_tod(MS_IN_DAY - 1000) == week - 1000, "Wrong time of day"
+    assert EpochClock(2000).resolve_tod(0) == NO_EPOCH, "Time of day resolved"
+
+    return True
+
+
+INDEX_TESTS = {
+    "GROW": _test_grow,
+    "STALE": _test_stale,
+    "EPOCHS": _test_epochs,
+}
+
+
+def index_test(case: str) -> bool:
+    """Test frame index. 'case' - output format converted by the index or one of
+    INDEX_TESTS."""
+
+    print("-" * 80)
+    print(f"TESTER: start frame index test {case}.")
+
+    ret = False
+    try:
+        if case in INDEX_TESTS:
+            ret = INDEX_TESTS[case]()
+        else:
+            ret = _test_convert(case)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception as ex:
+        print(f"TESTER: status FAILED. Unexpected error {type(ex)}: {ex}")
+
+    return ret
@@ -0,0 +1,130 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of multi-stream ingest server.
+    Test file is replayed by many simultaneous sources, products of each stream
+    shall be byte-identical to conversion of the file.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import shutil
+import asyncio
+import tempfile
+
+from run_conversion import main as convert
+from run_conversion import init_logger
+from run_shards import load_controls
+from ingest_server import IngestServer
+from tests.caster_stub import push_source
+from tests.shard_test_samples import _compare_trees
+from logger import LOGGER_CF as logger
+
+
+__all__ = ["ingest_test"]
+
+
+INGEST_TEST_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+INGEST_TEST_INI = r"tests/ingest.ini"
+INGEST_TEST_PASSWORD = "secret"
+# Replayed part of the test file, [bytes]
+INGEST_TEST_LEN = 200_000
+
+
+async def _ingest(
+    fmt: str, wdir: str, data: bytes, streams: int, workers: int
+) -> IngestServer:
+    """Replay data by 'streams' sources of different kinds, wait until all streams
+    are converted. Return the stopped server."""
+
+    server = IngestServer(fmt, load_controls(INGEST_TEST_INI), wdir, workers)
+    port = await server.start("127.0.0.1")
+    try:
+        # Sources with wrong password are refused
+        try:
+            await push_source("127.0.0.1", port, "BAD", data, 1, password="wrong")
+            raise AssertionError("Source with wrong password was accepted")
+        except ConnectionError:
+            pass
+
+        await asyncio.gather(
+            *(
+                push_source(
+                    "127.0.0.1",
+                    port,
+                    f"MOUNT{i:03d}",
+                    data,
+                    version=i % 3,
+                    piece=997 + 31 * i,
+                    password=INGEST_TEST_PASSWORD,
+                )
+                for i in range(streams)
+            )
+        )
+        # Sources are done, the server converts the rest of their data
+        for _ in range(600):
+            if server.active == 0 and len(server.statistics) == streams:
+                break
+            await asyncio.sleep(0.1)
+    finally:
+        await server.close()
+    return server
+
+
+def _test_ingest(fmt: str, streams: int, workers: int) -> bool:
+    """Convert part of test file and its replay by many sources, compare products"""
+
+    with open(INGEST_TEST_SOURCE, "rb") as f:
+        data = f.read(INGEST_TEST_LEN)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "ingest.rtcm3")
+        with open(src, "wb") as f:
+            f.write(data)
+        ref = os.path.join(tmp, "ingest-" + fmt)
+        convert(f"-o {fmt} -i {INGEST_TEST_INI} {src}")
+        assert os.path.isdir(ref), "Output directory not found"
+
+        wdir = os.path.join(tmp, "live")
+        init_logger(os.path.join(tmp, "ingest-log.txt"), False)
+        try:
+            server = asyncio.run(_ingest(fmt, wdir, data, streams, workers))
+        finally:
+            logger.deinit()
+
+        stats = server.statistics
+        assert len(stats) == streams, f"{len(stats)} streams of {streams} converted"
+        assert not [s for s in stats if s.bytes != len(data)], "Data lost"
+        assert any(s.pauses for s in stats), "Backpressure didn't work"
+
+        # Raw TCP streams are named after peer address
+        folders = sorted(os.listdir(wdir))
+        assert len(folders) == streams, f"{len(folders)} output folders"
+        for odir in folders:
+            _compare_trees(ref, os.path.join(wdir, odir))
+        shutil.rmtree(wdir)
+
+    return True
+
+
+def ingest_test(fmt: str = "MARGO", streams: int = 20, workers: int = 2) -> bool:
+    """Test conversion of many streams by ingest server."""
+
+    print("-" * 80)
+    print(
+        f"TESTER: start conversion of {streams} streams to {fmt} "
+        + f"by ingest server with {workers} decoders."
+    )
+
+    ret = False
+    try:
+        ret = _test_ingest(fmt, streams, workers)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
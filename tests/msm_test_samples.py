@@ -10,7 +10,15 @@
 import os
 import csv
 import glob
-import json
+import bz2
+import gzip
+import lzma
+import math
+import sys
+import shutil
+import tempfile
+import subprocess
+from datetime import timedelta
 
 from dataclasses import dataclass, field
 from typing import Any
@@ -18,9 +26,14 @@ from typing import Any
 from gnss_types import DataClassMethods
 from run_conversion import main as convert
 from printers import PrintJSON as PJ
+from printers import NpyCore
+from printers.rinex_printer import RinexCore
+from printers.margo_printer import MargoCore
+from sources import strip_compression_ext
+from utilities import CRC24Q
 
 
-__all__ = ["test_msm_message"]
+__all__ = ["test_msm_message", "msm_batch_test"]
 
 
 MSM_TEST_SCENARIO = {
@@ -190,10 +203,17 @@ def extract_Margo(obs_dir: str) -> dict[str, Margo]:
     return ret
 
 
-def make_opath_from(base_path: str) -> tuple[str, str]:
+def decompress_gz(odir: str) -> None:
+    """Decompress *.gz files in the directory. Compressed files are removed."""
+    for path in glob.glob(os.path.join(odir, "*.gz")):
+        with gzip.open(path, "rb") as src, open(path[:-3], "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+
+
+def make_opath_from(base_path: str, mode: str = "MARGO") -> tuple[str, str]:
     """Utility function to acquire output products location."""
-    mode = "MARGO"
-    fpath, fname = os.path.split(base_path)
+    fpath, fname = os.path.split(strip_compression_ext(base_path))
     fname, _ = os.path.splitext(fname)
     odir = "-".join([fname, mode])
     odir = os.path.join(fpath, odir)
@@ -202,14 +222,15 @@ def make_opath_from(base_path: str) -> tuple[str, str]:
     return odir, olog
 
 
-def _test_msm_margo(msg_num: int) -> bool:
-    """Convert test data and compare with the reference"""
+def _test_msm_margo(msg_num: int, ini: str = "addons.ini", opts: str = "") -> bool:
+    """Convert test data and compare with the reference.
+    'opts' - additional command line options."""
 
     tscn = MSM_TEST_SCENARIO.get(msg_num)
     assert tscn is not None, f"No test scenario for message {msg_num}"
 
     (gnss, source_file, rdir) = tscn
-    cargs = "-o MARGO" + " -i addons.ini " + source_file
+    cargs = "-o MARGO" + f" -i {ini} " + (f"{opts} " if opts else "") + source_file
     convert(cargs)
 
     odir, olog = make_opath_from(source_file)
@@ -220,6 +241,7 @@ def _test_msm_margo(msg_num: int) -> bool:
     assert os.path.isdir(rdir), "Reference directory not found"
     assert os.path.isfile(olog), "Output log file not found"
 
+    decompress_gz(odir)
     conv_result = extract_Margo(odir)
     conv_reference = extract_Margo(rdir)
 
@@ -236,6 +258,363 @@ def _test_msm_margo(msg_num: int) -> bool:
     return True
 
 
+# Compressed copies of the source file: (file name, compression function).
+# The last one has no extension, compression is detected by magic bytes.
+_COMPRESSED_SOURCES = (
+    ("{0}.gz", gzip.compress),
+    ("{0}.bz2", bz2.compress),
+    ("{0}.xz", lzma.compress),
+    ("{0}", gzip.compress),
+)
+
+
+def _test_msm_margo_compressed_source(msg_num: int) -> bool:
+    """Convert compressed copies of test data and compare with the reference"""
+
+    tscn = MSM_TEST_SCENARIO.get(msg_num)
+    assert tscn is not None, f"No test scenario for message {msg_num}"
+
+    (gnss, source_file, rdir) = tscn
+    conv_reference = extract_Margo(os.path.join(rdir, gnss))
+
+    with open(source_file, "rb") as f:
+        data = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pattern, compress in _COMPRESSED_SOURCES:
+            src = os.path.join(tmp, pattern.format(os.path.basename(source_file)))
+            with open(src, "wb") as f:
+                f.write(compress(data))
+
+            convert("-o MARGO -i addons.ini " + src)
+
+            odir, olog = make_opath_from(src)
+            assert os.path.isfile(olog), f"Output log file not found ({src})"
+            conv_result = extract_Margo(os.path.join(odir, gnss))
+
+            assert (
+                conv_result.keys() == conv_reference.keys()
+            ), f"Unexpected/absent slots in the result ({src})."
+            for slot, obs in conv_result.items():
+                assert obs.compare(
+                    conv_reference[slot], 1e-15
+                ), f"Product {slot} is not equal to reference ({src})."
+            shutil.rmtree(odir)
+
+    return True
+
+
+def _test_msm_margo_stdin(msg_num: int, flush: str) -> bool:
+    """Pipe test data into the converter by small pieces and compare products
+    with the reference. Products are placed into 'stdin-MARGO' folder."""
+
+    tscn = MSM_TEST_SCENARIO.get(msg_num)
+    assert tscn is not None, f"No test scenario for message {msg_num}"
+
+    (gnss, source_file, rdir) = tscn
+    with open(source_file, "rb") as f:
+        data = f.read()
+
+    cmd = [sys.executable, "run_conversion.py", "-o", "MARGO", "-i", "addons.ini"]
+    cmd += ["--flush", flush, "-"]
+    with subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL) as p:
+        for pos in range(0, len(data), 1000):
+            p.stdin.write(data[pos : pos + 1000])
+            p.stdin.flush()
+        p.stdin.close()
+        assert p.wait() == 0, "Converter failed"
+
+    odir, olog = make_opath_from("stdin")
+    assert os.path.isfile(olog), "Output log file not found"
+    try:
+        conv_result = extract_Margo(os.path.join(odir, gnss))
+        conv_reference = extract_Margo(os.path.join(rdir, gnss))
+    finally:
+        shutil.rmtree(odir)
+
+    assert (
+        conv_result.keys() == conv_reference.keys()
+    ), "Unexpected/absent slots in the result."
+    for slot, obs in conv_result.items():
+        assert obs.compare(
+            conv_reference[slot], 1e-15
+        ), f"Product {slot} is not equal to reference."
+
+    return True
+
+
+def _test_msm_margo_batch(msg_nums: list[int], jobs: int) -> bool:
+    """Convert directory tree with test data in parallel processes
+    and compare each product with the reference"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = {}
+        for num in msg_nums:
+            tscn = MSM_TEST_SCENARIO.get(num)
+            assert tscn is not None, f"No test scenario for message {num}"
+            # Put every file into its own subdirectory
+            subdir = os.path.join(tmp, str(num))
+            os.makedirs(subdir)
+            sources[num] = shutil.copy(tscn[1], subdir)
+
+        convert(f"-o MARGO -i addons.ini --jobs {jobs} --yes --recursive {tmp}")
+
+        for num, src in sources.items():
+            gnss, _, rdir = MSM_TEST_SCENARIO[num]
+            odir, olog = make_opath_from(src)
+            assert os.path.isfile(olog), f"Output log file not found ({src})"
+            conv_result = extract_Margo(os.path.join(odir, gnss))
+            conv_reference = extract_Margo(os.path.join(rdir, gnss))
+
+            assert (
+                conv_result.keys() == conv_reference.keys()
+            ), f"Unexpected/absent slots in the result ({src})."
+            for slot, obs in conv_result.items():
+                assert obs.compare(
+                    conv_reference[slot], 1e-15
+                ), f"Product {slot} is not equal to reference ({src})."
+
+    return True
+
+
+# ----------------------------------------------------------------------------
+# Test MSM to NPY conversion.
+
+
+def _npy_to_list_of_tuples(path: str) -> list[tuple[int | float,]]:
+    """Read .npy file and companion time file. Convert them to a list of tuples
+    rounded the same way as MARGO does."""
+
+    (rows, columns), values = NpyCore.read(path)
+    (trows,), times = NpyCore.read(NpyCore.time_file_name(path))
+    assert rows == trows, f"Inconsistent time file for {path}."
+    assert len(values) == rows * columns, f"Unexpected size of {path}."
+
+    _, frc = MargoCore.FORMAT(os.path.basename(path)[1])
+    obuf = []
+    for i in range(rows):
+        row = values[i * columns : (i + 1) * columns]
+        obuf.append(tuple([times[i]]) + tuple(float(f"{x:.{frc}f}") for x in row))
+
+    return obuf
+
+
+def _test_msm_npy(msg_num: int) -> bool:
+    """Convert test data and compare with the MARGO reference"""
+
+    tscn = MSM_TEST_SCENARIO.get(msg_num)
+    assert tscn is not None, f"No test scenario for message {msg_num}"
+
+    (gnss, source_file, rdir) = tscn
+    cargs = "-o NPY -i addons.ini " + source_file
+    convert(cargs)
+
+    odir, olog = make_opath_from(source_file, "NPY")
+    odir = os.path.join(odir, gnss)
+    rdir = os.path.join(rdir, gnss)
+
+    assert os.path.isdir(odir), "Output directory not found"
+    assert os.path.isdir(rdir), "Reference directory not found"
+    assert os.path.isfile(olog), "Output log file not found"
+
+    rfiles = sorted(glob.glob(os.path.join(rdir, "*.obs")))
+    ofiles = sorted(glob.glob(os.path.join(odir, "*.npy")))
+    ofiles = [f for f in ofiles if not f.endswith("_time.npy")]
+    assert len(ofiles) == len(rfiles), "Unexpected/absent files in the result."
+
+    for ofile, rfile in zip(ofiles, rfiles):
+        obs = _npy_to_list_of_tuples(ofile)
+        ref = csv_to_list_of_tuples(rfile)[2:]
+        assert len(obs) == len(ref), f"Unexpected number of epochs in {ofile}."
+        for orow, rrow in zip(obs, ref):
+            eq = all(
+                (x == y) or (math.isnan(x) and math.isnan(y))
+                for x, y in zip(orow, rrow)
+            )
+            assert eq and len(orow) == len(rrow), f"{ofile} is not equal to reference."
+
+    return True
+
+
+# ----------------------------------------------------------------------------
+# Test MSM to RINEX conversion.
+
+# Mixed GPS, GLONASS, Galileo and BeiDou observables
+RINEX_MIXED_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+
+
+def read_rinex_obs(path: str) -> tuple[int, dict[tuple[int, str, str], float]]:
+    """Read RINEX 3 observation file.
+    Return number of epochs and {(GPS time of week [ms], sat id, obs type): value}."""
+
+    types: dict[str, list[str]] = {}
+    values: dict[tuple[int, str, str], float] = {}
+    epochs = 0
+    tow = 0
+
+    with open(path, "r", encoding="utf-8") as f:
+        sys = ""
+        for line in f:
+            label = line[60:].strip()
+            if label == "END OF HEADER":
+                break
+            if label == "SYS / # / OBS TYPES":
+                sys = line[0] if line[0] != " " else sys
+                types.setdefault(sys, []).extend(line[7:60].split())
+
+        for line in f:
+            if line.startswith(">"):
+                y, mo, d, h, mi = (int(x) for x in line[2:18].split())
+                sec = float(line[18:29])
+                epoch = RinexCore.GPS_EPOCH.replace(year=y, month=mo, day=d)
+                epoch += timedelta(hours=h, minutes=mi, seconds=sec)
+                tow = round((epoch - RinexCore.GPS_EPOCH).total_seconds() * 1000)
+                tow %= RinexCore.MS_IN_WEEK
+                epochs += 1
+                continue
+
+            sat_id = line[0:3]
+            for i, otype in enumerate(types[sat_id[0]]):
+                field = line[3 + 16 * i : 17 + 16 * i]
+                if field.strip():
+                    values[(tow, sat_id, otype)] = float(field)
+
+    return epochs, values
+
+
+def _test_msm_rinex(msg_num: int) -> bool:
+    """Convert test data and compare with the MARGO reference"""
+
+    tscn = MSM_TEST_SCENARIO.get(msg_num)
+    assert tscn is not None, f"No test scenario for message {msg_num}"
+
+    (gnss, source_file, rdir) = tscn
+    cargs = "-o RINEX -i tests/rinex.ini " + source_file
+    convert(cargs)
+
+    odir, olog = make_opath_from(source_file, "RINEX")
+    ofile = os.path.join(odir, os.path.basename(odir) + ".rnx")
+    rdir = os.path.join(rdir, gnss)
+
+    assert os.path.isfile(ofile), "Output file not found"
+    assert os.path.isdir(rdir), "Reference directory not found"
+    assert os.path.isfile(olog), "Output log file not found"
+
+    epochs, values = read_rinex_obs(ofile)
+
+    checked = 0
+    for rfile in glob.glob(os.path.join(rdir, "*.obs")):
+        fname = os.path.basename(rfile)
+        if fname[1] not in "CLDS":
+            continue
+        otype = fname[1:4]
+        ref = csv_to_list_of_tuples(rfile)
+        assert epochs == len(ref) - 2, "Unexpected number of epochs."
+        for row in ref[2:]:
+            tow, *obs = row
+            for sat, rvalue in enumerate(obs, start=1):
+                sat_id = RinexCore.sat_id(fname[0], sat)
+                value = values.get((tow, sat_id, otype))
+                if math.isnan(rvalue):
+                    assert value is None, f"{sat_id} {otype}: unexpected value."
+                    continue
+                assert value is not None, f"{sat_id} {otype}: value not found."
+                assert abs(value - rvalue) < 1.1e-3, f"{sat_id} {otype}: {value}."
+                checked += 1
+
+    assert checked == len(values), "Unexpected values in the result."
+
+    return True
+
+
+def _test_msm_rinex_week(msg_num: int) -> bool:
+    """Convert test data without GPS_WEEK. The week is guessed from modification time
+    of the source set shortly after the next week rollover."""
+
+    tscn = MSM_TEST_SCENARIO.get(msg_num)
+    assert tscn is not None, f"No test scenario for message {msg_num}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = shutil.copy(tscn[1], tmp)
+        # 2021-02-07 01:00 UTC, GPS week 2144. Observations are of 2021-02-04.
+        mtime = 1612659600
+        os.utime(src, (mtime, mtime))
+        convert("-o RINEX " + src)
+
+        odir, olog = make_opath_from(src, "RINEX")
+        ofile = os.path.join(odir, os.path.basename(odir) + ".rnx")
+        assert os.path.isfile(ofile), "Output file not found"
+        with open(ofile, "r", encoding="utf-8") as f:
+            first = [ln for ln in f if ln[60:].strip() == "TIME OF FIRST OBS"]
+        assert first and first[0].split()[:3] == ["2021", "2", "4"], "Wrong date."
+        with open(olog, "r", encoding="utf-8") as f:
+            assert "GPS week isn't defined" in f.read(), "Guessed week not logged."
+
+    return True
+
+
+def _unknown_glonass_day(src: str, dst: str) -> int:
+    """Copy RTCM file setting day of week of GLONASS MSM epochs to 7 (unknown).
+    Return number of patched messages."""
+
+    with open(src, "rb") as f:
+        data = bytearray(f.read())
+
+    cnt = 0
+    i = 0
+    while i + 6 <= len(data):
+        if data[i] != 0xD3:
+            i += 1
+            continue
+        dlen = ((data[i + 1] & 0x03) << 8 | data[i + 2]) + 3
+        if 1081 <= (data[i + 3] << 4 | data[i + 4] >> 4) <= 1087:
+            # Day of week is 3 bits after message number and station ID
+            data[i + 6] |= 0xE0
+            crc = CRC24Q.calc(bytes(data[i : i + dlen]))
+            data[i + dlen : i + dlen + 3] = crc.to_bytes(3, "big")
+            cnt += 1
+        i += dlen + 3
+
+    with open(dst, "wb") as f:
+        f.write(data)
+    return cnt
+
+
+def _test_msm_rinex_glo_day() -> bool:
+    """Convert mixed GNSS data with unknown day of week of GLONASS epochs.
+    GLONASS and GPS satellites shall be in the same epoch records as with known
+    day of week."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ref = shutil.copy(RINEX_MIXED_SOURCE, tmp)
+        src = os.path.join(tmp, "glo-day7.rtcm3")
+        assert _unknown_glonass_day(ref, src) > 0, "No GLONASS MSM messages."
+        # 2021-02-05 16:00 UTC, shortly after the observations
+        mtime = 1612540800
+        for path in (ref, src):
+            os.utime(path, (mtime, mtime))
+            convert("-o RINEX " + path)
+
+        records = []
+        for path in (ref, src):
+            odir, _ = make_opath_from(path, "RINEX")
+            ofile = os.path.join(odir, os.path.basename(odir) + ".rnx")
+            assert os.path.isfile(ofile), "Output file not found"
+            with open(ofile, "r", encoding="utf-8") as f:
+                body = f.read().split("END OF HEADER", 1)[1]
+            records.append(body.split("\n> ")[1:])
+
+        ref_records, glo7_records = records
+        assert len(glo7_records) == len(
+            ref_records
+        ), f"Unexpected number of epochs: {len(glo7_records)}."
+        assert glo7_records == ref_records, "Epoch records differ."
+        mixed = [r for r in glo7_records if "\nG" in r and "\nR" in r]
+        assert mixed, "GLONASS and GPS aren't in the same epoch."
+
+    return True
+
+
 # ----------------------------------------------------------------------------
 # Test MSM to JSON conversion.
 
@@ -250,12 +629,11 @@ class Observables(DataClassMethods):
 
 
 def _json_to_Observables(file: str) -> list[Observables]:
-    """Read and convert .json file to Observables list."""
+    """Read and convert .json (.jsonl) file to Observables list."""
 
     rvalues = []
 
-    with open(file, "r", encoding="utf-8") as f:
-        observabeles: list[dict[str, Any],] = json.load(f)
+    observabeles: list[dict[str, Any],] = PJ.load(file)
 
     observabeles.pop(0)
 
@@ -267,18 +645,18 @@ def _json_to_Observables(file: str) -> list[Observables]:
     return rvalues
 
 
-def _test_msm_json(msg_num: int) -> bool:
+def _test_msm_json(msg_num: int, mode: str = "JSON") -> bool:
     """Convert test data and compare with the reference"""
 
     tscn = MSM_TEST_SCENARIO2.get(msg_num)
     assert tscn is not None, f"No test scenario for message {msg_num}"
 
     (src, rfile) = tscn
-    cargs = "-o JSON " + src
+    cargs = f"-o {mode} " + src
 
     convert(cargs)
 
-    ofile, *_ = PJ.make_opath(src, msg_num, "JSON")
+    ofile, *_ = PJ.make_opath(src, msg_num, mode)
     assert os.path.isfile(ofile), "Output file not found."
     assert os.path.isfile(rfile), "Reference file not found."
 
@@ -295,9 +673,29 @@ def _test_msm_json(msg_num: int) -> bool:
                 ref_values[i], 1e-15
             ), f"Product {i} is not equal to reference."
 
+    if mode == "JSONL":
+        _test_jsonl_truncated(ofile)
+
     return True
 
 
+def _test_jsonl_truncated(ofile: str) -> None:
+    """Cut the JSON Lines file in the middle of the last line as a crash does.
+    The unterminated line shall be dropped by PrintJSON.load()."""
+
+    records = PJ.load(ofile)
+    with open(ofile, "rb") as f:
+        data = f.read()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, os.path.basename(ofile))
+        with open(path, "wb") as f:
+            f.write(data[: data.rindex(b"\n", 0, -1) + 10])
+        assert PJ.load(path) == records[:-1], "Truncated file loaded wrong."
+        with open(path, "wb") as f:
+            f.write(data[: data.rindex(b"\n", 0, -1) + 1])
+        assert PJ.load(path) == records[:-1], "Cut file loaded wrong."
+
+
 # ----------------------------------------------------------------------------
 # Test MSM messaage.
 
@@ -310,15 +708,85 @@ def test_msm_message(msgNum: int, mode: str) -> bool:
 
     ret = False
 
-    if not mode in ("MARGO", "JSON"):
+    if not mode in (
+        "MARGO",
+        "MARGO-LRU",
+        "MARGO-WT",
+        "MARGO-GZ",
+        "MARGO-SRC",
+        "MARGO-MT",
+        "MARGO-SHM",
+        "MARGO-RS",
+        "MARGO-STDIN",
+        "NPY",
+        "RINEX",
+        "RINEX-WEEK",
+        "RINEX-GLO7",
+        "JSON",
+        "JSONL",
+    ):
         print(f"TESTER: format {mode} is not supported in this test")
         return ret
 
     try:
         if mode == "MARGO":
             ret = _test_msm_margo(msgNum)
+        elif mode == "MARGO-LRU":
+            # Small pool of output files, see tests/file_pool.ini
+            ret = _test_msm_margo(msgNum, "tests/file_pool.ini")
+        elif mode == "MARGO-GZ":
+            # Compressed output files, see tests/compress_gz.ini
+            ret = _test_msm_margo(msgNum, "tests/compress_gz.ini")
+        elif mode == "MARGO-SRC":
+            # Compressed source files
+            ret = _test_msm_margo_compressed_source(msgNum)
+        elif mode == "MARGO-WT":
+            # Printing on the writer thread, see tests/writer_thread.ini
+            ret = _test_msm_margo(msgNum, "tests/writer_thread.ini")
+        elif mode == "MARGO-MT":
+            # Decoding in a pool of threads
+            ret = _test_msm_margo(msgNum, opts="--threads 4")
+        elif mode == "MARGO-SHM":
+            # Decoding in processes of shared memory pipeline
+            ret = _test_msm_margo(msgNum, opts="--decoders 2")
+        elif mode == "MARGO-RS":
+            # Small adaptive reads, progress after each chunk
+            ret = _test_msm_margo(
+                msgNum, opts="--read chunked --read-size 1K:8K --progress 0s"
+            )
+        elif mode == "MARGO-STDIN":
+            # Source data are piped into the standard input
+            ret = _test_msm_margo_stdin(msgNum, "epoch")
+        elif mode == "NPY":
+            ret = _test_msm_npy(msgNum)
+        elif mode == "RINEX":
+            ret = _test_msm_rinex(msgNum)
+        elif mode == "RINEX-WEEK":
+            # GPS week is guessed from modification time of the source
+            ret = _test_msm_rinex_week(msgNum)
+        elif mode == "RINEX-GLO7":
+            # Day of week of GLONASS epochs is unknown, test data are mixed
+            ret = _test_msm_rinex_glo_day()
         else:
-            ret = _test_msm_json(msgNum)
+            ret = _test_msm_json(msgNum, mode)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
+
+
+def msm_batch_test(msg_nums: list[int], jobs: int) -> bool:
+    """Test batch conversion of several MSM messages in parallel processes."""
+
+    print("-" * 80)
+    print(f"TESTER: start batch conversion of MSG{msg_nums} to MARGO, {jobs} jobs.")
+
+    ret = False
+    try:
+        ret = _test_msm_margo_batch(msg_nums, jobs)
         print("TESTER: status SUCCEED.")
     except AssertionError as asrt:
         print(f"TESTER: status FAILED. {asrt.args[0]}")
@@ -0,0 +1,115 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of resumable conversion (--checkpoint,
+    --resume). Conversion is killed after a checkpoint, then resumed. Products shall
+    be byte-identical to uninterrupted conversion.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import gzip
+import json
+import time
+import shutil
+import signal
+import tempfile
+import multiprocessing
+
+from run_conversion import main as convert
+from checkpoint import CHECKPOINT_NAME
+from tests.shard_test_samples import _compare_trees
+
+
+__all__ = ["resume_test"]
+
+
+RESUME_TEST_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+# Conversion is killed after the checkpoint beyond this part of the source
+RESUME_TEST_KILL_AT = 0.3
+
+
+def _convert_killed(args: str, odir: str, size: int) -> int:
+    """Convert in a child process, kill it after a checkpoint.
+    Return offset of the checkpoint."""
+
+    ctx = multiprocessing.get_context("fork")
+    child = ctx.Process(target=convert, args=(args,))
+    child.start()
+
+    ckpt = os.path.join(odir, CHECKPOINT_NAME)
+    offset = 0
+    while child.is_alive():
+        try:
+            with open(ckpt, "r", encoding="utf-8") as f:
+                offset = json.load(f)["offset"]
+        except (OSError, ValueError):
+            offset = 0
+        if offset > size * RESUME_TEST_KILL_AT:
+            os.kill(child.pid, signal.SIGKILL)
+            break
+        time.sleep(0.002)
+
+    child.join()
+    assert child.exitcode == -signal.SIGKILL, "Conversion wasn't interrupted"
+    return offset
+
+
+def _test_resume(mode: str, read_mode: str, compressed: bool) -> bool:
+    """Convert test file, convert it again killing conversion after a checkpoint,
+    resume it and compare products"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        name = os.path.basename(RESUME_TEST_SOURCE)
+        if compressed:
+            src = os.path.join(tmp, name + ".gz")
+            with open(RESUME_TEST_SOURCE, "rb") as fi, gzip.open(src, "wb") as fo:
+                shutil.copyfileobj(fi, fo)
+        else:
+            src = shutil.copy(RESUME_TEST_SOURCE, tmp)
+        odir = os.path.join(tmp, os.path.splitext(name)[0] + "-" + mode)
+        ref = os.path.join(tmp, "uninterrupted")
+
+        convert(f"-o {mode} -i addons.ini {src}")
+        assert os.path.isdir(odir), "Output directory not found"
+        os.rename(odir, ref)
+
+        offset = _convert_killed(
+            f"-o {mode} -i addons.ini --read chunked --read-size 4K "
+            + f"--checkpoint 64K {src}",
+            odir,
+            os.path.getsize(RESUME_TEST_SOURCE),
+        )
+        print(f"TESTER: conversion killed after checkpoint at {offset} bytes.")
+
+        convert(f"-o {mode} -i addons.ini --read {read_mode} --resume {src}")
+        assert not os.path.exists(
+            os.path.join(odir, CHECKPOINT_NAME)
+        ), "Checkpoint of finished conversion wasn't removed"
+
+        _compare_trees(ref, odir)
+
+    return True
+
+
+def resume_test(mode: str, read_mode: str = "chunked", compressed: bool = False) -> bool:
+    """Test resumed conversion. Conversion is resumed in 'read_mode'."""
+
+    print("-" * 80)
+    print(
+        f"TESTER: start resumed conversion to {mode}, {read_mode} read"
+        + (", compressed source." if compressed else ".")
+    )
+
+    ret = False
+    try:
+        ret = _test_resume(mode, read_mode, compressed)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
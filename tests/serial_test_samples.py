@@ -0,0 +1,100 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of serial ports input.
+    Test file is replayed into a pseudo terminal, messages handed over by
+    SerialSource shall be identical to decoding of the file.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import time
+import pickle
+import asyncio
+import threading
+
+from rtcm_api import make_decoder, iter_decoded
+from sources import SerialSource
+
+
+__all__ = ["serial_test"]
+
+
+SERIAL_TEST_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+# Replayed part of the test file, [bytes]
+SERIAL_TEST_LEN = 200_000
+
+
+def _replay(fd: int, data: bytes, source: SerialSource, piece: int, rate: float):
+    """Write data into master side of pty at 'rate' bytes per second. Close it when
+    the source has read everything."""
+
+    try:
+        for pos in range(0, len(data), piece):
+            os.write(fd, data[pos : pos + piece])
+            time.sleep(piece / rate)
+        deadline = time.monotonic() + 10.0
+        while source.bytes < len(data) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        os.close(fd)
+
+
+async def _collect(source: SerialSource) -> list[object]:
+    """Collect messages of the async iterator"""
+    return [xblock async for xblock in source.messages()]
+
+
+def _test_serial(mode: str) -> bool:
+    """Replay test file into pty, compare handed over messages with the file"""
+
+    with open(SERIAL_TEST_SOURCE, "rb") as f:
+        data = f.read(SERIAL_TEST_LEN)
+    expected = [dto for _, dto in iter_decoded(data)]
+
+    master, slave = os.openpty()
+    try:
+        source = SerialSource(os.ttyname(slave), make_decoder(), 115200)
+    finally:
+        os.close(slave)
+
+    writer = threading.Thread(
+        target=_replay, args=(master, data, source, 512, 2**20), daemon=True
+    )
+    with source:
+        writer.start()
+        if mode == "CALLBACK":
+            received = []
+            source.run(received.append, duration=30.0)
+        else:
+            received = asyncio.run(_collect(source))
+        writer.join()
+
+    assert source.eof, "Closed pty wasn't detected"
+    assert len(received) == len(expected), f"{len(received)} of {len(expected)} messages"
+    assert [pickle.dumps(x) for x in received] == [
+        pickle.dumps(x) for x in expected
+    ], "Messages differ"
+    assert source.latency.total == len(expected), "Latency of messages isn't measured"
+    print(f"TESTER: {source.latency}")
+    return True
+
+
+def serial_test(mode: str = "CALLBACK") -> bool:
+    """Test serial input: messages by 'CALLBACK' or by 'ASYNC' iterator."""
+
+    print("-" * 80)
+    print(f"TESTER: start reading of pty, messages by {mode}.")
+
+    ret = False
+    try:
+        ret = _test_serial(mode)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
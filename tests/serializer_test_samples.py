@@ -0,0 +1,155 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of the fast JSON serializer (FAST_SERIALIZER,
+    FLOAT_PRECISION). Values serialized by JSONFastCore() shall be equal to values
+    serialized by JSONCore(), floats rounded to FLOAT_PRECISION if it's given.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import math
+import json
+import shutil
+import tempfile
+
+from rtcm_api import iter_decoded
+from run_conversion import main as convert
+from printers.json_printer import JSONControls, JSONCore, JSONFastCore, PrintJSON
+from printers.json_printer import orjson
+
+
+__all__ = ["serializer_test"]
+
+
+SERIALIZER_TEST_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+SERIALIZER_TEST_INI = r"tests/fast_json.ini"
+# FLOAT_PRECISION of SERIALIZER_TEST_INI
+SERIALIZER_TEST_PRECISION = 3
+
+
+def _same(left, right, ndigits: int | None = None) -> bool:
+    """Compare loaded JSON values, NaN equals NaN. Floats of 'right' are rounded
+    to 'ndigits' decimal places if given."""
+
+    if isinstance(right, float):
+        if not isinstance(left, (int, float)):
+            return False
+        if math.isnan(right):
+            return math.isnan(left)
+        return left == (right if ndigits is None else round(right, ndigits))
+    if isinstance(right, dict):
+        return (
+            isinstance(left, dict)
+            and left.keys() == right.keys()
+            and all(_same(left[k], right[k], ndigits) for k in right)
+        )
+    if isinstance(right, list):
+        return (
+            isinstance(left, list)
+            and len(left) == len(right)
+            and all(_same(lv, rv, ndigits) for lv, rv in zip(left, right))
+        )
+    return left == right
+
+
+def _serialize(core: JSONCore, dto: object) -> str:
+    """Serialize DTO by the core as the printer does"""
+
+    if hasattr(dto, "obs"):
+        return core.ObservablesMSMtoPrintBuffer(dto)
+    if hasattr(dto, "sgn"):
+        return core.BareObservablesMSMtoPrintBuffer(dto)
+    return core.dataClassToPrintBuffer(dto)
+
+
+def _controls(precision: int) -> JSONControls:
+    ctrls = JSONControls()
+    ctrls.enable_hdr_data = True
+    ctrls.enable_aux_data = True
+    ctrls.float_precision = precision
+    return ctrls
+
+
+def _test_cores(precision: int) -> bool:
+    """Serialize all messages of the test file by JSONCore() and by JSONFastCore()
+    with the standard encoder, compare values"""
+
+    core = JSONCore(_controls(precision))
+    fast = JSONFastCore(_controls(precision), use_orjson=False)
+    default = JSONFastCore(_controls(precision))
+    ndigits = precision if precision >= 0 else None
+
+    cnt = 0
+    for bare in (False, True):
+        for _, dto in iter_decoded(SERIALIZER_TEST_SOURCE, bare=bare):
+            line = _serialize(fast, dto)
+            assert ": " not in line and ", " not in line, "Output isn't compact"
+            assert _same(
+                json.loads(line), json.loads(_serialize(core, dto)), ndigits
+            ), f"Values of {type(dto).__name__} differ"
+            if orjson is None:
+                # The standard encoder is the fallback without 'orjson'
+                assert line == _serialize(default, dto), "Fallback encoder differs"
+            cnt += 1
+
+    print(f"TESTER: {cnt} messages compared.")
+    return True
+
+
+def _test_conversion() -> bool:
+    """Convert test file with FLOAT_PRECISION, compare values with the default
+    conversion"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = shutil.copy(SERIALIZER_TEST_SOURCE, tmp)
+        odir = os.path.splitext(src)[0] + "-JSONL"
+        ref = os.path.join(tmp, "default")
+
+        convert(f"-o JSONL {src}")
+        assert os.path.isdir(odir), "Output directory not found"
+        os.rename(odir, ref)
+        convert(f"-o JSONL -i {SERIALIZER_TEST_INI} {src}")
+
+        cnt = 0
+        for root, _, files in os.walk(ref):
+            for name in files:
+                if not name.endswith(".jsonl"):
+                    continue
+                path = os.path.join(root, name)
+                fast = PrintJSON.load(os.path.join(odir, os.path.relpath(path, ref)))
+                assert _same(
+                    fast, PrintJSON.load(path), SERIALIZER_TEST_PRECISION
+                ), f"Values of {name} differ"
+                cnt += 1
+        assert cnt > 0, "No JSON Lines files"
+        print(f"TESTER: {cnt} files compared.")
+
+    return True
+
+
+SERIALIZER_TESTS = {
+    "FALLBACK": lambda: _test_cores(-1),
+    "PRECISION": lambda: _test_cores(SERIALIZER_TEST_PRECISION),
+    "CONVERSION": _test_conversion,
+}
+
+
+def serializer_test(case: str) -> bool:
+    """Test fast JSON serializer, see SERIALIZER_TESTS"""
+
+    print("-" * 80)
+    print(f"TESTER: start fast serializer test {case}.")
+
+    ret = False
+    try:
+        ret = SERIALIZER_TESTS[case]()
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception as ex:
+        print(f"TESTER: status FAILED. Unexpected error {type(ex)}: {ex}")
+
+    return ret
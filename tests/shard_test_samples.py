@@ -0,0 +1,153 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of intra-file parallel conversion (--shards)
+    and multi-node conversion by manifest (run_shards.py).
+    Products of sharded conversion shall be byte-identical to sequential ones.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import shutil
+import filecmp
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from run_conversion import main as convert
+from run_shards import main as run_shards
+from decoder_top import DecoderTop
+
+
+__all__ = ["shard_test", "manifest_test"]
+
+
+SHARD_TEST_SOURCE = r"RTCM3_TEST_DATA/RTK134_202102051543.rtcm3"
+
+
+def _compare_trees(left: str, right: str) -> None:
+    """Compare products in two folders byte by byte. Log files are skipped."""
+
+    cmp = filecmp.dircmp(left, right)
+    only = [f for f in cmp.left_only + cmp.right_only if not f.endswith("-log.txt")]
+    assert not only, f"Unexpected/absent products {only} in {right}"
+
+    files = [f for f in cmp.common_files if not f.endswith("-log.txt")]
+    _, mismatch, errors = filecmp.cmpfiles(left, right, files, shallow=False)
+    assert not mismatch and not errors, f"Products {mismatch + errors} differ"
+
+    for sub in cmp.common_dirs:
+        _compare_trees(os.path.join(left, sub), os.path.join(right, sub))
+
+
+def _test_shards(mode: str, shards: int) -> bool:
+    """Convert test file sequentially and by shards, compare products"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = shutil.copy(SHARD_TEST_SOURCE, tmp)
+        odir = os.path.splitext(src)[0] + "-" + mode
+        ref = os.path.join(tmp, "sequential")
+
+        convert(f"-o {mode} -i addons.ini {src}")
+        assert os.path.isdir(odir), "Output directory not found"
+        os.rename(odir, ref)
+
+        convert(f"-o {mode} -i addons.ini --shards {shards} {src}")
+        assert os.path.isdir(odir), "Output directory not found"
+        assert not [
+            d for d in os.listdir(odir) if d.startswith(".shard")
+        ], "Shard folders weren't removed"
+
+        _compare_trees(ref, odir)
+
+    return True
+
+
+def shard_test(mode: str, shards: int) -> bool:
+    """Test conversion of the file split into shards."""
+
+    print("-" * 80)
+    print(f"TESTER: start conversion to {mode} by {shards} shards.")
+
+    ret = False
+    try:
+        ret = _test_shards(mode, shards)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
+
+
+def _split_source(src: str, folder: str, parts: int) -> list[str]:
+    """Split source file into several files at message borders"""
+
+    with open(src, "rb") as f:
+        data = f.read()
+
+    dec = DecoderTop()
+    cuts = [0]
+    cuts += [dec.find_frame(data, len(data) * i // parts) for i in range(1, parts)]
+    cuts += [len(data)]
+
+    files = []
+    for i in range(parts):
+        path = os.path.join(folder, f"part-{i}.rtcm3")
+        with open(path, "wb") as f:
+            f.write(data[cuts[i] : cuts[i + 1]])
+        files.append(path)
+    return files
+
+
+def _test_manifest(mode: str, nodes: int) -> bool:
+    """Split test file into 3 files, convert them by manifest in 'nodes' processes,
+    compare merged products with sequential conversion of the whole file"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = shutil.copy(SHARD_TEST_SOURCE, tmp)
+        ref = os.path.splitext(src)[0] + "-" + mode
+        convert(f"-o {mode} -i addons.ini {src}")
+        assert os.path.isdir(ref), "Output directory not found"
+
+        # Files are listed out of order, merge restores epoch order
+        files = _split_source(src, tmp, 3)
+        files = " ".join(files[1:] + files[:1])
+        manifest = os.path.join(tmp, "manifest.json")
+        assert run_shards(
+            f"plan -o {mode} -i addons.ini --shard-size 96K -m {manifest} {files}"
+        ), "Planning failed"
+
+        # Worker processes stand in for nodes
+        with ProcessPoolExecutor(max_workers=nodes) as pool:
+            jobs = [
+                pool.submit(run_shards, f"run-shard {manifest} --node {k} --nodes {nodes}")
+                for k in range(nodes)
+            ]
+            assert all(job.result() for job in jobs), "Conversion of shards failed"
+
+        assert run_shards(f"merge {manifest}"), "Merging failed"
+        odir = os.path.splitext(manifest)[0] + "-" + mode
+        _compare_trees(ref, odir)
+
+    return True
+
+
+def manifest_test(mode: str, nodes: int) -> bool:
+    """Test conversion of files by manifest on several nodes."""
+
+    print("-" * 80)
+    print(f"TESTER: start conversion to {mode} by manifest on {nodes} nodes.")
+
+    ret = False
+    try:
+        ret = _test_manifest(mode, nodes)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
@@ -0,0 +1,229 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of tabular output formats (PARQUET, SQLITE).
+    Products are compared against rows made by TableCore directly from decoded messages.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import os
+import glob
+import sqlite3
+import tempfile
+
+from run_conversion import main as convert
+from rtcm_api import iter_decoded
+from printer_top import PrinterTop
+from decoder_top import DecoderTop
+from sub_decoders import (
+    SubdecoderMSM4567,
+    SubdecoderMSM123,
+    SubdecoderEph,
+    SubdecoderBaseStationData,
+)
+from printers import TableCore, PrintParquet, PrintSQLite, SQLiteControls
+from printers import MargoControls
+import gnss_types as gt
+
+
+__all__ = ["table_test"]
+
+
+TABLE_TEST_SCENARIO = {
+    "MSM7": r"RTCM3_TEST_DATA/MSM7/msg1087.rtcm3",
+    "MSM5": r"RTCM3_TEST_DATA/MSM5/msg1075.rtcm3",
+    "EPH": r"RTCM3_TEST_DATA/EPH/msg1019.rtcm3",
+    "BASE": r"RTCM3_TEST_DATA/BASE/msg1230.rtcm3",
+}
+
+
+def make_reference(src: str) -> dict[str, list[tuple]]:
+    """Decode source file and make {table name: rows} dictionary. GPS week is
+    guessed from modification time of the source as the converter does."""
+
+    dec = DecoderTop()
+    dec.register_decoder(SubdecoderMSM4567().io)
+    dec.register_decoder(SubdecoderMSM123().io)
+    dec.register_decoder(SubdecoderEph().io)
+    dec.register_decoder(SubdecoderBaseStationData().io)
+    ctrl = MargoControls()
+    ctrl.ref_time = os.stat(src).st_mtime_ns
+    core = TableCore(ctrl)
+
+    rv: dict[str, list[tuple]] = {}
+    with open(src, "rb") as f:
+        for msg in dec.catch_message(f.read()):
+            dto = dec.decode(msg)
+            if dto is None:
+                continue
+            if isinstance(dto, gt.ObservablesMSM):
+                rv.setdefault("obs", []).extend(core.ObservablesMSMtoRows(dto))
+            else:
+                name = core.table_name(type(dto))
+                rv.setdefault(name, []).append(core.dataClassToRow(dto))
+
+    return rv
+
+
+def _read_parquet(odir: str) -> dict[str, list[tuple]]:
+    """Read all Parquet files in the output directory"""
+
+    import pyarrow.parquet as pq  # pylint: disable = import-outside-toplevel
+
+    rv: dict[str, list[tuple]] = {}
+    for path in glob.glob(os.path.join(odir, "**", "*.parquet"), recursive=True):
+        rows = [tuple(r.values()) for r in pq.read_table(path).to_pylist()]
+        parts = os.path.relpath(path, odir).split(os.sep)
+        name = "obs" if parts[0] == "obs" else os.path.splitext(parts[-1])[0]
+        if name == "obs":
+            gdate = TableCore.gps_date(rows[0][0])
+            assert parts[2] == f"date={gdate}", f"Wrong partition {parts[2]}."
+        rv.setdefault(name, []).extend(rows)
+
+    return rv
+
+
+def _read_sqlite(odir: str) -> dict[str, list[tuple]]:
+    """Read all tables of SQLite database in the output directory"""
+
+    path = PrintSQLite.make_opath(odir)
+    assert os.path.isfile(path), "Output database not found"
+
+    rv: dict[str, list[tuple]] = {}
+    db = sqlite3.connect(path)
+    try:
+        tables = db.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        for (name,) in tables.fetchall():
+            if name == "obs":
+                columns = TableCore.OBS_COLUMNS
+            else:
+                columns = TableCore.columns(gt.__dict__[name])
+            rows = db.execute(f'SELECT * FROM "{name}"').fetchall()
+            # SQLite keeps booleans as integers
+            rv[name] = [
+                tuple(TableCore.cast(v, ct) for v, (_, ct) in zip(row, columns))
+                for row in rows
+            ]
+    finally:
+        db.close()
+
+    return rv
+
+
+def _test_table(scenario: str, mode: str, opts: str = "") -> bool:
+    """Convert test data and compare with the reference"""
+
+    src = TABLE_TEST_SCENARIO.get(scenario)
+    assert src is not None, f"No test scenario {scenario}"
+
+    convert(f"-o {mode} {opts}" + src)
+
+    fpath, fname = os.path.split(src)
+    fname, _ = os.path.splitext(fname)
+    odir = os.path.join(fpath, "-".join([fname, mode]))
+    assert os.path.isdir(odir), "Output directory not found"
+
+    if mode == "PARQUET":
+        result = _read_parquet(odir)
+    else:
+        result = _read_sqlite(odir)
+    reference = make_reference(src)
+
+    assert result.keys() == reference.keys(), "Unexpected/absent tables."
+    for name, rows in reference.items():
+        assert sorted(result[name], key=repr) == sorted(
+            rows, key=repr
+        ), f"Table {name} is not equal to reference."
+
+    return True
+
+
+def _test_sqlite_failure(scenario: str) -> bool:
+    """Tables are dropped by another connection before the batch is inserted.
+    The failed transaction shall be counted as printing error."""
+
+    src = TABLE_TEST_SCENARIO.get(scenario)
+    assert src is not None, f"No test scenario {scenario}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        top = PrinterTop("SQLITE")
+        sql = PrintSQLite(tmp, SQLiteControls())
+        assert top.add_subprinter(sql.io), "Sub-printer not registered"
+
+        for _, dto in iter_decoded(src):
+            top.print(dto)
+        assert top.errors == 0, "Unexpected printing errors."
+
+        db = sqlite3.connect(sql.path)
+        try:
+            tables = db.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            for (name,) in tables.fetchall():
+                db.execute(f'DROP TABLE "{name}"')
+            db.commit()
+        finally:
+            db.close()
+
+        top.flush()
+        assert top.errors == 1, f"{top.errors} printing errors counted."
+        top.close()
+        assert top.errors == 1, f"{top.errors} printing errors after close."
+
+    return True
+
+
+def _test_parquet_failure() -> bool:
+    """Table file of BASE scenario can't be created. The failed batch shall be
+    counted as printing error."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        top = PrinterTop("PARQUET")
+        pqt = PrintParquet(tmp)
+        assert top.add_subprinter(pqt.io), "Sub-printer not registered"
+        # Directory in place of the table file
+        os.makedirs(pqt.make_path(("base", gt.BaseGLBS)))
+
+        for _, dto in iter_decoded(TABLE_TEST_SCENARIO["BASE"]):
+            top.print(dto)
+        top.close()
+        assert top.errors == 1, f"{top.errors} printing errors counted."
+
+    return True
+
+
+def table_test(scenario: str, mode: str) -> bool:
+    """Test conversion of the scenario into tabular format."""
+
+    print("-" * 80)
+    print(f"TESTER: start conversion {scenario} to {mode}.")
+
+    ret = False
+
+    if not mode in ("PARQUET", "PARQUET-FAIL", "SQLITE", "SQLITE-WT", "SQLITE-FAIL"):
+        print(f"TESTER: format {mode} is not supported in this test")
+        return ret
+
+    if mode.startswith("PARQUET") and not PrintParquet.available():
+        print("TESTER: package 'pyarrow' not installed. Test skipped.")
+        return True
+
+    try:
+        if mode == "SQLITE-WT":
+            # Printing on the writer thread, see tests/writer_thread.ini
+            ret = _test_table(scenario, "SQLITE", "-i tests/writer_thread.ini ")
+        elif mode == "PARQUET-FAIL":
+            # Failed record batch, BASE scenario only
+            ret = _test_parquet_failure()
+        elif mode == "SQLITE-FAIL":
+            # Failed transaction of the batch
+            ret = _test_sqlite_failure(scenario)
+        else:
+            ret = _test_table(scenario, mode)
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception:
+        print("TESTER: status FAILED. Unexpected error")
+
+    return ret
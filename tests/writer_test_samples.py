@@ -0,0 +1,104 @@
+"""
+    Author: Kanstantsin Yuryeu
+    Mail: konstantin.yuriev83@gmail.com
+
+    Functions required for validation of the writer thread of PrinterTop
+    (WRITER_THREAD). Failures of sub-printers on the writer thread shall be counted
+    as printing errors, sync() and close() shall return.
+"""
+
+# pylint: disable = invalid-name, broad-exception-caught
+
+import threading
+
+from printer_top import PrinterTop, SubPrinterInterface
+from gnss_types import BaseRP, BaseRPH
+
+
+__all__ = ["writer_test"]
+
+
+# Max. time to wait for sync() and close(), [s]
+WRITER_TEST_TIMEOUT = 10.0
+
+
+class _FailingPrinter:
+    """Sub-printer failing on BaseRPH, flush and close"""
+
+    def __init__(self) -> None:
+        self.printed = 0
+        self.closed = False
+        self.io = SubPrinterInterface()
+        self.io.data_spec = SubPrinterInterface.make_specs("JSON")
+        self.io.actual_spec = {BaseRP, BaseRPH}
+        self.io.print = self.__print
+        self.io.flush = self.__flush
+        self.io.close = self.__close
+
+    def __print(self, dto: object):
+        if isinstance(dto, BaseRPH):
+            raise RuntimeError("print failed")
+        self.printed += 1
+
+    def __flush(self):
+        raise ValueError("flush failed")
+
+    def __close(self):
+        self.closed = True
+        raise KeyError("close failed")
+
+
+def _returns(func) -> bool:
+    """Call 'func' on a helper thread, check it returns in time"""
+    thread = threading.Thread(target=func, daemon=True)
+    thread.start()
+    thread.join(WRITER_TEST_TIMEOUT)
+    return not thread.is_alive()
+
+
+def _test_failures() -> bool:
+    """Sub-printer fails on the writer thread in print(), flush() and close()"""
+
+    top = PrinterTop("JSON")
+    fake = _FailingPrinter()
+    assert top.add_subprinter(fake.io), "Sub-printer not registered"
+    assert top.start_writer(2), "Writer thread not started"
+
+    for _ in range(5):
+        top.print(BaseRP())
+        top.print(BaseRPH())
+    top.flush()
+    assert _returns(top.sync), "sync() hangs after failures"
+    for _ in range(5):
+        top.print(BaseRP())
+    assert _returns(top.close), "close() hangs after failures"
+
+    assert fake.printed == 10, f"{fake.printed} messages printed"
+    assert fake.closed, "Sub-printer not closed"
+    # 5 prints, 2 flushes and close failed
+    assert top.errors == 8, f"{top.errors} printing errors counted"
+
+    return True
+
+
+WRITER_TESTS = {
+    "FAILURES": _test_failures,
+}
+
+
+def writer_test(case: str) -> bool:
+    """Test writer thread, see WRITER_TESTS"""
+
+    print("-" * 80)
+    print(f"TESTER: start writer thread test {case}.")
+
+    ret = False
+    try:
+        ret = WRITER_TESTS[case]()
+        print("TESTER: status SUCCEED.")
+    except AssertionError as asrt:
+        print(f"TESTER: status FAILED. {asrt.args[0]}")
+    except Exception as ex:
+        print(f"TESTER: status FAILED. Unexpected error {type(ex)}: {ex}")
+
+    return ret